@@ -1,15 +1,30 @@
+import asyncio
 import json
+import logging
 import re
+from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from fastapi.responses import StreamingResponse
-from sqlalchemy import select
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.dependencies import get_db, get_workspace_id
+from app.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    set_page_headers,
+)
+from app.db.database import AsyncSessionLocal
 from app.models.models import Conversation, Message
 from app.models.schemas import ChatIn, ChatOut, ConversationOut
-from app.services.retrieval import retrieve_top_chunks
+from app.services.answer_cache import lookup_answer, replay_tokens, store_answer
+from app.services.retrieval import expand_windows, retrieve_top_chunks
+from app.services.timing import StageTimer, record_timings
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -56,6 +71,11 @@ def citation_payload(chunks: list[dict]) -> list[dict]:
     ]
 
 
+async def aiter_list(items: list[str]):
+    for item in items:
+        yield item
+
+
 async def get_or_create_conversation(
     db: AsyncSession,
     conversation_id: int | None,
@@ -82,120 +102,221 @@ async def get_or_create_conversation(
 
 @router.get("/conversations", response_model=list[ConversationOut])
 async def list_conversations(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    include_total: bool = False,
     workspace_id: str = Depends(get_workspace_id),
     db: AsyncSession = Depends(get_db),
 ):
-    convs = (
-        await db.execute(
-            select(Conversation)
-            .where(Conversation.workspace_id == workspace_id)
-            .order_by(Conversation.created_at.desc())
+    query = select(Conversation.id, Conversation.title, Conversation.created_at).where(
+        Conversation.workspace_id == workspace_id
+    )
+    if cursor:
+        created_at, conversation_id = decode_cursor(cursor, datetime, int)
+        query = query.where(tuple_(Conversation.created_at, Conversation.id) < tuple_(created_at, conversation_id))
+    rows = (
+        await db.execute(query.order_by(Conversation.created_at.desc(), Conversation.id.desc()).limit(limit + 1))
+    ).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    total = None
+    if include_total:
+        total = await db.scalar(
+            select(func.count()).select_from(Conversation).where(Conversation.workspace_id == workspace_id)
         )
-    ).scalars().all()
+    set_page_headers(response, next_cursor, total)
+    return [ConversationOut(**row) for row in rows]
 
-    return [
-        ConversationOut(id=c.id, title=c.title, created_at=c.created_at)
-        for c in convs
-    ]
+
+async def start_chat(
+    db: AsyncSession,
+    payload: ChatIn,
+    workspace_id: str,
+    timer: StageTimer,
+) -> tuple[int, str | None, asyncio.Task | None]:
+    """
+    Small-talk check, query embedding and conversation/user-message writes.
+    The embedding call does not depend on the writes, so it is started
+    first and returned as a task for the caller to await when needed.
+    """
+    from app.services.embeddings import embed_texts
+
+    small_talk_answer = small_talk_response(payload.query)
+    embed_task = None
+    if small_talk_answer is None:
+        embed_task = asyncio.create_task(timer.run("embed", embed_texts([payload.query])))
+
+    try:
+        with timer.stage("persist_query"):
+            conversation_id = await get_or_create_conversation(
+                db,
+                payload.conversation_id,
+                workspace_id,
+            )
+            db.add(Message(conversation_id=conversation_id, role="user", content=payload.query))
+            await db.commit()
+    except BaseException:
+        if embed_task is not None:
+            embed_task.cancel()
+        raise
+
+    return conversation_id, small_talk_answer, embed_task
 
 
 @router.post("", response_model=ChatOut)
 async def chat(
     payload: ChatIn,
+    response: Response,
     workspace_id: str = Depends(get_workspace_id),
     db: AsyncSession = Depends(get_db),
 ):
-    from app.services.embeddings import embed_texts
     from app.services.llm import answer_query
 
-    conversation_id = await get_or_create_conversation(
-        db,
-        payload.conversation_id,
-        workspace_id,
-    )
-
-    db.add(Message(conversation_id=conversation_id, role="user", content=payload.query))
-    await db.commit()
+    timer = StageTimer()
+    conversation_id, answer, embed_task = await start_chat(db, payload, workspace_id, timer)
 
-    answer = small_talk_response(payload.query)
     citations = []
     if answer is None:
-        q_emb = (await embed_texts([payload.query]))[0]
-        chunks = await retrieve_top_chunks(db, q_emb, payload.query, workspace_id)
-        if chunks:
-            answer, citations = await answer_query(payload.query, chunks)
+        q_emb = (await embed_task)[0]
+        cached = await timer.run("answer_cache", lookup_answer(db, workspace_id, payload.query, q_emb))
+        if cached is not None:
+            answer, citations = cached.answer, cached.citations
         else:
-            answer = NO_RELEVANT_CONTEXT_MESSAGE
-
-    db.add(
-        Message(
-            conversation_id=conversation_id,
-            role="assistant",
-            content=answer,
-            citations={"citations": citations},
+            chunks = await timer.run("retrieve", retrieve_top_chunks(db, q_emb, payload.query, workspace_id))
+            if chunks:
+                context_chunks = await timer.run("expand", expand_windows(db, chunks))
+                answer, citations = await timer.run("llm", answer_query(payload.query, chunks, context_chunks))
+                store_answer(db, workspace_id, payload.query, q_emb, answer, citations)
+            else:
+                answer = NO_RELEVANT_CONTEXT_MESSAGE
+
+    with timer.stage("persist_answer"):
+        db.add(
+            Message(
+                conversation_id=conversation_id,
+                role="assistant",
+                content=answer,
+                citations={"citations": citations},
+            )
         )
-    )
-    await db.commit()
+        await db.commit()
 
+    timer.mark("total")
+    record_timings("chat", timer)
+    response.headers["Server-Timing"] = timer.server_timing()
     return ChatOut(conversation_id=conversation_id, answer=answer, citations=citations)
 
 
-@router.post("/stream")
-async def chat_stream(
-    payload: ChatIn,
-    workspace_id: str = Depends(get_workspace_id),
-    db: AsyncSession = Depends(get_db),
-):
-    from app.services.embeddings import embed_texts
-    from app.services.llm import stream_answer
-
-    conversation_id = await get_or_create_conversation(
-        db,
-        payload.conversation_id,
-        workspace_id,
-    )
+def sse(data: dict, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
 
-    db.add(Message(conversation_id=conversation_id, role="user", content=payload.query))
-    await db.commit()
 
-    small_talk_answer = small_talk_response(payload.query)
-    chunks = []
-    if small_talk_answer is None:
-        q_emb = (await embed_texts([payload.query]))[0]
-        chunks = await retrieve_top_chunks(db, q_emb, payload.query, workspace_id)
+# Answer tasks outlive their response when the client disconnects; keep
+# references so they are not garbage collected mid-flight.
+_answer_tasks: set[asyncio.Task] = set()
 
-    safe_chunks = citation_payload(chunks)
 
-    async def event_gen():
-        yield (
-            "event: meta\n"
-            f"data: {json.dumps({'conversation_id': conversation_id, 'citations': safe_chunks})}\n\n"
-        )
+async def _stream_answer_events(
+    queue: asyncio.Queue,
+    payload: ChatIn,
+    workspace_id: str,
+    timer: StageTimer,
+) -> None:
+    """
+    Produce the SSE events for one answer onto `queue` (None ends the
+    stream): the conversation is saved and its id sent first, then the
+    answer, which is persisted at the end. Runs as its own task with its
+    own session, so a client disconnect neither cancels the answer nor
+    leaves a session open.
+    """
+    from app.services.llm import stream_answer
 
-        buf = []
-        if small_talk_answer is not None:
-            buf.append(small_talk_answer)
-            yield f"data: {json.dumps({'token': small_talk_answer})}\n\n"
-        elif not chunks:
-            buf.append(NO_RELEVANT_CONTEXT_MESSAGE)
-            yield f"data: {json.dumps({'token': NO_RELEVANT_CONTEXT_MESSAGE})}\n\n"
-        else:
-            async for token in stream_answer(payload.query, chunks):
+    conversation_id = payload.conversation_id
+    buf: list[str] = []
+    citations: list[dict] = []
+    try:
+        async with AsyncSessionLocal() as db:
+            try:
+                conversation_id, small_talk_answer, embed_task = await start_chat(db, payload, workspace_id, timer)
+            except HTTPException as exc:
+                queue.put_nowait(sse({"detail": exc.detail}, "error"))
+                queue.put_nowait(None)
+                return
+            queue.put_nowait(sse({"conversation_id": conversation_id}, "meta"))
+
+            chunks = []
+            cached = None
+            if small_talk_answer is not None:
+                tokens = aiter_list([small_talk_answer])
+            else:
+                queue.put_nowait(sse({}, "retrieving"))
+                q_emb = (await embed_task)[0]
+                cached = await timer.run("answer_cache", lookup_answer(db, workspace_id, payload.query, q_emb))
+                if cached is not None:
+                    tokens = aiter_list(replay_tokens(cached.answer))
+                else:
+                    chunks = await timer.run(
+                        "retrieve", retrieve_top_chunks(db, q_emb, payload.query, workspace_id)
+                    )
+                    if chunks:
+                        context_chunks = await timer.run("expand", expand_windows(db, chunks))
+                        tokens = stream_answer(payload.query, chunks, context_chunks)
+                    else:
+                        tokens = aiter_list([NO_RELEVANT_CONTEXT_MESSAGE])
+
+            citations = cached.citations if cached is not None else citation_payload(chunks)
+            meta = {"conversation_id": conversation_id, "citations": citations}
+            if cached is not None:
+                meta["cached"] = True
+            queue.put_nowait(sse(meta, "meta"))
+
+            async for token in tokens:
+                if not buf:
+                    timer.mark("first_token")
                 buf.append(token)
-                yield f"data: {json.dumps({'token': token})}\n\n"
+                queue.put_nowait(sse({"token": token}))
+
+            final_text = "".join(buf)
+            timer.mark("total")
+            queue.put_nowait(sse({"timings": timer.as_millis()}, "done"))
+            queue.put_nowait(None)
+
+            if chunks:
+                store_answer(db, workspace_id, payload.query, q_emb, final_text, citations)
+            db.add(
+                Message(
+                    conversation_id=conversation_id,
+                    role="assistant",
+                    content=final_text,
+                    citations={"citations": citations},
+                )
+            )
+            await db.commit()
+            record_timings("chat_stream", timer)
+    except Exception:
+        logger.exception("Streaming answer for conversation %s failed", conversation_id)
+        queue.put_nowait(sse({"detail": "Answer generation failed"}, "error"))
+        queue.put_nowait(None)
 
-        final_text = "".join(buf)
-        yield "event: done\ndata: {}\n\n"
 
-        db.add(
-            Message(
-                conversation_id=conversation_id,
-                role="assistant",
-                content=final_text,
-                citations={"citations": safe_chunks},
-            )
-        )
-        await db.commit()
+@router.post("/stream")
+async def chat_stream(
+    payload: ChatIn,
+    workspace_id: str = Depends(get_workspace_id),
+):
+    timer = StageTimer()
+    queue: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(_stream_answer_events(queue, payload, workspace_id, timer))
+    _answer_tasks.add(task)
+    task.add_done_callback(_answer_tasks.discard)
 
-    return StreamingResponse(event_gen(), media_type="text/event-stream")
+    async def event_gen():
+        while (event := await queue.get()) is not None:
+            yield event
 
+    return StreamingResponse(event_gen(), media_type="text/event-stream")
@@ -1,27 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import delete, select
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import delete, func, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.dependencies import get_db, get_workspace_id
+from app.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    set_page_headers,
+)
 from app.models.models import Chunk, Document
 from app.models.schemas import ChunkOut, DocumentOut
+from app.services.answer_cache import invalidate_document
+from app.services.retrieval_cache import bump_corpus_version
 
 router = APIRouter()
 
 
+# Only the columns DocumentOut needs, as plain rows rather than ORM objects.
+_DOCUMENT_COLUMNS = [getattr(Document, name) for name in DocumentOut.model_fields]
+
+
 @router.get("", response_model=list[DocumentOut])
 async def list_documents(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    include_total: bool = False,
     workspace_id: str = Depends(get_workspace_id),
     db: AsyncSession = Depends(get_db),
 ):
-    docs = (
-        await db.execute(
-            select(Document)
-            .where(Document.workspace_id == workspace_id)
-            .order_by(Document.created_at.desc())
+    """
+    Newest first, keyset-paginated on (created_at, id) via
+    ix_documents_workspace_created_id.
+    """
+    query = select(*_DOCUMENT_COLUMNS).where(Document.workspace_id == workspace_id)
+    if cursor:
+        created_at, doc_id = decode_cursor(cursor, datetime, int)
+        query = query.where(tuple_(Document.created_at, Document.id) < tuple_(created_at, doc_id))
+    rows = (
+        await db.execute(query.order_by(Document.created_at.desc(), Document.id.desc()).limit(limit + 1))
+    ).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    total = None
+    if include_total:
+        total = await db.scalar(
+            select(func.count()).select_from(Document).where(Document.workspace_id == workspace_id)
         )
-    ).scalars().all()
-    return [DocumentOut(**d.__dict__) for d in docs]
+    set_page_headers(response, next_cursor, total)
+    return [DocumentOut(**row) for row in rows]
 
 
 @router.get("/{doc_id}", response_model=DocumentOut)
@@ -42,15 +76,24 @@ async def get_document(
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    return DocumentOut(**doc.__dict__)
+    return DocumentOut.model_validate(doc)
 
 
 @router.get("/{doc_id}/chunks", response_model=list[ChunkOut])
 async def get_document_chunks(
     doc_id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    include_total: bool = False,
+    preview_chars: int | None = Query(None, ge=1),
     workspace_id: str = Depends(get_workspace_id),
     db: AsyncSession = Depends(get_db),
 ):
+    """
+    Chunks in order, keyset-paginated on chunk_index via
+    ix_chunks_doc_chunk_index. `preview_chars` truncates text in SQL.
+    """
     doc = (
         await db.execute(
             select(Document.id).where(
@@ -62,24 +105,29 @@ async def get_document_chunks(
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    chunks = (
-        await db.execute(
-            select(Chunk)
-            .where(Chunk.document_id == doc_id)
-            .order_by(Chunk.chunk_index.asc())
-        )
-    ).scalars().all()
-
-    return [
-        ChunkOut(
-            id=c.id,
-            document_id=c.document_id,
-            chunk_index=c.chunk_index,
-            text=c.text,
-            created_at=c.created_at,
-        )
-        for c in chunks
-    ]
+    text_column = func.left(Chunk.text, preview_chars) if preview_chars else Chunk.text
+    query = select(
+        Chunk.id,
+        Chunk.document_id,
+        Chunk.chunk_index,
+        text_column.label("text"),
+        Chunk.created_at,
+        Chunk.page_number,
+    ).where(Chunk.document_id == doc_id)
+    if cursor:
+        (after_index,) = decode_cursor(cursor, int)
+        query = query.where(Chunk.chunk_index > after_index)
+    rows = (await db.execute(query.order_by(Chunk.chunk_index.asc()).limit(limit + 1))).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["chunk_index"])
+    total = None
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(Chunk).where(Chunk.document_id == doc_id))
+    set_page_headers(response, next_cursor, total)
+    return [ChunkOut(**row) for row in rows]
 
 
 @router.delete("/{doc_id}")
@@ -101,6 +149,8 @@ async def delete_document(
         raise HTTPException(status_code=404, detail="Document not found")
 
     await db.execute(delete(Document).where(Document.id == doc_id))
+    await bump_corpus_version(db, workspace_id)
+    await invalidate_document(db, doc_id)
     await db.commit()
 
     return {"deleted": True, "document_id": doc_id}
\ No newline at end of file
@@ -1,10 +1,10 @@
+import hashlib
 import os
 import uuid
 from datetime import datetime
 
 from fastapi import (
     APIRouter,
-    BackgroundTasks,
     Depends,
     File,
     HTTPException,
@@ -20,16 +20,17 @@ from app.models.models import (
     Document,
     DocumentStatus,
     IngestionJob,
-    JobStage,
-    JobStatus,
     SourceType,
 )
 from app.models.schemas import DocumentOut, IngestTextIn, IngestUrlIn, JobOut
+from app.services.ingestion.dedupe import content_hash
 from app.services.ingestion.documents import supported_document_extensions
-from app.services.ingestion.pipeline import run_ingestion_pipeline
+from app.services.ingestion.queue import enqueue_ingestion, job_in_flight
 
 router = APIRouter()
 
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
 
 def _doc_out(doc: Document) -> DocumentOut:
     return DocumentOut(
@@ -48,41 +49,74 @@ def _doc_out(doc: Document) -> DocumentOut:
     )
 
 
-async def _create_job(db: AsyncSession, doc_id: int) -> None:
-    db.add(
-        IngestionJob(
-            document_id=doc_id,
-            status=JobStatus.queued,
-            stage=JobStage.extract,
+async def _spool_upload(file: UploadFile, path: str) -> tuple[int, str]:
+    """
+    Copy the upload to disk in fixed-size blocks, hashing as we go.
+    Returns (size_bytes, sha256).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "wb") as f:
+        while block := await file.read(UPLOAD_BLOCK_SIZE):
+            digest.update(block)
+            f.write(block)
+            size += len(block)
+
+    if not size:
+        os.remove(path)
+        raise HTTPException(status_code=400, detail="Empty upload")
+    return size, digest.hexdigest()
+
+
+async def _find_duplicate(
+    db: AsyncSession,
+    workspace_id: str,
+    source_type: SourceType,
+    digest: str,
+) -> Document | None:
+    return (
+        await db.execute(
+            select(Document)
+            .where(
+                Document.workspace_id == workspace_id,
+                Document.source_type == source_type,
+                Document.content_hash == digest,
+                Document.status != DocumentStatus.error,
+            )
+            .order_by(Document.created_at.desc())
+            .limit(1)
         )
-    )
-    await db.commit()
+    ).scalar_one_or_none()
 
 
 @router.post("/text", response_model=DocumentOut)
 async def ingest_text(
     payload: IngestTextIn,
-    background_tasks: BackgroundTasks,
     workspace_id: str = Depends(get_workspace_id),
     db: AsyncSession = Depends(get_db),
 ):
+    digest = content_hash(payload.text.strip())
+    existing = await _find_duplicate(db, workspace_id, SourceType.text, digest)
+    if existing:
+        return _doc_out(existing)
+
     doc = Document(
         title=payload.title,
         source_type=SourceType.text,
         source_uri=None,
         mime_type="text/plain",
         size_bytes=len(payload.text.encode("utf-8", errors="ignore")),
+        content_hash=digest,
         status=DocumentStatus.processing,
         created_at=datetime.utcnow(),
         workspace_id=workspace_id,
     )
     db.add(doc)
     await db.flush()
-    await _create_job(db, doc.id)
-
-    background_tasks.add_task(
-        run_ingestion_pipeline,
+    await enqueue_ingestion(
+        db,
         doc.id,
+        workspace_id,
         source_type=SourceType.text,
         text_input=payload.text,
     )
@@ -93,10 +127,40 @@ async def ingest_text(
 @router.post("/url", response_model=DocumentOut)
 async def ingest_url(
     payload: IngestUrlIn,
-    background_tasks: BackgroundTasks,
     workspace_id: str = Depends(get_workspace_id),
     db: AsyncSession = Depends(get_db),
 ):
+    existing = (
+        await db.execute(
+            select(Document)
+            .where(
+                Document.workspace_id == workspace_id,
+                Document.source_type == SourceType.url,
+                Document.source_uri == payload.url,
+            )
+            .order_by(Document.created_at.desc())
+            .limit(1)
+        )
+    ).scalar_one_or_none()
+
+    if existing:
+        # Refresh in place: the pipeline skips unchanged pages and only
+        # re-embeds chunks whose text changed.
+        if existing.status == DocumentStatus.processing or await job_in_flight(db, existing.id):
+            return _doc_out(existing)
+        if existing.status == DocumentStatus.error:
+            existing.status = DocumentStatus.processing
+            existing.error = None
+        await db.flush()
+        await enqueue_ingestion(
+            db,
+            existing.id,
+            workspace_id,
+            source_type=SourceType.url,
+            url=payload.url,
+        )
+        return _doc_out(existing)
+
     doc = Document(
         title=payload.title or payload.url,
         source_type=SourceType.url,
@@ -109,11 +173,10 @@ async def ingest_url(
     )
     db.add(doc)
     await db.flush()
-    await _create_job(db, doc.id)
-
-    background_tasks.add_task(
-        run_ingestion_pipeline,
+    await enqueue_ingestion(
+        db,
         doc.id,
+        workspace_id,
         source_type=SourceType.url,
         url=payload.url,
     )
@@ -123,7 +186,6 @@ async def ingest_url(
 
 @router.post("/file", response_model=DocumentOut)
 async def ingest_file(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     workspace_id: str = Depends(get_workspace_id),
     db: AsyncSession = Depends(get_db),
@@ -141,30 +203,30 @@ async def ingest_file(
     fname = f"{uuid.uuid4().hex}{ext}"
     path = os.path.join(settings.upload_dir, fname)
 
-    content = await file.read()
-    if not content:
-        raise HTTPException(status_code=400, detail="Empty upload")
+    size_bytes, digest = await _spool_upload(file, path)
 
-    with open(path, "wb") as f:
-        f.write(content)
+    existing = await _find_duplicate(db, workspace_id, SourceType.document, digest)
+    if existing:
+        os.remove(path)
+        return _doc_out(existing)
 
     doc = Document(
         title=file.filename,
         source_type=SourceType.document,
         source_uri=path,
         mime_type=file.content_type,
-        size_bytes=len(content),
+        size_bytes=size_bytes,
+        content_hash=digest,
         status=DocumentStatus.processing,
         created_at=datetime.utcnow(),
         workspace_id=workspace_id,
     )
     db.add(doc)
     await db.flush()
-    await _create_job(db, doc.id)
-
-    background_tasks.add_task(
-        run_ingestion_pipeline,
+    await enqueue_ingestion(
+        db,
         doc.id,
+        workspace_id,
         source_type=SourceType.document,
         file_path=path,
     )
@@ -174,7 +236,6 @@ async def ingest_file(
 
 @router.post("/audio", response_model=DocumentOut)
 async def ingest_audio(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     workspace_id: str = Depends(get_workspace_id),
     db: AsyncSession = Depends(get_db),
@@ -188,30 +249,30 @@ async def ingest_audio(
     fname = f"{uuid.uuid4().hex}{ext}"
     path = os.path.join(settings.upload_dir, fname)
 
-    content = await file.read()
-    if not content:
-        raise HTTPException(status_code=400, detail="Empty upload")
+    size_bytes, digest = await _spool_upload(file, path)
 
-    with open(path, "wb") as f:
-        f.write(content)
+    existing = await _find_duplicate(db, workspace_id, SourceType.audio, digest)
+    if existing:
+        os.remove(path)
+        return _doc_out(existing)
 
     doc = Document(
         title=file.filename,
         source_type=SourceType.audio,
         source_uri=path,
         mime_type=file.content_type,
-        size_bytes=len(content),
+        size_bytes=size_bytes,
+        content_hash=digest,
         status=DocumentStatus.processing,
         created_at=datetime.utcnow(),
         workspace_id=workspace_id,
     )
     db.add(doc)
     await db.flush()
-    await _create_job(db, doc.id)
-
-    background_tasks.add_task(
-        run_ingestion_pipeline,
+    await enqueue_ingestion(
+        db,
         doc.id,
+        workspace_id,
         source_type=SourceType.audio,
         file_path=path,
     )
@@ -244,4 +305,6 @@ async def job_status(
         status=job.status.value,
         stage=job.stage.value,
         error=job.error,
+        pages_processed=job.pages_processed,
+        pages_total=job.pages_total,
     )
\ No newline at end of file
@@ -0,0 +1,93 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.dependencies import get_db, get_workspace_id
+from app.models.models import WorkspaceSettings
+from app.models.schemas import RetrievalSettingsIn, RetrievalSettingsOut
+from app.services.export import (
+    DEFAULT_BATCH_SIZE,
+    ExportError,
+    check_export,
+    content_disposition,
+    export_arrow,
+    export_ndjson,
+)
+from app.services.fusion import FusionWeights
+from app.services.retrieval import fusion_weights_for
+from app.services.retrieval_cache import bump_corpus_version
+
+router = APIRouter()
+
+
+def _settings_out(weights: FusionWeights) -> RetrievalSettingsOut:
+    return RetrievalSettingsOut(
+        fusion_mode=weights.mode,
+        vector_weight=weights.vector,
+        keyword_weight=weights.keyword,
+        rank_weight=weights.rank,
+        rrf_k=weights.rrf_k,
+    )
+
+
+@router.get("/retrieval", response_model=RetrievalSettingsOut)
+async def get_retrieval_settings(
+    workspace_id: str = Depends(get_workspace_id),
+    db: AsyncSession = Depends(get_db),
+):
+    return _settings_out(await fusion_weights_for(db, workspace_id))
+
+
+@router.put("/retrieval", response_model=RetrievalSettingsOut)
+async def put_retrieval_settings(
+    payload: RetrievalSettingsIn,
+    workspace_id: str = Depends(get_workspace_id),
+    db: AsyncSession = Depends(get_db),
+):
+    row = await db.get(WorkspaceSettings, workspace_id)
+    if row is None:
+        row = WorkspaceSettings(workspace_id=workspace_id)
+        db.add(row)
+    row.fusion_mode = payload.fusion_mode
+    row.vector_weight = payload.vector_weight
+    row.keyword_weight = payload.keyword_weight
+    row.rank_weight = payload.rank_weight
+    row.rrf_k = payload.rrf_k
+    row.updated_at = datetime.utcnow()
+    # Cached results were ranked with the old weights.
+    await bump_corpus_version(db, workspace_id)
+    await db.commit()
+    return _settings_out(await fusion_weights_for(db, workspace_id))
+
+
+@router.get("/export")
+async def export_workspace(
+    format: str = "ndjson",
+    table: str | None = None,
+    embeddings: bool = False,
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=10_000),
+    workspace_id: str = Depends(get_workspace_id),
+):
+    """
+    Stream the workspace's documents and chunks (and optionally embeddings)
+    as NDJSON, or one table as an Arrow IPC stream (?format=arrow&table=).
+    The export reads on its own connection, not the request session.
+    """
+    try:
+        check_export(format, table)
+    except ExportError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    if format == "arrow":
+        body = export_arrow(workspace_id, table, include_embeddings=embeddings, batch_size=batch_size)
+        media_type, filename = "application/vnd.apache.arrow.stream", f"{workspace_id}-{table}.arrows"
+    else:
+        body = export_ndjson(workspace_id, include_embeddings=embeddings, batch_size=batch_size)
+        media_type, filename = "application/x-ndjson", f"{workspace_id}.ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": content_disposition(filename)},
+    )
@@ -0,0 +1,164 @@
+"""
+Maintenance commands.
+
+    python -m app.cli backfill-usable [--batch-size N]
+    python -m app.cli backfill-workspaces [--batch-size N]
+    python -m app.cli migrate-tsv
+    python -m app.cli reembed [--truncate] [--batch-size N]
+    python -m app.cli rebuild-vector-index [--type hnsw|ivfflat|none] [--storage float|halfvec|binary]
+                                           [--m N] [--ef-construction N] [--lists N]
+    python -m app.cli export WORKSPACE_ID [--format ndjson|arrow] [--table documents|chunks]
+                             [--embeddings] [--batch-size N] [--output PATH]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+from app.config import settings
+from app.db.database import engine
+from app.db.maintenance import (
+    backfill_embedding_workspaces,
+    backfill_usable_flags,
+    migrate_tsv_column,
+    reembed_chunks,
+)
+from app.db.vector_index import INDEX_TYPES, STORAGE_MODES, rebuild_vector_index
+from app.services.export import (
+    DEFAULT_BATCH_SIZE,
+    EXPORT_FORMATS,
+    EXPORT_TABLES,
+    ExportError,
+    check_export,
+    export_arrow,
+    export_ndjson,
+)
+
+
+async def _backfill_usable(args: argparse.Namespace) -> None:
+    total = await backfill_usable_flags(batch_size=args.batch_size)
+    print(f"Backfilled is_usable for {total} chunks")
+
+
+async def _backfill_workspaces(args: argparse.Namespace) -> None:
+    total = await backfill_embedding_workspaces(batch_size=args.batch_size)
+    print(f"Backfilled workspace_id for {total} chunk embeddings")
+
+
+async def _migrate_tsv(args: argparse.Namespace) -> None:
+    async with engine.begin() as conn:
+        changed = await migrate_tsv_column(conn)
+        if changed:
+            await conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_chunks_tsv ON chunks USING GIN (tsv);")
+    print("chunks.tsv converted to a generated tsvector column" if changed else "chunks.tsv is already a tsvector")
+
+
+async def _reembed(args: argparse.Namespace) -> None:
+    total = await reembed_chunks(truncate=args.truncate, batch_size=args.batch_size)
+    print(f"Re-embedded {total} chunks at {settings.embedding_dimensions} dimensions")
+
+
+async def _rebuild_vector_index(args: argparse.Namespace) -> None:
+    definition = await rebuild_vector_index(
+        args.type, storage_mode=args.storage, lists=args.lists, m=args.m, ef_construction=args.ef_construction
+    )
+    print(definition or "Vector index dropped")
+    if args.storage and args.storage != settings.vector_storage_mode:
+        print(f"Set VECTOR_STORAGE_MODE={args.storage} so retrieval queries use this index")
+
+
+async def _export(args: argparse.Namespace) -> None:
+    try:
+        check_export(args.format, args.table)
+    except ExportError as exc:
+        raise SystemExit(str(exc))
+
+    if args.format == "arrow":
+        body = export_arrow(
+            args.workspace_id, args.table, include_embeddings=args.embeddings, batch_size=args.batch_size
+        )
+    else:
+        body = export_ndjson(args.workspace_id, include_embeddings=args.embeddings, batch_size=args.batch_size)
+
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    written = 0
+    try:
+        async for data in body:
+            out.write(data)
+            written += len(data)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    print(f"Exported {written} bytes", file=sys.stderr)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill-usable", help="Compute chunks.is_usable for existing rows")
+    backfill.add_argument("--batch-size", type=int, default=5000)
+    backfill.set_defaults(handler=_backfill_usable)
+
+    workspaces = commands.add_parser(
+        "backfill-workspaces", help="Copy documents.workspace_id onto existing chunk_embeddings rows"
+    )
+    workspaces.add_argument("--batch-size", type=int, default=5000)
+    workspaces.set_defaults(handler=_backfill_workspaces)
+
+    migrate_tsv = commands.add_parser(
+        "migrate-tsv", help="Convert chunks.tsv to an indexed generated tsvector (rewrites the table)"
+    )
+    migrate_tsv.set_defaults(handler=_migrate_tsv)
+
+    reembed = commands.add_parser(
+        "reembed",
+        help="Move chunk embeddings to EMBEDDING_DIMENSIONS (stop ingestion workers first)",
+    )
+    reembed.add_argument(
+        "--truncate",
+        action="store_true",
+        help="shorten existing text-embedding-3 vectors in SQL instead of calling the API",
+    )
+    reembed.add_argument("--batch-size", type=int, default=500)
+    reembed.set_defaults(handler=_reembed)
+
+    rebuild = commands.add_parser(
+        "rebuild-vector-index", help="Rebuild the chunk embedding ANN index concurrently and swap it in"
+    )
+    rebuild.add_argument("--type", choices=INDEX_TYPES, default=None, help="defaults to VECTOR_INDEX_TYPE")
+    rebuild.add_argument(
+        "--storage", choices=STORAGE_MODES, default=None, help="defaults to VECTOR_STORAGE_MODE"
+    )
+    rebuild.add_argument("--m", type=int, default=None)
+    rebuild.add_argument("--ef-construction", type=int, default=None)
+    rebuild.add_argument("--lists", type=int, default=None, help="ivfflat lists (default: sized from row count)")
+    rebuild.set_defaults(handler=_rebuild_vector_index)
+
+    export = commands.add_parser("export", help="Stream a workspace's documents and chunks to a file")
+    export.add_argument("workspace_id")
+    export.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    export.add_argument("--table", choices=EXPORT_TABLES, default=None, help="required for --format arrow")
+    export.add_argument("--embeddings", action="store_true", help="include chunk embeddings")
+    export.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    export.add_argument("--output", default="-", help="file path, or - for stdout")
+    export.set_defaults(handler=_export)
+
+    return parser
+
+
+async def _run(args: argparse.Namespace) -> None:
+    try:
+        await args.handler(args)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    args = build_parser().parse_args()
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,42 @@ class Settings(BaseSettings):
 
     # DB
     database_url: str = Field(..., alias="DATABASE_URL")
+    # "pgbouncer": NullPool, no prepared statement or compiled caches.
+    # "direct": persistent AsyncAdaptedQueuePool with warm connections and caches.
+    db_pool_mode: str = Field(default="pgbouncer")
+    db_pool_size: int = Field(default=10)
+    db_max_overflow: int = Field(default=10)
+    db_pool_timeout: float = Field(default=30.0)
+    db_pool_recycle: int = Field(default=1800)
+    db_statement_cache_size: int = Field(default=500)
 
     # OpenAI
     openai_api_key: str = Field(..., alias="OPENAI_API_KEY")
     embedding_model: str = Field(default="text-embedding-3-small")
+    # text-embedding-3 models can return shortened (Matryoshka) vectors.
+    # Changing this on an existing database needs `python -m app.cli reembed`.
+    embedding_dimensions: int = Field(default=1536)
     chat_model: str = Field(default="gpt-4o-mini")
+    # Prompt tokens spent on retrieved context (counted with chat_model's tokenizer).
+    context_max_tokens: int = Field(default=2000)
+    # Also send the ±N chunks around each retrieved chunk (0 disables).
+    context_window_chunks: int = Field(default=1)
+
+    # Embedding client ("openai", or "fake" for local benchmarking)
+    embedding_provider: str = Field(default="openai")
+    embedding_max_batch_items: int = Field(default=256)
+    embedding_max_batch_tokens: int = Field(default=60000)
+    embedding_max_concurrency: int = Field(default=4)
+    embedding_max_retries: int = Field(default=6)
+
+    # Embedding cache
+    embedding_cache_size: int = Field(default=4096)
+    embedding_cache_ttl_seconds: int = Field(default=86400)
+    embedding_cache_persistent: bool = Field(default=False)
+    # The Postgres tier follows the same policy as the in-process LRU: rows
+    # expire after embedding_cache_ttl_seconds and the least recently used
+    # beyond this many are pruned.
+    embedding_cache_persistent_max_entries: int = Field(default=500_000)
 
     # App
     app_env: str = Field(default="dev", alias="APP_ENV")
@@ -21,8 +52,63 @@ class Settings(BaseSettings):
     # Files
     upload_dir: str = Field(default="./uploads", alias="UPLOAD_DIR")
 
+    # Ingestion queue
+    # When true the web process also drains the queue; set false when running
+    # `python -m app.worker` separately.
+    ingestion_inline_worker: bool = Field(default=True)
+    ingestion_worker_concurrency: int = Field(default=2)
+    ingestion_max_attempts: int = Field(default=3)
+    ingestion_retry_backoff_seconds: float = Field(default=10.0)
+    ingestion_retry_backoff_max_seconds: float = Field(default=600.0)
+    ingestion_lease_seconds: int = Field(default=300)
+    ingestion_poll_interval_seconds: float = Field(default=1.0)
+    # Process pool for extraction/parsing/chunking; 0 runs them in threads.
+    ingestion_process_workers: int = Field(default=2)
+    pdf_pages_per_task: int = Field(default=25)
+
     # Retrieval
     top_k: int = Field(default=8)
+    # Run the vector and keyword candidate queries concurrently on two
+    # connections; false runs them one after the other on the request's.
+    retrieval_parallel: bool = Field(default=True)
+    # Time-scoped questions rank the in-range chunks exactly when the range
+    # spans at most this many days; wider ranges filter inside the ANN scan.
+    time_filter_exact_max_days: int = Field(default=8)
+    # Default fusion of the candidate lists ("weighted" or "rrf"); workspaces
+    # can override these via PUT /v1/workspace/retrieval.
+    fusion_mode: str = Field(default="weighted")
+    fusion_vector_weight: float = Field(default=0.72)
+    fusion_keyword_weight: float = Field(default=0.18)
+    fusion_rank_weight: float = Field(default=0.10)
+    fusion_rrf_k: int = Field(default=60)
+    # Result cache keyed by workspace corpus version: "memory" or "none".
+    retrieval_cache_backend: str = Field(default="memory")
+    retrieval_cache_size: int = Field(default=1024)
+    retrieval_cache_max_bytes: int = Field(default=64 * 1024 * 1024)
+
+    # Semantic answer cache: reuse an answer when a new question's embedding
+    # is at least this cosine-similar to a cached one in the same workspace.
+    answer_cache_enabled: bool = Field(default=True)
+    answer_cache_similarity: float = Field(default=0.95)
+    answer_cache_ttl_seconds: int = Field(default=7 * 86400)
+
+    # Vector index: "hnsw", "ivfflat" or "none" (exact scans)
+    vector_index_type: str = Field(default="hnsw")
+    hnsw_m: int = Field(default=16)
+    hnsw_ef_construction: int = Field(default=64)
+    hnsw_ef_search: int = Field(default=100)
+    # Unset sizes lists from the row count when the index is (re)built.
+    ivfflat_lists: int | None = Field(default=None)
+    ivfflat_probes: int = Field(default=10)
+    # pgvector >= 0.8: keep scanning the index until enough rows pass the
+    # workspace filter ("relaxed_order", "strict_order" or "off"). Skipped
+    # automatically on older pgvector versions.
+    vector_iterative_scan: str = Field(default="relaxed_order")
+    vector_index_maintenance_work_mem: str = Field(default="512MB")
+    # First-pass ANN precision: "float", "halfvec" or "binary" (quantized
+    # modes re-rank vector_rerank_factor x candidates with the float vectors).
+    vector_storage_mode: str = Field(default="float")
+    vector_rerank_factor: int = Field(default=4)
 
     @property
     def cors_origins_list(self) -> list[str]:
@@ -1,12 +1,14 @@
 import ssl
+import time
 from uuid import uuid4
 from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
 from app.config import settings
+from app.metrics import Metric, register_collector
 
 
 class Base(DeclarativeBase):
@@ -42,19 +44,83 @@ ssl_context.check_hostname = False
 ssl_context.verify_mode = ssl.CERT_NONE
 
 
-engine = create_async_engine(
-    pgbouncer_safe_url(settings.database_url),
-    poolclass=NullPool,
-    pool_pre_ping=True,
-    connect_args={
-        "ssl": ssl_context,
-        "statement_cache_size": 0,
-        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
-    },
-    execution_options={
-        "compiled_cache": None,
-    },
-)
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long callers wait for a connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.checkouts_total = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            self.checkouts_total += 1
+
+
+def build_engine(pool_mode: str | None = None) -> AsyncEngine:
+    pool_mode = pool_mode or settings.db_pool_mode
+
+    if pool_mode == "pgbouncer":
+        # PgBouncer (transaction pooling) cannot keep server-side prepared
+        # statements, so disable every cache and open a fresh connection per use.
+        return create_async_engine(
+            pgbouncer_safe_url(settings.database_url),
+            poolclass=NullPool,
+            pool_pre_ping=True,
+            connect_args={
+                "ssl": ssl_context,
+                "statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            },
+            execution_options={
+                "compiled_cache": None,
+            },
+        )
+
+    if pool_mode == "direct":
+        return create_async_engine(
+            normalize_db_url(settings.database_url),
+            poolclass=MeteredQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=True,
+            connect_args={
+                "ssl": ssl_context,
+                "statement_cache_size": settings.db_statement_cache_size,
+            },
+        )
+
+    raise ValueError(f"Unsupported db_pool_mode '{pool_mode}'. Expected 'pgbouncer' or 'direct'")
+
+
+engine = build_engine()
+
+
+@register_collector
+def pool_metrics() -> list[Metric]:
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, MeteredQueuePool):
+        return []
+    return [
+        Metric("db_pool_size", "gauge", "Configured persistent connections", pool.size()),
+        Metric("db_pool_checked_out", "gauge", "Connections currently checked out", pool.checkedout()),
+        Metric("db_pool_checked_in", "gauge", "Idle connections in the pool", pool.checkedin()),
+        Metric("db_pool_overflow", "gauge", "Overflow connections beyond pool_size", max(pool.overflow(), 0)),
+        Metric("db_pool_checkouts_total", "counter", "Connection checkouts", pool.checkouts_total),
+        Metric("db_pool_wait_seconds_total", "counter", "Time spent waiting for a connection", pool.wait_seconds_total),
+        Metric("db_pool_wait_seconds_max", "gauge", "Longest wait for a connection", pool.wait_seconds_max),
+    ]
 
 
 AsyncSessionLocal = async_sessionmaker(
@@ -0,0 +1,210 @@
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import settings
+from app.db.database import engine
+from app.db.vector_index import VECTOR_INDEX_NAME, rebuild_vector_index
+from app.models.models import TSV_EXPRESSION
+from app.services.embeddings import embed_texts
+from app.services.retrieval import USABLE_CHUNK_SQL
+from app.services.retrieval_cache import bump_all_corpus_versions
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill_usable_flags(batch_size: int = 5000) -> int:
+    """
+    Compute chunks.is_usable for rows ingested before the column existed.
+    Works in committed batches so it can run against a live database.
+    """
+    sql = text(f"""
+    WITH batch AS (
+      SELECT id FROM chunks
+      WHERE is_usable IS NULL
+      LIMIT :batch_size
+      FOR UPDATE SKIP LOCKED
+    )
+    UPDATE chunks
+    SET is_usable = ({USABLE_CHUNK_SQL})
+    FROM batch
+    WHERE chunks.id = batch.id
+    """)
+
+    total = 0
+    while True:
+        async with engine.begin() as conn:
+            result = await conn.execute(sql, {"batch_size": batch_size})
+        if not result.rowcount:
+            break
+        total += result.rowcount
+        logger.info("Backfilled is_usable for %s chunks", total)
+    if total:
+        # Unclassified chunks were retrievable; some of them no longer are.
+        async with engine.begin() as conn:
+            await bump_all_corpus_versions(conn)
+    return total
+
+
+async def backfill_embedding_workspaces(batch_size: int = 5000) -> int:
+    """
+    Copy documents.workspace_id onto chunk_embeddings rows written before
+    the column existed, in committed batches. Until then those rows are
+    invisible to vector search, so results cached meanwhile are invalidated.
+    """
+    sql = text("""
+    WITH batch AS (
+      SELECT e.chunk_id, d.workspace_id
+      FROM chunk_embeddings e
+      JOIN chunks c ON c.id = e.chunk_id
+      JOIN documents d ON d.id = c.document_id
+      WHERE e.workspace_id IS NULL
+        AND d.workspace_id IS NOT NULL
+      LIMIT :batch_size
+      FOR UPDATE OF e SKIP LOCKED
+    )
+    UPDATE chunk_embeddings e
+    SET workspace_id = batch.workspace_id
+    FROM batch
+    WHERE e.chunk_id = batch.chunk_id
+    """)
+
+    total = 0
+    while True:
+        async with engine.begin() as conn:
+            result = await conn.execute(sql, {"batch_size": batch_size})
+        if not result.rowcount:
+            break
+        total += result.rowcount
+        logger.info("Backfilled workspace_id for %s chunk embeddings", total)
+    if total:
+        async with engine.begin() as conn:
+            await bump_all_corpus_versions(conn)
+    return total
+
+
+async def migrate_tsv_column(conn: AsyncConnection) -> bool:
+    """
+    Convert the legacy chunks.tsv TEXT copy of the chunk text into a stored
+    generated tsvector column. Rewrites the table once; no-op afterwards.
+    """
+    data_type = (
+        await conn.execute(
+            text("""
+            SELECT data_type FROM information_schema.columns
+            WHERE table_name = 'chunks' AND column_name = 'tsv'
+            """)
+        )
+    ).scalar_one_or_none()
+    if data_type == "tsvector":
+        return False
+
+    logger.info("Converting chunks.tsv to a generated tsvector column")
+    await conn.exec_driver_sql("DROP INDEX IF EXISTS ix_chunks_fts_english;")
+    await conn.exec_driver_sql("ALTER TABLE chunks DROP COLUMN IF EXISTS tsv;")
+    await conn.exec_driver_sql(
+        f"ALTER TABLE chunks ADD COLUMN tsv tsvector GENERATED ALWAYS AS ({TSV_EXPRESSION}) STORED;"
+    )
+    return True
+
+
+async def embedding_column_dimensions(conn: AsyncConnection, column: str = "embedding") -> int | None:
+    """
+    Declared dimensions of a chunk_embeddings vector column (None if absent).
+    """
+    typmod = (
+        await conn.execute(
+            text("""
+            SELECT atttypmod FROM pg_attribute
+            WHERE attrelid = to_regclass('chunk_embeddings')
+              AND attname = :column
+              AND NOT attisdropped
+            """),
+            {"column": column},
+        )
+    ).scalar_one_or_none()
+    return typmod if typmod and typmod > 0 else None
+
+
+async def reembed_chunks(*, truncate: bool = False, batch_size: int = 500) -> int:
+    """
+    Move chunk_embeddings to settings.embedding_dimensions.
+
+    Vectors are written to a staging column batch by batch (resumable), then
+    swapped in and the ANN index is rebuilt. With `truncate`, existing
+    text-embedding-3 vectors are shortened in SQL (prefix + re-normalize,
+    which is what the API's `dimensions` parameter returns); otherwise chunk
+    text is re-embedded through the API. Stop ingestion workers first.
+    """
+    dims = settings.embedding_dimensions
+    async with engine.begin() as conn:
+        current = await embedding_column_dimensions(conn)
+        staged = await embedding_column_dimensions(conn, "embedding_next")
+        if truncate and current is not None and current < dims:
+            raise ValueError(f"Cannot truncate {current}-dimension vectors to {dims}")
+        if staged is not None and staged != dims:
+            await conn.exec_driver_sql("ALTER TABLE chunk_embeddings DROP COLUMN embedding_next;")
+        await conn.exec_driver_sql(f"ALTER TABLE chunk_embeddings ADD COLUMN IF NOT EXISTS embedding_next vector({dims});")
+
+    truncate_sql = text(f"""
+    WITH batch AS (
+      SELECT chunk_id FROM chunk_embeddings
+      WHERE embedding_next IS NULL
+      LIMIT :batch_size
+      FOR UPDATE SKIP LOCKED
+    )
+    UPDATE chunk_embeddings e
+    SET embedding_next = l2_normalize(subvector(e.embedding, 1, {dims}))::vector({dims})
+    FROM batch
+    WHERE e.chunk_id = batch.chunk_id
+    """)
+    pending_sql = text("""
+    SELECT e.chunk_id, c.text
+    FROM chunk_embeddings e
+    JOIN chunks c ON c.id = e.chunk_id
+    WHERE e.embedding_next IS NULL
+    ORDER BY e.chunk_id
+    LIMIT :batch_size
+    """)
+    update_sql = text("UPDATE chunk_embeddings SET embedding_next = CAST(:embedding AS vector) WHERE chunk_id = :chunk_id")
+
+    total = 0
+    while True:
+        if truncate:
+            async with engine.begin() as conn:
+                written = (await conn.execute(truncate_sql, {"batch_size": batch_size})).rowcount
+        else:
+            async with engine.connect() as conn:
+                rows = (await conn.execute(pending_sql, {"batch_size": batch_size})).all()
+            # Embed outside any transaction; API calls can take a while.
+            vectors = await embed_texts([row.text for row in rows])
+            if rows:
+                async with engine.begin() as conn:
+                    await conn.execute(
+                        update_sql,
+                        [
+                            {"chunk_id": row.chunk_id, "embedding": "[" + ",".join(map(str, vector)) + "]"}
+                            for row, vector in zip(rows, vectors)
+                        ],
+                    )
+            written = len(rows)
+        if not written:
+            break
+        total += written
+        logger.info("Re-embedded %s chunks at %s dimensions", total, dims)
+
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME};")
+        await conn.exec_driver_sql("ALTER TABLE chunk_embeddings DROP COLUMN embedding;")
+        await conn.exec_driver_sql("ALTER TABLE chunk_embeddings RENAME COLUMN embedding_next TO embedding;")
+        await conn.exec_driver_sql("ALTER TABLE chunk_embeddings ALTER COLUMN embedding SET NOT NULL;")
+        # Cached vectors have the old shape; the caches refill on demand.
+        await conn.exec_driver_sql("TRUNCATE embedding_cache;")
+        await conn.exec_driver_sql(f"ALTER TABLE embedding_cache ALTER COLUMN embedding TYPE vector({dims});")
+        await conn.exec_driver_sql("TRUNCATE answer_cache;")
+        await conn.exec_driver_sql(f"ALTER TABLE answer_cache ALTER COLUMN query_embedding TYPE vector({dims});")
+
+    if settings.vector_index_type != "none":
+        await rebuild_vector_index()
+    return total
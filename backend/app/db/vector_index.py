@@ -0,0 +1,245 @@
+"""
+ANN index management for chunk_embeddings.embedding.
+
+The index type and build parameters come from Settings; per-query search
+parameters (hnsw.ef_search / ivfflat.probes) are applied with
+apply_search_settings inside the retrieval transaction.
+"""
+import logging
+import math
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.database import engine
+from app.models.models import EMBEDDING_DIMENSIONS
+
+logger = logging.getLogger(__name__)
+
+VECTOR_INDEX_NAME = "ix_chunk_embeddings_vector_cosine"
+INDEX_TYPES = ("hnsw", "ivfflat", "none")
+STORAGE_MODES = ("float", "halfvec", "binary")
+MIN_IVFFLAT_LISTS = 10
+# Above this many embeddings a missing index is not built at startup: a
+# plain CREATE INDEX would block boot and every embedding write meanwhile.
+STARTUP_BUILD_MAX_ROWS = 10_000
+ITERATIVE_SCAN_MIN_VERSION = (0, 8)
+
+_iterative_scan_supported: bool | None = None
+
+
+def ivfflat_lists_for(rows: int) -> int:
+    """
+    pgvector's sizing guidance: rows / 1000 up to 1M rows, sqrt(rows) above.
+    """
+    if rows <= 1_000_000:
+        lists = rows // 1000
+    else:
+        lists = int(math.sqrt(rows))
+    return max(MIN_IVFFLAT_LISTS, lists)
+
+
+def indexed_expression(storage_mode: str, dimensions: int = EMBEDDING_DIMENSIONS) -> str:
+    """
+    Column expression and operator class the ANN index is built on. The
+    float vectors stay in the table for exact re-ranking; quantized modes
+    only shrink the index (halfvec: 2 bytes/dim, binary: 1 bit/dim).
+    """
+    if storage_mode == "float":
+        return "embedding vector_cosine_ops"
+    if storage_mode == "halfvec":
+        return f"(embedding::halfvec({dimensions})) halfvec_cosine_ops"
+    if storage_mode == "binary":
+        return f"(binary_quantize(embedding)::bit({dimensions})) bit_hamming_ops"
+    raise ValueError(f"Unknown vector storage mode: {storage_mode!r}")
+
+
+def vector_index_sql(
+    index_type: str,
+    *,
+    storage_mode: str | None = None,
+    name: str = VECTOR_INDEX_NAME,
+    rows: int = 0,
+    lists: int | None = None,
+    m: int | None = None,
+    ef_construction: int | None = None,
+    concurrently: bool = False,
+) -> str:
+    create = "CREATE INDEX CONCURRENTLY" if concurrently else "CREATE INDEX"
+    if index_type == "hnsw":
+        m = m or settings.hnsw_m
+        ef_construction = ef_construction or settings.hnsw_ef_construction
+        options = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+    elif index_type == "ivfflat":
+        lists = lists or settings.ivfflat_lists or ivfflat_lists_for(rows)
+        options = f"lists = {int(lists)}"
+    else:
+        raise ValueError(f"Unknown vector index type: {index_type!r}")
+    expression = indexed_expression(storage_mode or settings.vector_storage_mode)
+    return (
+        f"{create} IF NOT EXISTS {name} ON chunk_embeddings "
+        f"USING {index_type} ({expression}) WITH ({options});"
+    )
+
+
+def supports_iterative_scan(extversion: str | None) -> bool:
+    try:
+        version = tuple(int(part) for part in (extversion or "").split(".")[:2])
+    except ValueError:
+        return False
+    return version >= ITERATIVE_SCAN_MIN_VERSION
+
+
+async def load_pgvector_version(conn) -> None:
+    """
+    Read the installed pgvector version once; iterative scans are only
+    requested from 0.8 on, where the GUCs exist.
+    """
+    global _iterative_scan_supported
+    extversion = (
+        await conn.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'"))
+    ).scalar_one_or_none()
+    _iterative_scan_supported = supports_iterative_scan(extversion)
+    if not _iterative_scan_supported and settings.vector_iterative_scan != "off":
+        logger.warning(
+            "pgvector %s has no iterative index scans (needs 0.8+); ignoring VECTOR_ITERATIVE_SCAN=%s",
+            extversion,
+            settings.vector_iterative_scan,
+        )
+
+
+async def apply_search_settings(db: AsyncSession) -> None:
+    """
+    Set ANN search breadth (and iterative scans, so workspace-filtered
+    searches still fill their LIMIT) for the current transaction only, which
+    is safe behind PgBouncer transaction pooling.
+    """
+    if _iterative_scan_supported is None:
+        await load_pgvector_version(db)
+    params = {"ef_search": str(settings.hnsw_ef_search), "probes": str(settings.ivfflat_probes)}
+    sql = "SELECT set_config('hnsw.ef_search', :ef_search, true), set_config('ivfflat.probes', :probes, true)"
+    if settings.vector_iterative_scan != "off" and _iterative_scan_supported:
+        sql += (
+            ", set_config('hnsw.iterative_scan', :iterative_scan, true)"
+            ", set_config('ivfflat.iterative_scan', :ivfflat_iterative_scan, true)"
+        )
+        params["iterative_scan"] = settings.vector_iterative_scan
+        # ivfflat only supports relaxed ordering.
+        params["ivfflat_iterative_scan"] = "relaxed_order"
+    await db.execute(text(sql), params)
+
+
+async def _count_embeddings(conn) -> int:
+    # Planner estimate is plenty for sizing lists and avoids a full count.
+    estimate = (
+        await conn.execute(text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'chunk_embeddings'"))
+    ).scalar()
+    if estimate is None or estimate < 0:
+        estimate = (await conn.execute(text("SELECT count(*) FROM chunk_embeddings"))).scalar()
+    return int(estimate or 0)
+
+
+async def _index_definition(conn, name: str = VECTOR_INDEX_NAME) -> str | None:
+    return (
+        await conn.execute(text("SELECT indexdef FROM pg_indexes WHERE indexname = :name"), {"name": name})
+    ).scalar_one_or_none()
+
+
+async def ensure_vector_index() -> None:
+    """
+    Startup hook: record the pgvector version and create the configured
+    index when it is missing and the table is small. On a larger table it
+    only warns; `python -m app.cli rebuild-vector-index` builds it
+    concurrently. An
+    existing index of another type is left in place (rebuilding can take a
+    long time); run `python -m app.cli rebuild-vector-index` to switch.
+    """
+    index_type = settings.vector_index_type
+    try:
+        async with engine.connect() as conn:
+            await load_pgvector_version(conn)
+    except Exception as exc:
+        logger.warning("Could not read the pgvector version: %s", exc)
+    if index_type == "none":
+        return
+    try:
+        async with engine.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            # Left behind by an earlier schema; L2 opclass, never used by cosine search.
+            await conn.exec_driver_sql("DROP INDEX IF EXISTS ix_chunk_embeddings_vector;")
+            existing = await _index_definition(conn)
+            if existing is None:
+                rows = await _count_embeddings(conn)
+                if rows > STARTUP_BUILD_MAX_ROWS:
+                    logger.warning(
+                        "%s is missing and chunk_embeddings has ~%s rows; vector search runs exact scans "
+                        "until `python -m app.cli rebuild-vector-index` builds it",
+                        VECTOR_INDEX_NAME,
+                        rows,
+                    )
+                    return
+                await conn.exec_driver_sql(vector_index_sql(index_type, rows=rows))
+                logger.info("Created %s vector index %s", index_type, VECTOR_INDEX_NAME)
+            else:
+                opclass = indexed_expression(settings.vector_storage_mode).split()[-1]
+                if f"USING {index_type} " not in existing or opclass not in existing:
+                    logger.warning(
+                        "%s does not match VECTOR_INDEX_TYPE=%s / VECTOR_STORAGE_MODE=%s (%s); "
+                        "run `python -m app.cli rebuild-vector-index` to rebuild it",
+                        VECTOR_INDEX_NAME,
+                        index_type,
+                        settings.vector_storage_mode,
+                        existing,
+                    )
+    except Exception as exc:
+        logger.warning("Skipping vector index %s: %s", VECTOR_INDEX_NAME, exc)
+
+
+async def rebuild_vector_index(
+    index_type: str | None = None,
+    *,
+    storage_mode: str | None = None,
+    lists: int | None = None,
+    m: int | None = None,
+    ef_construction: int | None = None,
+) -> str:
+    """
+    Build a replacement index concurrently, then swap it in, so searches keep
+    using the old index until the new one is ready. Returns its definition.
+    """
+    index_type = index_type or settings.vector_index_type
+    tmp_name = f"{VECTOR_INDEX_NAME}_new"
+
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(
+            text("SELECT set_config('maintenance_work_mem', :mem, false)"),
+            {"mem": settings.vector_index_maintenance_work_mem},
+        )
+        await conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {tmp_name};")
+
+        if index_type == "none":
+            await conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {VECTOR_INDEX_NAME};")
+            return ""
+
+        rows = await _count_embeddings(conn)
+        sql = vector_index_sql(
+            index_type,
+            name=tmp_name,
+            storage_mode=storage_mode,
+            rows=rows,
+            lists=lists,
+            m=m,
+            ef_construction=ef_construction,
+            concurrently=True,
+        )
+        logger.info("Building %s over ~%s embeddings: %s", tmp_name, rows, sql)
+        await conn.exec_driver_sql(sql)
+
+        await conn.exec_driver_sql("BEGIN;")
+        await conn.exec_driver_sql(f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME};")
+        await conn.exec_driver_sql(f"ALTER INDEX {tmp_name} RENAME TO {VECTOR_INDEX_NAME};")
+        await conn.exec_driver_sql("COMMIT;")
+
+        return await _index_definition(conn) or ""
@@ -1,17 +1,51 @@
+import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.config import settings
 from app.db.database import engine, Base
+from app.db.maintenance import (
+    backfill_embedding_workspaces,
+    backfill_usable_flags,
+    embedding_column_dimensions,
+    migrate_tsv_column,
+)
+from app.db.vector_index import ensure_vector_index
 from app.api import router as api_router
+from app.metrics import render_prometheus
+from app.services.ingestion.executor import shutdown_process_pool
+from app.worker import IngestionWorker
 
 logger = logging.getLogger(__name__)
 
 
+async def _backfill_existing_rows() -> None:
+    try:
+        total = await backfill_usable_flags()
+        if total:
+            logger.info("Backfilled is_usable for %s existing chunks", total)
+    except Exception as exc:
+        logger.warning("Skipping is_usable backfill (run `python -m app.cli backfill-usable`): %s", exc)
+
+
+async def _backfill_embedding_workspaces() -> None:
+    # Vector search filters on chunk_embeddings.workspace_id, so rows from
+    # before the column existed must be filled in before serving.
+    try:
+        total = await backfill_embedding_workspaces()
+        if total:
+            logger.info("Backfilled workspace_id for %s existing chunk embeddings", total)
+    except Exception as exc:
+        logger.warning(
+            "Skipping chunk_embeddings.workspace_id backfill (run `python -m app.cli backfill-workspaces`): %s", exc
+        )
+
+
 async def _create_optional_index(sql: str, name: str) -> None:
     try:
         async with engine.connect() as conn:
@@ -30,6 +64,29 @@ async def lifespan(app: FastAPI):
         await conn.run_sync(Base.metadata.create_all)
         await conn.exec_driver_sql("ALTER TABLE documents ADD COLUMN IF NOT EXISTS workspace_id VARCHAR(120);")
         await conn.exec_driver_sql("ALTER TABLE conversations ADD COLUMN IF NOT EXISTS workspace_id VARCHAR(120);")
+        await conn.exec_driver_sql("ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);")
+        await conn.exec_driver_sql("ALTER TABLE chunks ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);")
+        await conn.exec_driver_sql("ALTER TABLE chunks ADD COLUMN IF NOT EXISTS page_number INTEGER;")
+        await conn.exec_driver_sql("ALTER TABLE chunks ADD COLUMN IF NOT EXISTS is_usable BOOLEAN;")
+        await conn.exec_driver_sql("ALTER TABLE chunk_embeddings ADD COLUMN IF NOT EXISTS workspace_id VARCHAR(120);")
+        await conn.exec_driver_sql("ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS pages_processed INTEGER;")
+        await conn.exec_driver_sql("ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS pages_total INTEGER;")
+        await conn.exec_driver_sql("ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS workspace_id VARCHAR(120);")
+        await conn.exec_driver_sql("ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS payload JSON;")
+        await conn.exec_driver_sql("ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;")
+        await conn.exec_driver_sql("ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS run_after TIMESTAMPTZ NOT NULL DEFAULT now();")
+        await conn.exec_driver_sql("ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS locked_by VARCHAR(120);")
+        await conn.exec_driver_sql("ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;")
+        await conn.exec_driver_sql("ALTER TABLE embedding_cache ADD COLUMN IF NOT EXISTS last_used_at TIMESTAMPTZ NOT NULL DEFAULT now();")
+        await migrate_tsv_column(conn)
+        stored_dimensions = await embedding_column_dimensions(conn)
+        if stored_dimensions and stored_dimensions != settings.embedding_dimensions:
+            logger.error(
+                "chunk_embeddings holds %s-dimension vectors but EMBEDDING_DIMENSIONS=%s; "
+                "run `python -m app.cli reembed` before serving traffic",
+                stored_dimensions,
+                settings.embedding_dimensions,
+            )
         await conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_documents_workspace_id ON documents (workspace_id);")
         await conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_conversations_workspace_id ON conversations (workspace_id);")
 
@@ -38,16 +95,79 @@ async def lifespan(app: FastAPI):
         "ix_documents_workspace_status",
     )
     await _create_optional_index(
-        "CREATE INDEX IF NOT EXISTS ix_chunks_fts_english ON chunks USING GIN (to_tsvector('english', COALESCE(tsv, text)) );",
-        "ix_chunks_fts_english",
+        "CREATE INDEX IF NOT EXISTS ix_documents_workspace_content_hash ON documents (workspace_id, content_hash);",
+        "ix_documents_workspace_content_hash",
+    )
+    await _create_optional_index(
+        "CREATE INDEX IF NOT EXISTS ix_documents_workspace_source_uri ON documents (workspace_id, source_uri);",
+        "ix_documents_workspace_source_uri",
+    )
+    # Keyset pagination on (created_at, id) and time-scoped retrieval (see
+    # retrieval.time_range_clause); supersedes the two-column index.
+    await _create_optional_index(
+        "CREATE INDEX IF NOT EXISTS ix_documents_workspace_created_id ON documents (workspace_id, created_at, id);",
+        "ix_documents_workspace_created_id",
+    )
+    await _create_optional_index(
+        "DROP INDEX IF EXISTS ix_documents_workspace_created_at;",
+        "ix_documents_workspace_created_at",
+    )
+    await _create_optional_index(
+        "CREATE INDEX IF NOT EXISTS ix_conversations_workspace_created_id "
+        "ON conversations (workspace_id, created_at, id);",
+        "ix_conversations_workspace_created_id",
     )
     await _create_optional_index(
-        "CREATE INDEX IF NOT EXISTS ix_chunk_embeddings_vector_cosine ON chunk_embeddings USING ivfflat (embedding vector_cosine_ops) WITH (lists = 10);",
-        "ix_chunk_embeddings_vector_cosine",
+        "CREATE INDEX IF NOT EXISTS ix_documents_workspace_published_at "
+        "ON documents (workspace_id, source_published_at) WHERE source_published_at IS NOT NULL;",
+        "ix_documents_workspace_published_at",
     )
+    await _create_optional_index(
+        "CREATE INDEX IF NOT EXISTS ix_ingestion_jobs_claimable ON ingestion_jobs (run_after, created_at) WHERE is_active;",
+        "ix_ingestion_jobs_claimable",
+    )
+    await _create_optional_index(
+        "CREATE INDEX IF NOT EXISTS ix_chunks_usable_or_unclassified_document "
+        "ON chunks (document_id, chunk_index) WHERE is_usable IS NOT FALSE;",
+        "ix_chunks_usable_or_unclassified_document",
+    )
+    await _create_optional_index("DROP INDEX IF EXISTS ix_chunks_usable_document;", "ix_chunks_usable_document")
+    await _create_optional_index(
+        "CREATE INDEX IF NOT EXISTS ix_chunks_tsv ON chunks USING GIN (tsv);",
+        "ix_chunks_tsv",
+    )
+    await _create_optional_index("CREATE EXTENSION IF NOT EXISTS pg_trgm;", "pg_trgm")
+    await _create_optional_index(
+        "CREATE INDEX IF NOT EXISTS ix_chunks_text_trgm ON chunks USING GIN (text gin_trgm_ops);",
+        "ix_chunks_text_trgm",
+    )
+    await _create_optional_index(
+        "CREATE INDEX IF NOT EXISTS ix_chunk_embeddings_workspace ON chunk_embeddings (workspace_id);",
+        "ix_chunk_embeddings_workspace",
+    )
+    await _create_optional_index(
+        "CREATE INDEX IF NOT EXISTS ix_embedding_cache_last_used ON embedding_cache (last_used_at);",
+        "ix_embedding_cache_last_used",
+    )
+    await ensure_vector_index()
+
+    await _backfill_embedding_workspaces()
+    backfill_task = asyncio.create_task(_backfill_existing_rows())
+
+    worker = None
+    worker_task = None
+    if settings.ingestion_inline_worker:
+        worker = IngestionWorker()
+        worker_task = asyncio.create_task(worker.run())
 
     yield
 
+    backfill_task.cancel()
+    if worker is not None:
+        worker.stop()
+        await worker_task
+
+    shutdown_process_pool()
     await engine.dispose()
 
 
@@ -60,6 +180,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "Server-Timing"],
 )
 
 app.include_router(api_router, prefix="/v1")
@@ -70,6 +191,11 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return render_prometheus()
+
+
 @app.get("/")
 async def root():
     return {"service": "SecondBrain", "status": "running"}
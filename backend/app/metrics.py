@@ -0,0 +1,55 @@
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+
+@dataclass
+class Metric:
+    name: str
+    kind: str  # "counter" | "gauge"
+    help: str
+    value: float
+
+
+Collector = Callable[[], Iterable[Metric]]
+
+_collectors: list[Collector] = []
+
+
+def register_collector(collector: Collector) -> Collector:
+    """
+    Register a callable that yields Metric values at scrape time.
+    Usable as a decorator.
+    """
+    if collector not in _collectors:
+        _collectors.append(collector)
+    return collector
+
+
+def render_prometheus(collectors: Iterable[Collector] | None = None) -> str:
+    """
+    Render all registered metrics in the Prometheus text exposition format.
+    Metrics reported under the same name by several collectors are summed
+    into one sample, since a family may only appear once.
+    """
+    families: dict[str, Metric] = {}
+    for collector in collectors if collectors is not None else _collectors:
+        for metric in collector():
+            family = families.get(metric.name)
+            if family is None:
+                families[metric.name] = Metric(metric.name, metric.kind, metric.help, metric.value)
+            else:
+                family.value += metric.value
+
+    lines: list[str] = []
+    for metric in families.values():
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.append(f"{metric.name} {_format_value(metric.value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    # :g keeps only 6 significant digits, which freezes large counters.
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    return repr(float(value))
@@ -2,6 +2,10 @@ from app.models.models import (
     Document,
     Chunk,
     ChunkEmbedding,
+    EmbeddingCacheEntry,
+    AnswerCacheEntry,
+    WorkspaceVersion,
+    WorkspaceSettings,
     Conversation,
     Message,
     IngestionJob,
@@ -11,6 +15,10 @@ __all__ = [
     "Document",
     "Chunk",
     "ChunkEmbedding",
+    "EmbeddingCacheEntry",
+    "AnswerCacheEntry",
+    "WorkspaceVersion",
+    "WorkspaceSettings",
     "Conversation",
     "Message",
     "IngestionJob",
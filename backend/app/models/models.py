@@ -5,18 +5,26 @@ from sqlalchemy import (
     String,
     Text,
     Integer,
+    BigInteger,
+    Float,
     DateTime,
     ForeignKey,
     Enum,
     Boolean,
     JSON,
     Index,
+    Computed,
 )
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from pgvector.sqlalchemy import Vector
 
+from app.config import settings
 from app.db.database import Base
 
+TSV_EXPRESSION = "to_tsvector('english', text)"
+EMBEDDING_DIMENSIONS = settings.embedding_dimensions
+
 
 class SourceType(str, enum.Enum):
     text = "text"
@@ -58,6 +66,8 @@ class Document(Base):
     source_uri: Mapped[str | None] = mapped_column(String(2048), nullable=True)
     mime_type: Mapped[str | None] = mapped_column(String(200), nullable=True)
     size_bytes: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # sha256 of the uploaded bytes / text, or of the extracted page text for URLs
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
 
     status: Mapped[DocumentStatus] = mapped_column(Enum(DocumentStatus), default=DocumentStatus.processing)
     error: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -81,30 +91,104 @@ class Chunk(Base):
     text: Mapped[str] = mapped_column(Text, nullable=False)
 
     token_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    # 1-based page the chunk starts on (paged sources only)
+    page_number: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # retrieval quality gate, computed at ingestion (see retrieval.is_usable_chunk_text)
+    is_usable: Mapped[bool | None] = mapped_column(Boolean, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
-    # keyword search
-    # We'll fill this via raw SQL in pipeline to avoid PG generated column complexity in take-home
-    tsv: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # keyword search: maintained by Postgres, GIN-indexed (ix_chunks_tsv)
+    tsv: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(TSV_EXPRESSION, persisted=True),
+        nullable=True,
+    )
 
     document: Mapped["Document"] = relationship(back_populates="chunks")
     embedding: Mapped["ChunkEmbedding"] = relationship(back_populates="chunk", uselist=False, cascade="all, delete-orphan")
 
 
 Index("ix_chunks_doc_chunk_index", Chunk.document_id, Chunk.chunk_index)
+Index("ix_chunks_tsv", Chunk.tsv, postgresql_using="gin")
 
 
 class ChunkEmbedding(Base):
     __tablename__ = "chunk_embeddings"
 
     chunk_id: Mapped[int] = mapped_column(ForeignKey("chunks.id", ondelete="CASCADE"), primary_key=True)
-    embedding: Mapped[list[float]] = mapped_column(Vector(1536), nullable=False)
+    embedding: Mapped[list[float]] = mapped_column(Vector(EMBEDDING_DIMENSIONS), nullable=False)
+    # Copy of documents.workspace_id so vector search can filter before ranking.
+    workspace_id: Mapped[str | None] = mapped_column(String(120), nullable=True)
 
     chunk: Mapped["Chunk"] = relationship(back_populates="embedding")
 
 
-Index("ix_chunk_embeddings_vector", ChunkEmbedding.embedding, postgresql_using="ivfflat")
+Index("ix_chunk_embeddings_workspace", ChunkEmbedding.workspace_id)
+
+# The ANN index (ix_chunk_embeddings_vector_cosine) is managed by
+# app.db.vector_index so its type and parameters follow Settings.
+
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+
+    # sha256 of (model, dimensions, normalized text)
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    model: Mapped[str] = mapped_column(String(120), nullable=False)
+    embedding: Mapped[list[float]] = mapped_column(Vector(EMBEDDING_DIMENSIONS), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    # Bumped on lookup hits; the prune keeps the most recently used rows.
+    last_used_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+
+
+class AnswerCacheEntry(Base):
+    __tablename__ = "answer_cache"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    workspace_id: Mapped[str] = mapped_column(String(120), nullable=False, index=True)
+    query: Mapped[str] = mapped_column(Text, nullable=False)
+    query_embedding: Mapped[list[float]] = mapped_column(Vector(EMBEDDING_DIMENSIONS), nullable=False)
+    chat_model: Mapped[str] = mapped_column(String(120), nullable=False)
+    answer: Mapped[str] = mapped_column(Text, nullable=False)
+    citations: Mapped[list] = mapped_column(JSON, nullable=False)
+    # Cited documents; any change to one of them drops the entry.
+    document_ids: Mapped[list[int]] = mapped_column(ARRAY(Integer), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+
+
+Index("ix_answer_cache_document_ids", AnswerCacheEntry.document_ids, postgresql_using="gin")
+
+
+class WorkspaceVersion(Base):
+    """
+    Corpus version per workspace, bumped whenever the set of retrievable
+    chunks changes; result caches key on it.
+    """
+
+    __tablename__ = "workspace_versions"
+
+    workspace_id: Mapped[str] = mapped_column(String(120), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+
+
+class WorkspaceSettings(Base):
+    """
+    Per-workspace retrieval overrides; NULL columns use the global defaults
+    (see app.services.retrieval.fusion_weights_for).
+    """
+
+    __tablename__ = "workspace_settings"
+
+    workspace_id: Mapped[str] = mapped_column(String(120), primary_key=True)
+    fusion_mode: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    vector_weight: Mapped[float | None] = mapped_column(Float, nullable=True)
+    keyword_weight: Mapped[float | None] = mapped_column(Float, nullable=True)
+    rank_weight: Mapped[float | None] = mapped_column(Float, nullable=True)
+    rrf_k: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
 
 class Conversation(Base):
@@ -142,9 +226,19 @@ class IngestionJob(Base):
 
     status: Mapped[JobStatus] = mapped_column(Enum(JobStatus), default=JobStatus.queued)
     stage: Mapped[JobStage] = mapped_column(Enum(JobStage), default=JobStage.extract)
+    pages_processed: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    pages_total: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
 
+    # queue bookkeeping (see app.services.ingestion.queue)
+    workspace_id: Mapped[str | None] = mapped_column(String(120), nullable=True)
+    payload: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    run_after: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    locked_by: Mapped[str | None] = mapped_column(String(120), nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
     error: Mapped[str | None] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
@@ -1,5 +1,7 @@
 from datetime import datetime
-from pydantic import BaseModel, Field
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class IngestTextIn(BaseModel):
@@ -11,6 +13,8 @@ class IngestUrlIn(BaseModel):
     url: str
 
 class DocumentOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     title: str | None
     source_type: str
@@ -29,6 +33,8 @@ class JobOut(BaseModel):
     status: str
     stage: str
     error: str | None
+    pages_processed: int | None = None
+    pages_total: int | None = None
 
 
 class ChatIn(BaseModel):
@@ -53,4 +59,22 @@ class ChunkOut(BaseModel):
     document_id: int
     chunk_index: int
     text: str
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+    page_number: int | None = None
+
+
+class RetrievalSettingsIn(BaseModel):
+    # Omitted (null) fields fall back to the server-wide defaults.
+    fusion_mode: Literal["weighted", "rrf"] | None = None
+    vector_weight: float | None = Field(default=None, ge=0)
+    keyword_weight: float | None = Field(default=None, ge=0)
+    rank_weight: float | None = Field(default=None, ge=0)
+    rrf_k: int | None = Field(default=None, ge=1)
+
+
+class RetrievalSettingsOut(BaseModel):
+    fusion_mode: str
+    vector_weight: float
+    keyword_weight: float
+    rank_weight: float
+    rrf_k: int
@@ -0,0 +1,118 @@
+"""
+Semantic answer cache.
+
+Answers are stored with their query embedding in answer_cache and reused
+for later questions in the same workspace whose embedding is within
+ANSWER_CACHE_SIMILARITY of a stored one, skipping retrieval and the LLM.
+An entry is dropped as soon as any document it cites is re-ingested,
+fails or is deleted. Time-scoped questions ("what did I save yesterday")
+bypass the cache: a similar embedding says nothing about the date range.
+"""
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.metrics import Metric, register_collector
+from app.models.models import AnswerCacheEntry
+from app.services.timeparse import parse_time_range
+
+_REPLAY_TOKEN = re.compile(r"\s*\S+|\s+")
+
+_hits = 0
+_misses = 0
+
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    citations: list[dict]
+    similarity: float
+
+
+def is_cacheable(query: str) -> bool:
+    return settings.answer_cache_enabled and parse_time_range(query) is None
+
+
+def replay_tokens(answer: str) -> list[str]:
+    """
+    Split a cached answer into word-sized pieces (leading whitespace kept)
+    so it can be streamed like a live completion.
+    """
+    return _REPLAY_TOKEN.findall(answer) or [answer]
+
+
+async def lookup_answer(
+    db: AsyncSession,
+    workspace_id: str,
+    query: str,
+    query_embedding: list[float],
+) -> CachedAnswer | None:
+    global _hits, _misses
+    if not is_cacheable(query):
+        return None
+
+    distance = AnswerCacheEntry.query_embedding.cosine_distance(query_embedding)
+    conditions = [
+        AnswerCacheEntry.workspace_id == workspace_id,
+        AnswerCacheEntry.chat_model == settings.chat_model,
+    ]
+    if settings.answer_cache_ttl_seconds:
+        conditions.append(
+            AnswerCacheEntry.created_at > datetime.utcnow() - timedelta(seconds=settings.answer_cache_ttl_seconds)
+        )
+    row = (
+        await db.execute(
+            select(AnswerCacheEntry.answer, AnswerCacheEntry.citations, distance.label("distance"))
+            .where(*conditions)
+            .order_by(distance)
+            .limit(1)
+        )
+    ).first()
+
+    if row is None or 1 - row.distance < settings.answer_cache_similarity:
+        _misses += 1
+        return None
+    _hits += 1
+    return CachedAnswer(answer=row.answer, citations=row.citations or [], similarity=1 - row.distance)
+
+
+def store_answer(
+    db: AsyncSession,
+    workspace_id: str,
+    query: str,
+    query_embedding: list[float],
+    answer: str,
+    citations: list[dict],
+) -> None:
+    """
+    Add an entry to the session; it commits with the assistant message.
+    """
+    if not citations or not is_cacheable(query):
+        return
+    db.add(
+        AnswerCacheEntry(
+            workspace_id=workspace_id,
+            query=query,
+            query_embedding=query_embedding,
+            chat_model=settings.chat_model,
+            answer=answer,
+            citations=citations,
+            document_ids=sorted({c["document_id"] for c in citations}),
+        )
+    )
+
+
+async def invalidate_document(db: AsyncSession, document_id: int) -> None:
+    await db.execute(delete(AnswerCacheEntry).where(AnswerCacheEntry.document_ids.contains([document_id])))
+
+
+@register_collector
+def answer_cache_metrics() -> list[Metric]:
+    return [
+        Metric("answer_cache_hits_total", "counter", "Chat answers served from the semantic cache", _hits),
+        Metric("answer_cache_misses_total", "counter", "Chat questions with no similar cached answer", _misses),
+    ]
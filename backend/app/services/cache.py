@@ -0,0 +1,136 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Protocol
+
+
+def normalize_whitespace(text: str) -> str:
+    return " ".join(text.split())
+
+
+def normalize_for_cache(text: str) -> str:
+    """
+    Key normalization for query-level caches, where case does not change
+    the answer. Embedding keys must not casefold (see normalize_whitespace).
+    """
+    return normalize_whitespace(text).casefold()
+
+
+class LRUCache:
+    """
+    In-process LRU cache with optional TTL and hit/miss counters.
+    Bounded by entry count and, when a `weigher` is given, by total weight
+    (e.g. approximate bytes). Not thread-safe; meant to be used from a
+    single event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        weigher: Callable[[Any], int] | None = None,
+        max_weight: int | None = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._weigher = weigher
+        self.max_weight = max_weight
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._weights: dict[Hashable, int] = {}
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+
+        stored_at, value = item
+        if self.ttl_seconds is not None and self._clock() - stored_at > self.ttl_seconds:
+            self.delete(key)
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        if self._weigher is not None:
+            weight = self._weigher(value)
+            if self.max_weight is not None and weight > self.max_weight:
+                return
+            self.weight += weight - self._weights.get(key, 0)
+            self._weights[key] = weight
+        self._data[key] = (self._clock(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries or (
+            self.max_weight is not None and self.weight > self.max_weight
+        ):
+            oldest, _ = self._data.popitem(last=False)
+            self.weight -= self._weights.pop(oldest, 0)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+        self.weight -= self._weights.pop(key, 0)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._weights.clear()
+        self.weight = 0
+
+
+def stable_key(*parts: Any) -> str:
+    """
+    sha256 over a canonical JSON encoding of the parts.
+    """
+    encoded = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(Protocol):
+    """
+    Async key/value store behind result caches, so an out-of-process store
+    (e.g. Redis) can replace the in-process default.
+    """
+
+    async def get(self, key: str) -> Any | None: ...
+
+    async def set(self, key: str, value: Any) -> None: ...
+
+
+class MemoryCacheBackend:
+    def __init__(self, lru: LRUCache):
+        self.lru = lru
+
+    def __len__(self) -> int:
+        return len(self.lru)
+
+    async def get(self, key: str) -> Any | None:
+        return self.lru.get(key)
+
+    async def set(self, key: str, value: Any) -> None:
+        self.lru.set(key, value)
+
+
+class NullCacheBackend:
+    def __len__(self) -> int:
+        return 0
+
+    async def get(self, key: str) -> Any | None:
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        return None
@@ -7,6 +7,7 @@ class Chunk:
     index: int
     text: str
     token_count: int | None = None
+    page_number: int | None = None
 
 
 def normalize_text(text: str) -> str:
@@ -62,26 +63,41 @@ def _tail_sentences(text: str, max_chars: int) -> str:
     return " ".join(reversed(tail)).strip()
 
 
-def chunk_text(text: str, max_chars: int = 1400, overlap: int = 220) -> list[Chunk]:
-    """Create chunks on paragraph/sentence boundaries with light semantic overlap."""
-    text = normalize_text(text)
-    if not text:
-        return []
-
-    units = _split_units(text)
-    chunks: list[Chunk] = []
-    current: list[str] = []
-    current_len = 0
-
-    for unit in units:
-        separator_len = 2 if current else 0
-        if current and current_len + separator_len + len(unit) > max_chars:
-            chunk = "\n\n".join(current).strip()
-            chunks.append(Chunk(index=len(chunks), text=chunk))
-
-            overlap_text = _tail_sentences(chunk, overlap)
-            current = [overlap_text] if overlap_text else []
-            current_len = len(overlap_text)
+class StreamingChunker:
+    """
+    Incremental form of chunk_text: feed text segments (e.g. PDF pages) one
+    at a time and collect finished chunks as they complete, so only the
+    chunk being built is held in memory. Each chunk records the page its
+    first unit came from. Plain state only, so it can be pickled across
+    process-pool calls.
+    """
+
+    def __init__(self, max_chars: int = 1400, overlap: int = 220):
+        self.max_chars = max_chars
+        self.overlap = overlap
+        self._current: list[str] = []
+        self._current_len = 0
+        self._current_page: int | None = None
+        self._last_page: int | None = None
+        self._next_index = 0
+
+    def _emit(self, out: list[Chunk], text: str, page_number: int | None) -> None:
+        out.append(Chunk(index=self._next_index, text=text, page_number=page_number))
+        self._next_index += 1
+
+    def _add_unit(self, out: list[Chunk], unit: str, page_number: int | None) -> None:
+        max_chars = self.max_chars
+        separator_len = 2 if self._current else 0
+        if self._current and self._current_len + separator_len + len(unit) > max_chars:
+            chunk = "\n\n".join(self._current).strip()
+            self._emit(out, chunk, self._current_page)
+
+            overlap_text = _tail_sentences(chunk, self.overlap)
+            self._current = [overlap_text] if overlap_text else []
+            self._current_len = len(overlap_text)
+            self._current_page = self._last_page if overlap_text else None
+
+        self._last_page = page_number
 
         if len(unit) > max_chars:
             start = 0
@@ -89,20 +105,56 @@ def chunk_text(text: str, max_chars: int = 1400, overlap: int = 220) -> list[Chu
                 end = min(start + max_chars, len(unit))
                 segment = unit[start:end].strip()
                 if segment:
-                    if current:
-                        chunks.append(Chunk(index=len(chunks), text="\n\n".join(current).strip()))
-                        current = []
-                        current_len = 0
-                    chunks.append(Chunk(index=len(chunks), text=segment))
+                    if self._current:
+                        self._emit(out, "\n\n".join(self._current).strip(), self._current_page)
+                        self._current = []
+                        self._current_len = 0
+                    self._emit(out, segment, page_number)
                 if end == len(unit):
                     break
-                start = max(0, end - overlap)
-            continue
-
-        current.append(unit)
-        current_len += len(unit) + (2 if current_len else 0)
+                start = max(0, end - self.overlap)
+            return
+
+        if not self._current:
+            self._current_page = page_number
+        self._current.append(unit)
+        self._current_len += len(unit) + (2 if self._current_len else 0)
+
+    def feed(self, text: str, page_number: int | None = None) -> list[Chunk]:
+        text = normalize_text(text)
+        out: list[Chunk] = []
+        if text:
+            for unit in _split_units(text):
+                self._add_unit(out, unit, page_number)
+        return out
+
+    def flush(self) -> list[Chunk]:
+        out: list[Chunk] = []
+        if self._current:
+            self._emit(out, "\n\n".join(self._current).strip(), self._current_page)
+            self._current = []
+            self._current_len = 0
+        return out
+
+
+def feed_segments(
+    chunker: StreamingChunker,
+    segments: list[tuple[int | None, str]],
+    final: bool = False,
+) -> tuple[StreamingChunker, list[Chunk]]:
+    """
+    Process-pool friendly wrapper: feed (page_number, text) segments and
+    return the updated chunker along with the chunks it completed.
+    """
+    out: list[Chunk] = []
+    for page_number, text in segments:
+        out.extend(chunker.feed(text, page_number))
+    if final:
+        out.extend(chunker.flush())
+    return chunker, out
 
-    if current:
-        chunks.append(Chunk(index=len(chunks), text="\n\n".join(current).strip()))
 
-    return chunks
\ No newline at end of file
+def chunk_text(text: str, max_chars: int = 1400, overlap: int = 220) -> list[Chunk]:
+    """Create chunks on paragraph/sentence boundaries with light semantic overlap."""
+    chunker = StreamingChunker(max_chars=max_chars, overlap=overlap)
+    return chunker.feed(text) + chunker.flush()
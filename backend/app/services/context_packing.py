@@ -0,0 +1,168 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable
+
+from app.services.embedding_engine import estimate_tokens
+
+MIN_OVERLAP_CHARS = 20
+# Upper bound on the knapsack table width; larger budgets are measured in
+# coarser token units.
+MAX_KNAPSACK_CELLS = 256
+SEPARATOR = "\n\n---\n\n"
+
+
+@lru_cache(maxsize=8)
+def token_counter(model: str) -> Callable[[str], int]:
+    """
+    Token counter for a chat model: tiktoken's encoding when it is
+    installed, otherwise the ~4 characters per token estimate.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return estimate_tokens
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("o200k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+@dataclass
+class Passage:
+    document_id: int
+    first_index: int
+    last_index: int
+    text: str
+    score: float
+    title: str | None = None
+    chunk_ids: list[int] = field(default_factory=list)
+
+    def header(self) -> str:
+        if self.first_index == self.last_index:
+            span = f"chunk:{self.first_index}"
+        else:
+            span = f"chunks:{self.first_index}-{self.last_index}"
+        return f"[doc:{self.document_id} {span} score:{self.score:.3f} title:{self.title or ''}]"
+
+    def render(self) -> str:
+        return self.header() + "\n" + self.text
+
+
+def _overlap(left: str, right: str) -> int:
+    """
+    Length of the longest suffix of `left` that is also a prefix of `right`,
+    or 0 when it is shorter than MIN_OVERLAP_CHARS. Linear in the shorter
+    text (KMP failure function), so overlaps of any length are found.
+    """
+    limit = min(len(left), len(right))
+    if limit < MIN_OVERLAP_CHARS:
+        return 0
+    pattern = right[:limit]
+    failure = [0] * limit
+    k = 0
+    for i in range(1, limit):
+        while k and pattern[i] != pattern[k]:
+            k = failure[k - 1]
+        if pattern[i] == pattern[k]:
+            k += 1
+        failure[i] = k
+
+    k = 0
+    for ch in left[len(left) - limit:]:
+        while k and ch != pattern[k]:
+            k = failure[k - 1]
+        if ch == pattern[k]:
+            k += 1
+    return k if k >= MIN_OVERLAP_CHARS else 0
+
+
+def merge_adjacent(chunks: list[dict]) -> list[Passage]:
+    """
+    Merge retrieved chunks that are neighbours in the same document into
+    single passages, dropping the text they share. Passages keep the best
+    score of their chunks and are returned best first.
+    """
+    by_doc: dict[int, list[dict]] = {}
+    for c in chunks:
+        by_doc.setdefault(c["document_id"], []).append(c)
+
+    passages: list[Passage] = []
+    for document_id, doc_chunks in by_doc.items():
+        current: Passage | None = None
+        for c in sorted(doc_chunks, key=lambda c: c["chunk_index"]):
+            body = (c["text"] or "").strip()
+            score = float(c["score"] or 0.0)
+            if current is not None and c["chunk_index"] <= current.last_index + 1:
+                if c["chunk_index"] > current.last_index:
+                    shared = _overlap(current.text, body)
+                    current.text += body[shared:] if shared else "\n\n" + body
+                    current.last_index = c["chunk_index"]
+                current.score = max(current.score, score)
+                current.chunk_ids.append(c["chunk_id"])
+                continue
+            current = Passage(
+                document_id=document_id,
+                first_index=c["chunk_index"],
+                last_index=c["chunk_index"],
+                text=body,
+                score=score,
+                title=c.get("doc_title"),
+                chunk_ids=[c["chunk_id"]],
+            )
+            passages.append(current)
+    passages.sort(key=lambda p: p.score, reverse=True)
+    return passages
+
+
+def select_passages(weights: list[int], values: list[float], budget: int) -> list[int]:
+    """
+    0/1 knapsack: positions of the items with the highest total value whose
+    weights fit in `budget`. Items that can never fit are skipped.
+
+    Budgets above MAX_KNAPSACK_CELLS are solved in units of
+    ceil(budget / MAX_KNAPSACK_CELLS) tokens, rounding weights up and the
+    budget down, so the table stays small and the chosen set still fits.
+    """
+    unit = -(-budget // MAX_KNAPSACK_CELLS) if budget > MAX_KNAPSACK_CELLS else 1
+    if unit > 1:
+        weights = [-(-w // unit) for w in weights]
+        budget //= unit
+    best = [0.0] * (budget + 1)
+    keep = [[False] * (budget + 1) for _ in weights]
+    for i, (weight, value) in enumerate(zip(weights, values)):
+        if weight > budget:
+            continue
+        for capacity in range(budget, weight - 1, -1):
+            candidate = best[capacity - weight] + value
+            if candidate > best[capacity]:
+                best[capacity] = candidate
+                keep[i][capacity] = True
+
+    chosen: list[int] = []
+    capacity = budget
+    for i in range(len(weights) - 1, -1, -1):
+        if keep[i][capacity]:
+            chosen.append(i)
+            capacity -= weights[i]
+    return sorted(chosen)
+
+
+def pack_context(chunks: list[dict], max_tokens: int, count_tokens: Callable[[str], int]) -> str:
+    """
+    Build the prompt context from retrieved chunks within `max_tokens`:
+    neighbouring chunks are merged, every passage is measured with the
+    model's tokenizer, and the best-scoring set that fits is kept, in rank
+    order. Passages too large for the remaining budget are skipped rather
+    than ending the context.
+    """
+    passages = merge_adjacent(chunks)
+    if not passages or max_tokens <= 0:
+        return ""
+
+    separator_tokens = count_tokens(SEPARATOR)
+    weights = [count_tokens(p.render()) + separator_tokens for p in passages]
+    # Small floor so zero-score keyword hits still beat empty space.
+    values = [max(p.score, 0.0) + 1e-3 for p in passages]
+    chosen = select_passages(weights, values, max_tokens + separator_tokens)
+    return SEPARATOR.join(passages[i].render() for i in chosen)
@@ -0,0 +1,318 @@
+import asyncio
+import hashlib
+import math
+import random
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Protocol
+
+import openai
+
+# OpenAI's hard per-request limits are 2048 inputs / 300k tokens; stay well under.
+DEFAULT_MAX_BATCH_ITEMS = 256
+DEFAULT_MAX_BATCH_TOKENS = 60_000
+
+
+class RateLimitedError(Exception):
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TransientEmbeddingError(Exception):
+    pass
+
+
+@dataclass
+class ProviderResult:
+    vectors: list[list[float]]
+    remaining_requests: int | None = None
+    remaining_tokens: int | None = None
+    reset_requests_seconds: float | None = None
+    reset_tokens_seconds: float | None = None
+
+
+class EmbeddingProvider(Protocol):
+    async def embed(self, texts: list[str]) -> ProviderResult: ...
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset_duration(value: str | None) -> float | None:
+    """
+    Parse OpenAI's x-ratelimit-reset-* / retry-after values ("20ms", "1.5s",
+    "6m0s", or plain seconds) into seconds.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts)
+
+
+def _int_header(headers: Any, name: str) -> int | None:
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English; only used to size batches.
+    return max(1, math.ceil(len(text) / 4))
+
+
+def plan_batches(
+    texts: list[str],
+    max_items: int = DEFAULT_MAX_BATCH_ITEMS,
+    max_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+) -> list[list[int]]:
+    """
+    Group input positions into request batches bounded by item count and
+    estimated tokens. An input larger than max_tokens gets its own batch.
+    """
+    batches: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+# Models that accept the `dimensions` request parameter.
+SHORTENABLE_MODEL_PREFIX = "text-embedding-3"
+
+
+class OpenAIEmbeddingProvider:
+    def __init__(self, client: Any, model: str, dimensions: int | None = None):
+        self._client = client
+        self._model = model
+        self._dimensions = dimensions if model.startswith(SHORTENABLE_MODEL_PREFIX) else None
+
+    async def embed(self, texts: list[str]) -> ProviderResult:
+        extra = {"dimensions": self._dimensions} if self._dimensions else {}
+        try:
+            raw = await self._client.embeddings.with_raw_response.create(
+                model=self._model, input=texts, **extra
+            )
+        except openai.RateLimitError as exc:
+            headers = exc.response.headers
+            retry_after = parse_reset_duration(headers.get("retry-after")) or parse_reset_duration(
+                headers.get("x-ratelimit-reset-tokens")
+            )
+            raise RateLimitedError(str(exc), retry_after) from exc
+        except (openai.APIConnectionError, openai.InternalServerError) as exc:
+            raise TransientEmbeddingError(str(exc)) from exc
+
+        headers = raw.headers
+        resp = raw.parse()
+        return ProviderResult(
+            vectors=[d.embedding for d in resp.data],
+            remaining_requests=_int_header(headers, "x-ratelimit-remaining-requests"),
+            remaining_tokens=_int_header(headers, "x-ratelimit-remaining-tokens"),
+            reset_requests_seconds=parse_reset_duration(headers.get("x-ratelimit-reset-requests")),
+            reset_tokens_seconds=parse_reset_duration(headers.get("x-ratelimit-reset-tokens")),
+        )
+
+
+class FakeEmbeddingProvider:
+    """
+    Local stand-in for benchmarking: deterministic vectors, simulated latency
+    and a sliding-window requests/tokens-per-minute limit that answers 429s.
+    """
+
+    def __init__(
+        self,
+        dim: int = 1536,
+        latency_seconds: float = 0.05,
+        per_token_seconds: float = 0.0,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.dim = dim
+        self.latency_seconds = latency_seconds
+        self.per_token_seconds = per_token_seconds
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._clock = clock
+        self._window: deque[tuple[float, int]] = deque()
+        self.calls = 0
+        self.rejected = 0
+
+    def _vector(self, text: str) -> list[float]:
+        seed = hashlib.sha256(text.encode("utf-8")).digest()
+        rng = random.Random(seed)
+        return [rng.uniform(-1, 1) for _ in range(self.dim)]
+
+    async def embed(self, texts: list[str]) -> ProviderResult:
+        now = self._clock()
+        while self._window and now - self._window[0][0] >= 60:
+            self._window.popleft()
+
+        tokens = sum(estimate_tokens(t) for t in texts)
+        used_requests = len(self._window)
+        used_tokens = sum(n for _, n in self._window)
+        reset = 60 - (now - self._window[0][0]) if self._window else 0.0
+
+        if (self.requests_per_minute and used_requests + 1 > self.requests_per_minute) or (
+            self.tokens_per_minute and used_tokens + tokens > self.tokens_per_minute
+        ):
+            self.rejected += 1
+            raise RateLimitedError("fake provider rate limit", retry_after=reset)
+
+        self._window.append((now, tokens))
+        self.calls += 1
+        await asyncio.sleep(self.latency_seconds + self.per_token_seconds * tokens)
+
+        return ProviderResult(
+            vectors=[self._vector(t) for t in texts],
+            remaining_requests=(self.requests_per_minute - used_requests - 1) if self.requests_per_minute else None,
+            remaining_tokens=(self.tokens_per_minute - used_tokens - tokens) if self.tokens_per_minute else None,
+            reset_requests_seconds=reset,
+            reset_tokens_seconds=reset,
+        )
+
+
+class EmbeddingEngine:
+    """
+    Process-wide embedding client: splits inputs into token-bounded batches,
+    runs them with bounded concurrency, and adapts to provider rate limits.
+    Concurrency is halved on every 429 and grows back by one after a run of
+    successes; when the provider reports an exhausted budget (or sends a
+    retry-after), every caller pauses until the reset time.
+    """
+
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        *,
+        max_batch_items: int = DEFAULT_MAX_BATCH_ITEMS,
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+        max_concurrency: int = 4,
+        max_retries: int = 6,
+        base_backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 60.0,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.provider = provider
+        self.max_batch_items = max_batch_items
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._sleep = sleep
+        self._clock = clock
+
+        self.concurrency_limit = self.max_concurrency
+        self._in_flight = 0
+        self._cond = asyncio.Condition()
+        self._resume_at = 0.0
+        self._successes = 0
+
+        self.requests = 0
+        self.rate_limited = 0
+        self.retries = 0
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+
+        results: list[list[float] | None] = [None] * len(texts)
+
+        async def run(batch: list[int]) -> None:
+            vectors = await self._embed_batch([texts[i] for i in batch])
+            for i, vector in zip(batch, vectors):
+                results[i] = vector
+
+        await asyncio.gather(
+            *(run(b) for b in plan_batches(texts, self.max_batch_items, self.max_batch_tokens))
+        )
+        return results  # type: ignore[return-value]
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_backoff_seconds, self.base_backoff_seconds * (2**attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _pause(self, seconds: float) -> None:
+        self._resume_at = max(self._resume_at, self._clock() + seconds)
+
+    async def _wait_for_window(self) -> None:
+        while (delay := self._resume_at - self._clock()) > 0:
+            await self._sleep(delay)
+
+    async def _acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < self.concurrency_limit)
+            self._in_flight += 1
+
+    async def _release(self) -> None:
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _on_success(self, result: ProviderResult, batch_tokens: int) -> None:
+        self._successes += 1
+        if self._successes >= 2 * self.concurrency_limit and self.concurrency_limit < self.max_concurrency:
+            self.concurrency_limit += 1
+            self._successes = 0
+
+        if result.remaining_requests is not None and result.remaining_requests <= 0:
+            self._pause(result.reset_requests_seconds or self.base_backoff_seconds)
+        if result.remaining_tokens is not None and result.remaining_tokens < batch_tokens:
+            self._pause(result.reset_tokens_seconds or self.base_backoff_seconds)
+
+    def _on_rate_limited(self, exc: RateLimitedError, attempt: int) -> None:
+        self.rate_limited += 1
+        self._successes = 0
+        self.concurrency_limit = max(1, self.concurrency_limit // 2)
+        self._pause(exc.retry_after if exc.retry_after is not None else self._backoff(attempt))
+
+    async def _embed_batch(self, batch: list[str]) -> list[list[float]]:
+        batch_tokens = sum(estimate_tokens(t) for t in batch)
+        attempt = 0
+        while True:
+            await self._wait_for_window()
+            await self._acquire()
+            delay = 0.0
+            try:
+                self.requests += 1
+                result = await self.provider.embed(batch)
+            except RateLimitedError as exc:
+                self._on_rate_limited(exc, attempt)
+                error: Exception = exc
+            except TransientEmbeddingError as exc:
+                delay = self._backoff(attempt)
+                error = exc
+            else:
+                self._on_success(result, batch_tokens)
+                return result.vectors
+            finally:
+                await self._release()
+
+            attempt += 1
+            if attempt > self.max_retries:
+                raise error
+            self.retries += 1
+            if delay:
+                await self._sleep(delay)
@@ -1,18 +1,200 @@
+import hashlib
+import logging
+import time
+from array import array
+from datetime import datetime, timedelta
+
 from openai import AsyncOpenAI
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
 from app.config import settings
+from app.db.database import AsyncSessionLocal
+from app.metrics import Metric, register_collector
+from app.models.models import EmbeddingCacheEntry
+from app.services.cache import LRUCache, normalize_whitespace
+from app.services.embedding_engine import (
+    EmbeddingEngine,
+    FakeEmbeddingProvider,
+    OpenAIEmbeddingProvider,
+)
+
+logger = logging.getLogger(__name__)
+
+# Retries are handled by the engine so 429s feed its adaptive limiter.
+_client = AsyncOpenAI(api_key=settings.openai_api_key, max_retries=0)
+
+
+def _build_engine() -> EmbeddingEngine:
+    if settings.embedding_provider == "fake":
+        provider = FakeEmbeddingProvider(dim=settings.embedding_dimensions)
+    else:
+        provider = OpenAIEmbeddingProvider(_client, settings.embedding_model, settings.embedding_dimensions)
+    return EmbeddingEngine(
+        provider,
+        max_batch_items=settings.embedding_max_batch_items,
+        max_batch_tokens=settings.embedding_max_batch_tokens,
+        max_concurrency=settings.embedding_max_concurrency,
+        max_retries=settings.embedding_max_retries,
+    )
+
+
+# Shared by every request and ingestion job in the process, so the
+# concurrency limit and rate-limit backoff apply to total throughput.
+_engine = _build_engine()
+
+# Vectors are kept as float32 arrays (4 bytes/dimension) rather than Python lists.
+_cache = LRUCache(
+    max_entries=settings.embedding_cache_size,
+    ttl_seconds=settings.embedding_cache_ttl_seconds,
+)
+_db_hits = 0
+_db_pruned = 0
+_last_prune = 0.0
+
+PERSIST_BATCH_SIZE = 1000
+PRUNE_INTERVAL_SECONDS = 300
+
+
+def cache_key(model: str, text: str, dimensions: int) -> str:
+    # Whitespace only: the model embeds "API" and "api" differently, and
+    # ingested chunks must keep the vector of their actual text.
+    return hashlib.sha256(f"{model}:{dimensions}\x00{normalize_whitespace(text)}".encode("utf-8")).hexdigest()
+
+
+def _expiry_cutoff() -> datetime | None:
+    if not settings.embedding_cache_ttl_seconds:
+        return None
+    return datetime.utcnow() - timedelta(seconds=settings.embedding_cache_ttl_seconds)
+
+
+async def _load_persistent(keys: list[str]) -> dict[str, list[float]]:
+    conditions = [EmbeddingCacheEntry.key.in_(keys)]
+    cutoff = _expiry_cutoff()
+    if cutoff is not None:
+        conditions.append(EmbeddingCacheEntry.created_at > cutoff)
+    try:
+        async with AsyncSessionLocal() as db:
+            rows = (
+                await db.execute(select(EmbeddingCacheEntry.key, EmbeddingCacheEntry.embedding).where(*conditions))
+            ).all()
+            if rows:
+                await db.execute(
+                    update(EmbeddingCacheEntry)
+                    .where(EmbeddingCacheEntry.key.in_([key for key, _ in rows]))
+                    .values(last_used_at=datetime.utcnow())
+                )
+                await db.commit()
+    except Exception as exc:
+        logger.warning("Embedding cache lookup failed: %s", exc)
+        return {}
+    return {key: embedding.tolist() for key, embedding in rows}
 
 
-_client = AsyncOpenAI(api_key=settings.openai_api_key)
+async def _save_persistent(model: str, entries: dict[str, list[float]]) -> None:
+    rows = [{"key": k, "model": model, "embedding": v} for k, v in entries.items()]
+    try:
+        async with AsyncSessionLocal() as db:
+            for start in range(0, len(rows), PERSIST_BATCH_SIZE):
+                await db.execute(
+                    pg_insert(EmbeddingCacheEntry)
+                    .values(rows[start : start + PERSIST_BATCH_SIZE])
+                    .on_conflict_do_nothing(index_elements=["key"])
+                )
+            await db.commit()
+    except Exception as exc:
+        logger.warning("Embedding cache write failed: %s", exc)
+        return
+    await _prune_persistent()
+
+
+async def _prune_persistent() -> None:
+    """
+    Drop expired rows and the least recently used ones beyond
+    embedding_cache_persistent_max_entries, at most every
+    PRUNE_INTERVAL_SECONDS per process.
+    """
+    global _db_pruned, _last_prune
+    now = time.monotonic()
+    if now - _last_prune < PRUNE_INTERVAL_SECONDS:
+        return
+    _last_prune = now
+
+    overflow = (
+        select(EmbeddingCacheEntry.key)
+        .order_by(EmbeddingCacheEntry.last_used_at.desc())
+        .offset(settings.embedding_cache_persistent_max_entries)
+    )
+    try:
+        async with AsyncSessionLocal() as db:
+            cutoff = _expiry_cutoff()
+            if cutoff is not None:
+                expired = await db.execute(delete(EmbeddingCacheEntry).where(EmbeddingCacheEntry.created_at <= cutoff))
+                _db_pruned += expired.rowcount or 0
+            evicted = await db.execute(delete(EmbeddingCacheEntry).where(EmbeddingCacheEntry.key.in_(overflow)))
+            _db_pruned += evicted.rowcount or 0
+            await db.commit()
+    except Exception as exc:
+        logger.warning("Embedding cache prune failed: %s", exc)
+
+
+async def _embed_uncached(texts: list[str]) -> list[list[float]]:
+    return await _engine.embed(texts)
 
 
 async def embed_texts(texts: list[str]) -> list[list[float]]:
     """
-    Batch embeddings.
+    Batch embeddings, served from the in-process LRU (and the optional
+    Postgres tier) where possible. Only unseen texts hit the API.
     """
+    global _db_hits
+
     if not texts:
         return []
-    resp = await _client.embeddings.create(
-        model=settings.embedding_model,
-        input=texts,
-    )
-    return [d.embedding for d in resp.data]
\ No newline at end of file
+
+    model = settings.embedding_model
+    keys = [cache_key(model, t, settings.embedding_dimensions) for t in texts]
+    found: dict[str, list[float]] = {}
+
+    for key in dict.fromkeys(keys):
+        cached = _cache.get(key)
+        if cached is not None:
+            found[key] = cached.tolist()
+
+    missing = [k for k in dict.fromkeys(keys) if k not in found]
+    if missing and settings.embedding_cache_persistent:
+        stored = await _load_persistent(missing)
+        _db_hits += len(stored)
+        for key, emb in stored.items():
+            _cache.set(key, array("f", emb))
+            found[key] = emb
+        missing = [k for k in missing if k not in found]
+
+    if missing:
+        first_text = {}
+        for key, t in zip(keys, texts):
+            first_text.setdefault(key, t)
+        fresh = dict(zip(missing, await _embed_uncached([first_text[k] for k in missing])))
+        for key, emb in fresh.items():
+            _cache.set(key, array("f", emb))
+        found.update(fresh)
+        if settings.embedding_cache_persistent:
+            await _save_persistent(model, fresh)
+
+    return [found[k] for k in keys]
+
+
+@register_collector
+def embedding_cache_metrics() -> list[Metric]:
+    return [
+        Metric("embedding_cache_hits_total", "counter", "Embedding lookups served from memory", _cache.hits),
+        Metric("embedding_cache_db_hits_total", "counter", "Embedding lookups served from Postgres", _db_hits),
+        Metric("embedding_cache_misses_total", "counter", "Embedding lookups that missed memory", _cache.misses),
+        Metric("embedding_cache_evictions_total", "counter", "Embeddings evicted from memory", _cache.evictions),
+        Metric("embedding_cache_db_pruned_total", "counter", "Embeddings pruned from Postgres", _db_pruned),
+        Metric("embedding_cache_entries", "gauge", "Embeddings held in memory", len(_cache)),
+        Metric("embedding_requests_total", "counter", "Embedding API requests sent", _engine.requests),
+        Metric("embedding_rate_limited_total", "counter", "Embedding API requests answered with 429", _engine.rate_limited),
+        Metric("embedding_retries_total", "counter", "Embedding API request retries", _engine.retries),
+        Metric("embedding_concurrency_limit", "gauge", "Current adaptive embedding concurrency", _engine.concurrency_limit),
+    ]
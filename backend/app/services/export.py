@@ -0,0 +1,249 @@
+"""
+Streaming workspace export.
+
+Rows are read through server-side cursors on a dedicated connection and
+encoded one bounded batch at a time, so memory stays flat however large
+the workspace is. Two encodings:
+
+- "ndjson": one JSON object per line, documents first, then chunks in
+  (document_id, chunk_index) order, each tagged with "type".
+- "arrow": an Arrow IPC stream of one table ("documents" or "chunks"),
+  with embeddings as fixed-size float32 lists. Needs pyarrow.
+"""
+import enum
+import io
+import json
+import re
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import settings
+from app.db.database import engine
+from app.models.models import Chunk, ChunkEmbedding, Document
+
+EXPORT_FORMATS = ("ndjson", "arrow")
+EXPORT_TABLES = ("documents", "chunks")
+DEFAULT_BATCH_SIZE = 1000
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+
+DOCUMENT_FIELDS = (
+    "id",
+    "title",
+    "source_type",
+    "source_uri",
+    "mime_type",
+    "size_bytes",
+    "content_hash",
+    "status",
+    "created_at",
+    "ingested_at",
+    "source_published_at",
+)
+CHUNK_FIELDS = (
+    "id",
+    "document_id",
+    "chunk_index",
+    "text",
+    "token_count",
+    "content_hash",
+    "page_number",
+    "created_at",
+)
+
+
+class ExportError(Exception):
+    pass
+
+
+def _jsonable(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return value
+
+
+def encode_ndjson(kind: str, rows: list[dict]) -> bytes:
+    """
+    One batch of rows as NDJSON lines tagged with their record type.
+    """
+    return b"".join(
+        json.dumps({"type": kind, **{k: _jsonable(v) for k, v in row.items()}}, ensure_ascii=False).encode()
+        + b"\n"
+        for row in rows
+    )
+
+
+def _query(table: str, workspace_id: str, include_embeddings: bool):
+    if table == "documents":
+        return (
+            select(*(getattr(Document, f) for f in DOCUMENT_FIELDS))
+            .where(Document.workspace_id == workspace_id)
+            .order_by(Document.id)
+        )
+    columns = [getattr(Chunk, f) for f in CHUNK_FIELDS]
+    query = select(*columns).join(Document, Document.id == Chunk.document_id)
+    if include_embeddings:
+        query = query.add_columns(ChunkEmbedding.embedding).outerjoin(
+            ChunkEmbedding, ChunkEmbedding.chunk_id == Chunk.id
+        )
+    # Walks ix_chunks_doc_chunk_index.
+    return query.where(Document.workspace_id == workspace_id).order_by(Chunk.document_id, Chunk.chunk_index)
+
+
+@asynccontextmanager
+async def snapshot_connection() -> AsyncIterator[AsyncConnection]:
+    """
+    A dedicated connection in one REPEATABLE READ transaction, so every
+    table in an export sees the same snapshot.
+    """
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="REPEATABLE READ")
+        yield conn
+
+
+async def iter_batches(
+    conn: AsyncConnection,
+    table: str,
+    workspace_id: str,
+    *,
+    include_embeddings: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> AsyncIterator[list[dict]]:
+    """
+    Rows of one table as lists of at most batch_size dicts, fetched through
+    a server-side cursor.
+    """
+    result = await conn.stream(
+        _query(table, workspace_id, include_embeddings).execution_options(yield_per=batch_size)
+    )
+    async for partition in result.mappings().partitions(batch_size):
+        yield [dict(row) for row in partition]
+
+
+async def export_ndjson(
+    workspace_id: str,
+    *,
+    include_embeddings: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    async with snapshot_connection() as conn:
+        async for rows in iter_batches(conn, "documents", workspace_id, batch_size=batch_size):
+            yield encode_ndjson("document", rows)
+        async for rows in iter_batches(
+            conn, "chunks", workspace_id, include_embeddings=include_embeddings, batch_size=batch_size
+        ):
+            yield encode_ndjson("chunk", rows)
+
+
+def content_disposition(filename: str) -> str:
+    """
+    Attachment header for a download; anything outside [A-Za-z0-9._-] is
+    replaced so the name cannot break out of the quoted parameter.
+    """
+    return f'attachment; filename="{_UNSAFE_FILENAME_CHARS.sub("_", filename)}"'
+
+
+def check_export(fmt: str, table: str | None = None) -> None:
+    """
+    Validate export options up front, before any bytes are streamed.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"Unknown export format: {fmt!r}")
+    if fmt != "arrow":
+        return
+    if table not in EXPORT_TABLES:
+        raise ExportError(f"The arrow format exports one table: {' or '.join(EXPORT_TABLES)}")
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ExportError("The arrow export format needs pyarrow (pip install pyarrow)")
+
+
+def arrow_schema(table: str, include_embeddings: bool, dimensions: int):
+    import pyarrow as pa
+
+    timestamp = pa.timestamp("us", tz="UTC")
+    if table == "documents":
+        return pa.schema(
+            [
+                ("id", pa.int64()),
+                ("title", pa.string()),
+                ("source_type", pa.string()),
+                ("source_uri", pa.string()),
+                ("mime_type", pa.string()),
+                ("size_bytes", pa.int64()),
+                ("content_hash", pa.string()),
+                ("status", pa.string()),
+                ("created_at", timestamp),
+                ("ingested_at", timestamp),
+                ("source_published_at", timestamp),
+            ]
+        )
+    fields = [
+        ("id", pa.int64()),
+        ("document_id", pa.int64()),
+        ("chunk_index", pa.int32()),
+        ("text", pa.string()),
+        ("token_count", pa.int32()),
+        ("content_hash", pa.string()),
+        ("page_number", pa.int32()),
+        ("created_at", timestamp),
+    ]
+    if include_embeddings:
+        fields.append(("embedding", pa.list_(pa.float32(), dimensions)))
+    return pa.schema(fields)
+
+
+def arrow_batch(schema, rows: list[dict]):
+    import pyarrow as pa
+
+    columns = {}
+    for field in schema:
+        values = [row[field.name] for row in rows]
+        if field.name == "embedding":
+            values = [v.tolist() if v is not None else None for v in values]
+        else:
+            values = [v.value if isinstance(v, enum.Enum) else v for v in values]
+        columns[field.name] = pa.array(values, type=field.type)
+    return pa.record_batch(columns, schema=schema)
+
+
+async def export_arrow(
+    workspace_id: str,
+    table: str,
+    *,
+    include_embeddings: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    One table as an Arrow IPC stream, one record batch per cursor batch;
+    bytes are handed on as soon as each batch is written.
+    """
+    check_export("arrow", table)
+    import pyarrow as pa
+
+    schema = arrow_schema(table, include_embeddings and table == "chunks", settings.embedding_dimensions)
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    async with snapshot_connection() as conn:
+        async for rows in iter_batches(
+            conn, table, workspace_id, include_embeddings=include_embeddings, batch_size=batch_size
+        ):
+            writer.write_batch(arrow_batch(schema, rows))
+            yield drain()
+    writer.close()
+    yield drain()
@@ -0,0 +1,84 @@
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+FUSION_MODES = ("weighted", "rrf")
+ROW_FIELDS = ("chunk_id", "document_id", "chunk_index", "text", "doc_title", "doc_created_at")
+
+
+@dataclass(frozen=True)
+class FusionWeights:
+    """
+    How vector and keyword candidates are combined. "weighted" blends the
+    raw scores plus a reciprocal-rank bonus (the original SQL formula);
+    "rrf" is reciprocal rank fusion, sum of weight / (rrf_k + rank).
+    """
+
+    mode: str = "weighted"
+    vector: float = 0.72
+    keyword: float = 0.18
+    rank: float = 0.10
+    rrf_k: int = 60
+
+    def __post_init__(self):
+        if self.mode not in FUSION_MODES:
+            raise ValueError(f"Unknown fusion mode: {self.mode!r}")
+
+    def override(self, **values) -> "FusionWeights":
+        """
+        Copy with the given fields replaced; None values keep the current one.
+        """
+        return replace(self, **{k: v for k, v in values.items() if v is not None})
+
+
+def fuse(vector_rows: list[dict], keyword_rows: list[dict], weights: FusionWeights, limit: int) -> list[dict]:
+    """
+    Merge vector candidates (vector_score, vector_rank) and keyword
+    candidates (keyword_score, keyword_rank) by chunk_id and return the top
+    `limit` by fused score, ties broken by vector then keyword score.
+    """
+    merged: dict[int, dict] = {}
+    for r in vector_rows:
+        merged[r["chunk_id"]] = {f: r[f] for f in ROW_FIELDS}
+    for r in keyword_rows:
+        merged.setdefault(r["chunk_id"], {f: r[f] for f in ROW_FIELDS})
+    if not merged:
+        return []
+
+    position = {chunk_id: i for i, chunk_id in enumerate(merged)}
+    n = len(merged)
+    vector_score = np.zeros(n)
+    keyword_score = np.zeros(n)
+    vector_rank = np.full(n, np.inf)
+    keyword_rank = np.full(n, np.inf)
+    for r in vector_rows:
+        i = position[r["chunk_id"]]
+        vector_score[i] = r["vector_score"] or 0.0
+        vector_rank[i] = r["vector_rank"]
+    for r in keyword_rows:
+        i = position[r["chunk_id"]]
+        keyword_score[i] = r["keyword_score"] or 0.0
+        keyword_rank[i] = r["keyword_rank"]
+
+    if weights.mode == "rrf":
+        score = weights.vector / (weights.rrf_k + vector_rank) + weights.keyword / (weights.rrf_k + keyword_rank)
+    else:
+        score = (
+            weights.vector * vector_score
+            + weights.keyword * np.minimum(keyword_score, 1.0)
+            + weights.rank * (1.0 / vector_rank + 1.0 / keyword_rank)
+        )
+
+    # lexsort sorts by the last key first.
+    order = np.lexsort((-keyword_score, -vector_score, -score))[:limit]
+    rows = list(merged.values())
+    out = []
+    for i in order:
+        row = rows[i]
+        row["vector_score"] = float(vector_score[i])
+        row["keyword_score"] = float(keyword_score[i])
+        row["vector_rank"] = int(vector_rank[i]) if np.isfinite(vector_rank[i]) else None
+        row["keyword_rank"] = int(keyword_rank[i]) if np.isfinite(keyword_rank[i]) else None
+        row["score"] = float(score[i])
+        out.append(row)
+    return out
@@ -0,0 +1,36 @@
+import hashlib
+from collections import defaultdict
+
+
+def content_hash(data: str | bytes) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8", errors="ignore")
+    return hashlib.sha256(data).hexdigest()
+
+
+class ChunkMatcher:
+    """
+    Match re-chunked text against a document's stored chunks by content hash,
+    one chunk at a time so it can follow a streaming chunker. `existing`
+    holds (chunk_id, content_hash) in chunk_index order; rows without a hash
+    (ingested before hashing existed) are never reused.
+    """
+
+    def __init__(self, existing: list[tuple[int, str | None]]):
+        self._existing_ids = [chunk_id for chunk_id, _ in existing]
+        self._available: dict[str, list[int]] = defaultdict(list)
+        for chunk_id, h in existing:
+            if h:
+                self._available[h].append(chunk_id)
+        self._used: set[int] = set()
+
+    def match(self, h: str) -> int | None:
+        ids = self._available.get(h)
+        if not ids:
+            return None
+        chunk_id = ids.pop(0)
+        self._used.add(chunk_id)
+        return chunk_id
+
+    def stale_ids(self) -> list[int]:
+        return [chunk_id for chunk_id in self._existing_ids if chunk_id not in self._used]
@@ -1,27 +1,63 @@
 from pathlib import Path
+from typing import Iterable, Iterator
 
 from pypdf import PdfReader
 
 SUPPORTED_DOCUMENT_EXTENSIONS = {".pdf", ".md", ".txt"}
 TEXT_EXTENSIONS = {".md", ".txt"}
+TEXT_BLOCK_CHARS = 256 * 1024
 
 
 def supported_document_extensions() -> set[str]:
     return set(SUPPORTED_DOCUMENT_EXTENSIONS)
 
 
+def pdf_page_count(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+
+def extract_pdf_pages(path: str, start: int = 0, stop: int | None = None) -> list[str]:
+    """
+    Extract pages [start, stop) so large PDFs can be split across processes.
+    """
+    reader = PdfReader(path)
+    pages = reader.pages
+    stop = len(pages) if stop is None else min(stop, len(pages))
+    return [pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def join_pages(pages: Iterable[str]) -> str:
+    return "\n\n".join(t for t in pages if t.strip()).strip()
+
+
+def iter_text_file_segments(path: str, block_chars: int = TEXT_BLOCK_CHARS) -> Iterator[str]:
+    """
+    Read a text file in fixed-size blocks, yielding segments that end on a
+    paragraph break so the chunker sees the same units as a full read.
+    """
+    carry = ""
+    # newline=None translates \r\n and lone \r to \n (including a \r\n split
+    # across blocks), so CRLF files still break on "\n\n".
+    with open(path, encoding="utf-8", errors="strict", newline=None) as f:
+        while block := f.read(block_chars):
+            carry += block
+            cut = carry.rfind("\n\n")
+            if cut == -1 and len(carry) < 4 * block_chars:
+                continue
+            if cut == -1:
+                cut = len(carry)
+            yield carry[:cut]
+            carry = carry[cut:]
+    if carry:
+        yield carry
+
+
 def extract_text_from_file(path: str) -> str:
     p = Path(path)
     suffix = p.suffix.lower()
 
     if suffix == ".pdf":
-        reader = PdfReader(str(p))
-        parts = []
-        for page in reader.pages:
-            t = page.extract_text() or ""
-            if t.strip():
-                parts.append(t)
-        return "\n\n".join(parts).strip()
+        return join_pages(extract_pdf_pages(str(p)))
 
     if suffix in TEXT_EXTENSIONS:
         return p.read_text(encoding="utf-8", errors="strict").strip()
@@ -0,0 +1,98 @@
+import asyncio
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Iterator
+
+from app.config import settings
+from app.services.ingestion.documents import (
+    extract_pdf_pages,
+    iter_text_file_segments,
+    pdf_page_count,
+)
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def get_process_pool() -> ProcessPoolExecutor | None:
+    """
+    Lazily create the shared pool for CPU-bound ingestion stages.
+    Returns None when INGESTION_PROCESS_WORKERS=0 (threads are used instead).
+    """
+    global _pool
+    if settings.ingestion_process_workers <= 0:
+        return None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.ingestion_process_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_process_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def run_cpu(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a CPU-bound function without blocking the event loop.
+    `fn` must be a module-level (picklable) function.
+    """
+    call = partial(fn, *args, **kwargs)
+    pool = get_process_pool()
+    if pool is None:
+        return await asyncio.to_thread(call)
+    return await asyncio.get_running_loop().run_in_executor(pool, call)
+
+
+def _next_segments(segments: Iterator[str], count: int) -> list[str]:
+    return list(itertools.islice(segments, count))
+
+
+async def file_page_count(path: str) -> int | None:
+    """
+    Number of pages for paged formats (PDF); None for plain text files.
+    """
+    if Path(path).suffix.lower() != ".pdf":
+        return None
+    return await run_cpu(pdf_page_count, path)
+
+
+async def iter_file_segments(path: str) -> AsyncIterator[list[tuple[int | None, str]]]:
+    """
+    Stream a document as windows of (page_number, text) segments without
+    ever materialising the whole text. PDF page ranges are extracted in the
+    pool with a bounded number of windows in flight (so pages are parallel
+    across workers but memory stays bounded); text files are read in blocks.
+    """
+    if Path(path).suffix.lower() != ".pdf":
+        segments = iter_text_file_segments(path)
+        while batch := await asyncio.to_thread(_next_segments, segments, 4):
+            yield [(None, text) for text in batch]
+        return
+
+    page_count = await run_cpu(pdf_page_count, path)
+    step = max(settings.pdf_pages_per_task, 1)
+    in_flight = max(settings.ingestion_process_workers, 1)
+    ranges = deque((start, min(start + step, page_count)) for start in range(0, page_count, step))
+    pending: deque[tuple[int, asyncio.Future]] = deque()
+
+    while ranges or pending:
+        while ranges and len(pending) < in_flight:
+            start, stop = ranges.popleft()
+            pending.append((start, asyncio.ensure_future(run_cpu(extract_pdf_pages, path, start, stop))))
+        start, future = pending.popleft()
+        try:
+            pages = await future
+        except BaseException:
+            for _, other in pending:
+                other.cancel()
+            raise
+        yield [(start + offset + 1, text) for offset, text in enumerate(pages)]
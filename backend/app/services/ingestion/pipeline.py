@@ -1,6 +1,7 @@
 from datetime import datetime
+from typing import AsyncIterator
 
-from sqlalchemy import text, update
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.database import AsyncSessionLocal
@@ -14,11 +15,18 @@ from app.models.models import (
     JobStatus,
     SourceType,
 )
-from app.services.chunking import chunk_text
+from app.services.chunking import Chunk as TextChunk, StreamingChunker, feed_segments
 from app.services.embeddings import embed_texts
 from app.services.ingestion.audio import transcribe_audio
-from app.services.ingestion.documents import extract_text_from_file
+from app.services.ingestion.dedupe import ChunkMatcher, content_hash
+from app.services.ingestion.executor import file_page_count, iter_file_segments, run_cpu
 from app.services.ingestion.web import fetch_and_extract_url
+from app.services.retrieval import is_usable_chunk_text
+from app.services.answer_cache import invalidate_document
+from app.services.retrieval_cache import bump_corpus_version
+
+# Chunks are embedded and written in batches of this size while streaming.
+STORE_BATCH_SIZE = 256
 
 
 async def _set_job(
@@ -57,6 +65,155 @@ async def _set_doc_status(
     )
 
 
+async def store_chunks(
+    db: AsyncSession,
+    document_id: int,
+    chunks: list[TextChunk],
+    embeddings: list[list[float]],
+    workspace_id: str | None = None,
+) -> list[int]:
+    """
+    Write chunks and their vectors in two multi-row statements (tsv is a
+    generated column, so Postgres fills it in the same insert).
+    SQLAlchemy's insertmanyvalues pages large documents automatically.
+    """
+    if not chunks:
+        return []
+
+    created_at = datetime.utcnow()
+    result = await db.execute(
+        insert(Chunk).returning(Chunk.id, sort_by_parameter_order=True),
+        [
+            {
+                "document_id": document_id,
+                "chunk_index": c.index,
+                "text": c.text,
+                "token_count": c.token_count,
+                "content_hash": content_hash(c.text),
+                "page_number": c.page_number,
+                "is_usable": is_usable_chunk_text(c.text),
+                "created_at": created_at,
+            }
+            for c in chunks
+        ],
+    )
+    chunk_ids = list(result.scalars().all())
+
+    await db.execute(
+        insert(ChunkEmbedding),
+        [
+            {"chunk_id": chunk_id, "embedding": emb, "workspace_id": workspace_id}
+            for chunk_id, emb in zip(chunk_ids, embeddings)
+        ],
+    )
+    return chunk_ids
+
+
+async def _report_progress(
+    doc_id: int,
+    stage: JobStage,
+    pages_processed: int | None = None,
+    pages_total: int | None = None,
+) -> None:
+    # Separate session: the document's rows are written in one transaction
+    # that must not be committed piecemeal just to publish progress.
+    async with AsyncSessionLocal() as progress_db:
+        await progress_db.execute(
+            update(IngestionJob)
+            .where(IngestionJob.document_id == doc_id)
+            .values(
+                stage=stage,
+                pages_processed=pages_processed,
+                pages_total=pages_total,
+                updated_at=datetime.utcnow(),
+            )
+        )
+        await progress_db.commit()
+
+
+async def _invalidate_caches(db: AsyncSession, document_id: int, content_changed: bool = True) -> None:
+    workspace_id = (
+        await db.execute(select(Document.workspace_id).where(Document.id == document_id))
+    ).scalar_one_or_none()
+    await bump_corpus_version(db, workspace_id)
+    if content_changed:
+        await invalidate_document(db, document_id)
+
+
+async def _finish(
+    db: AsyncSession,
+    document_id: int,
+    content_changed: bool = True,
+    text_hash: str | None = None,
+) -> None:
+    # content_hash commits together with the rewritten chunks: written any
+    # earlier, a failed embed would leave old chunks under the new hash and
+    # the retry would take the "unchanged" shortcut.
+    if text_hash is not None:
+        await db.execute(update(Document).where(Document.id == document_id).values(content_hash=text_hash))
+    await _set_job(db, document_id, JobStatus.done, JobStage.complete)
+    await _set_doc_status(db, document_id, DocumentStatus.ready, None)
+    await _invalidate_caches(db, document_id, content_changed)
+    await db.commit()
+
+
+async def _single_segment(text: str) -> AsyncIterator[list[tuple[int | None, str]]]:
+    yield [(None, text)]
+
+
+class _ChunkWriter:
+    """
+    Embeds and stores chunks in bounded batches as the chunker produces
+    them, reusing stored rows whose content hash is unchanged.
+    """
+
+    def __init__(self, db: AsyncSession, document_id: int, workspace_id: str | None, existing):
+        self.db = db
+        self.document_id = document_id
+        self.workspace_id = workspace_id
+        self.matcher = ChunkMatcher([(row.id, row.content_hash) for row in existing])
+        self.old_index = {row.id: row.chunk_index for row in existing}
+        self.pending: list[TextChunk] = []
+        self.total = 0
+
+    async def add(self, chunks: list[TextChunk], progress) -> None:
+        self.pending.extend(chunks)
+        while len(self.pending) >= STORE_BATCH_SIZE:
+            batch = self.pending[:STORE_BATCH_SIZE]
+            self.pending = self.pending[STORE_BATCH_SIZE:]
+            await self._write(batch, progress)
+
+    async def flush(self, progress) -> None:
+        batch, self.pending = self.pending, []
+        if batch:
+            await self._write(batch, progress)
+
+    async def _write(self, batch: list[TextChunk], progress) -> None:
+        self.total += len(batch)
+
+        new_chunks: list[TextChunk] = []
+        moved: list[dict] = []
+        for c in batch:
+            chunk_id = self.matcher.match(content_hash(c.text))
+            if chunk_id is None:
+                new_chunks.append(c)
+            elif self.old_index[chunk_id] != c.index:
+                moved.append({"id": chunk_id, "chunk_index": c.index, "page_number": c.page_number})
+
+        await progress(JobStage.embed)
+        embeddings = await embed_texts([c.text for c in new_chunks])
+
+        await progress(JobStage.store)
+        if moved:
+            await self.db.execute(update(Chunk), moved)
+        await store_chunks(self.db, self.document_id, new_chunks, embeddings, self.workspace_id)
+
+    async def delete_stale(self) -> None:
+        stale_ids = self.matcher.stale_ids()
+        if stale_ids:
+            await self.db.execute(delete(Chunk).where(Chunk.id.in_(stale_ids)))
+
+
 async def run_ingestion_pipeline(
     document_id: int,
     *,
@@ -64,14 +221,23 @@ async def run_ingestion_pipeline(
     text_input: str | None = None,
     file_path: str | None = None,
     url: str | None = None,
+    final_attempt: bool = True,
 ):
+    """
+    Extract, chunk, embed and store one document. Files are streamed page by
+    page (or block by block) through an incremental chunker and written in
+    bounded batches, so peak memory does not grow with document size.
+    When `final_attempt` is false a failure leaves the document processing
+    so the queue can retry it.
+    """
     async with AsyncSessionLocal() as db:
         try:
             await _set_job(db, document_id, JobStatus.processing, JobStage.extract)
             await db.commit()
 
-            raw_text = ""
+            raw_text = None
             derived_title = None
+            pages_total = None
 
             if source_type == SourceType.text:
                 raw_text = (text_input or "").strip()
@@ -79,7 +245,7 @@ async def run_ingestion_pipeline(
             elif source_type == SourceType.document:
                 if not file_path:
                     raise ValueError("file_path is required for document ingestion")
-                raw_text = extract_text_from_file(file_path)
+                pages_total = await file_page_count(file_path)
 
             elif source_type == SourceType.url:
                 if not url:
@@ -94,9 +260,24 @@ async def run_ingestion_pipeline(
             else:
                 raise ValueError(f"Unsupported source_type: {source_type}")
 
-            if not raw_text.strip():
+            if raw_text is not None and not raw_text.strip():
                 raise ValueError("No text extracted")
 
+            text_hash = None
+            if source_type == SourceType.url:
+                # URL documents are refreshed in place, so an unchanged page
+                # needs no re-chunking or re-embedding at all.
+                text_hash = content_hash(raw_text)
+                previous_hash = (
+                    await db.execute(select(Document.content_hash).where(Document.id == document_id))
+                ).scalar_one_or_none()
+                has_chunks = (
+                    await db.execute(select(Chunk.id).where(Chunk.document_id == document_id).limit(1))
+                ).first() is not None
+                if previous_hash == text_hash and has_chunks:
+                    await _finish(db, document_id, content_changed=False)
+                    return
+
             if derived_title:
                 await db.execute(
                     update(Document)
@@ -105,49 +286,58 @@ async def run_ingestion_pipeline(
                 )
                 await db.commit()
 
-            await _set_job(db, document_id, JobStatus.processing, JobStage.chunk)
+            workspace_id = (
+                await db.execute(select(Document.workspace_id).where(Document.id == document_id))
+            ).scalar_one_or_none()
+            existing = (
+                await db.execute(
+                    select(Chunk.id, Chunk.chunk_index, Chunk.content_hash)
+                    .where(Chunk.document_id == document_id)
+                    .order_by(Chunk.chunk_index.asc())
+                )
+            ).all()
             await db.commit()
 
-            chunks = chunk_text(raw_text)
-            if not chunks:
-                raise ValueError("Chunking produced 0 chunks")
+            writer = _ChunkWriter(db, document_id, workspace_id, existing)
+            chunker = StreamingChunker()
+            pages_processed = 0
 
-            await _set_job(db, document_id, JobStatus.processing, JobStage.embed)
-            await db.commit()
+            async def progress(stage: JobStage) -> None:
+                await _report_progress(
+                    document_id,
+                    stage,
+                    pages_processed if pages_total is not None else None,
+                    pages_total,
+                )
 
-            embeddings = await embed_texts([c.text for c in chunks])
+            segments = (
+                _single_segment(raw_text)
+                if raw_text is not None
+                else iter_file_segments(file_path)
+            )
+            async for window in segments:
+                chunker, produced = await run_cpu(feed_segments, chunker, window)
+                if pages_total is not None:
+                    pages_processed += len(window)
+                await progress(JobStage.chunk)
+                await writer.add(produced, progress)
 
-            await _set_job(db, document_id, JobStatus.processing, JobStage.store)
-            await db.commit()
+            chunker, produced = await run_cpu(feed_segments, chunker, [], True)
+            await writer.add(produced, progress)
+            await writer.flush(progress)
 
-            for c, emb in zip(chunks, embeddings):
-                chunk_row = Chunk(
-                    document_id=document_id,
-                    chunk_index=c.index,
-                    text=c.text,
-                    token_count=c.token_count,
-                )
-                db.add(chunk_row)
-                await db.flush()
-
-                db.add(
-                    ChunkEmbedding(
-                        chunk_id=chunk_row.id,
-                        embedding=emb,
-                    )
-                )
+            if writer.total == 0:
+                raise ValueError("No text extracted" if raw_text is None else "Chunking produced 0 chunks")
 
-                await db.execute(
-                    text("UPDATE chunks SET tsv = :t WHERE id = :id"),
-                    {"t": c.text, "id": chunk_row.id},
-                )
-
-            await _set_job(db, document_id, JobStatus.done, JobStage.complete)
-            await _set_doc_status(db, document_id, DocumentStatus.ready, None)
-            await db.commit()
+            await writer.delete_stale()
+            await _finish(db, document_id, text_hash=text_hash)
 
         except Exception as e:
+            await db.rollback()
+            if not final_attempt:
+                raise
             await _set_job(db, document_id, JobStatus.failed, JobStage.complete, str(e))
             await _set_doc_status(db, document_id, DocumentStatus.error, str(e))
+            await _invalidate_caches(db, document_id)
             await db.commit()
             raise
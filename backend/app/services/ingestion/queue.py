@@ -0,0 +1,208 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.models import IngestionJob, JobStage, JobStatus, SourceType
+
+
+@dataclass
+class ClaimedJob:
+    id: int
+    document_id: int
+    attempts: int
+    payload: dict
+
+
+# A job whose lease expired on its last allowed attempt (the worker died
+# mid-run, e.g. OOM on a huge file) is failed rather than claimed again, so
+# a document that kills workers cannot be retried forever.
+_FAIL_EXHAUSTED_SQL = text("""
+WITH exhausted AS (
+  UPDATE ingestion_jobs
+  SET status = 'failed',
+      stage = 'complete',
+      error = :error,
+      is_active = false,
+      locked_by = NULL,
+      lease_expires_at = NULL,
+      updated_at = now()
+  WHERE is_active
+    AND status = 'processing'
+    AND lease_expires_at < now()
+    AND attempts >= :max_attempts
+  RETURNING document_id
+)
+UPDATE documents d
+SET status = 'error', error = :error
+FROM exhausted e
+WHERE d.id = e.document_id
+""")
+
+# Claims one runnable job: queued jobs whose backoff has elapsed, or
+# processing jobs whose worker stopped renewing the lease. Workspaces with
+# the fewest jobs in flight go first so one bulk upload cannot starve others.
+_CLAIM_SQL = text("""
+WITH running AS (
+  SELECT workspace_id, count(*) AS n
+  FROM ingestion_jobs
+  WHERE is_active
+    AND status = 'processing'
+    AND lease_expires_at > now()
+  GROUP BY workspace_id
+),
+candidate AS (
+  SELECT j.id
+  FROM ingestion_jobs j
+  LEFT JOIN running r ON r.workspace_id IS NOT DISTINCT FROM j.workspace_id
+  WHERE j.is_active
+    AND j.payload IS NOT NULL
+    AND (
+      (j.status = 'queued' AND j.run_after <= now())
+      OR (j.status = 'processing' AND j.lease_expires_at < now())
+    )
+  ORDER BY COALESCE(r.n, 0) ASC, j.run_after ASC, j.id ASC
+  LIMIT 1
+  FOR UPDATE OF j SKIP LOCKED
+)
+UPDATE ingestion_jobs j
+SET status = 'processing',
+    locked_by = :worker_id,
+    lease_expires_at = now() + make_interval(secs => :lease_seconds),
+    attempts = j.attempts + 1,
+    updated_at = now()
+FROM candidate
+WHERE j.id = candidate.id
+RETURNING j.id, j.document_id, j.attempts, j.payload
+""")
+
+
+def retry_delay(attempts: int) -> float:
+    """
+    Exponential backoff after the given number of failed attempts.
+    """
+    delay = settings.ingestion_retry_backoff_seconds * (2 ** max(attempts - 1, 0))
+    return min(delay, settings.ingestion_retry_backoff_max_seconds)
+
+
+async def enqueue_ingestion(
+    db: AsyncSession,
+    document_id: int,
+    workspace_id: str,
+    *,
+    source_type: SourceType,
+    text_input: str | None = None,
+    file_path: str | None = None,
+    url: str | None = None,
+) -> bool:
+    """
+    Create (or reset) the document's job row and commit; a worker picks it
+    up. A job that is still queued or running is left alone (returns False)
+    so the same document is never ingested twice at once.
+    """
+    payload = {
+        "source_type": source_type.value,
+        "text_input": text_input,
+        "file_path": file_path,
+        "url": url,
+    }
+    job = (
+        await db.execute(
+            select(IngestionJob).where(IngestionJob.document_id == document_id).with_for_update()
+        )
+    ).scalar_one_or_none()
+    if job is not None and _in_flight(job):
+        await db.commit()
+        return False
+    if job is None:
+        job = IngestionJob(document_id=document_id)
+        db.add(job)
+
+    job.workspace_id = workspace_id
+    job.payload = payload
+    job.status = JobStatus.queued
+    job.stage = JobStage.extract
+    job.error = None
+    job.is_active = True
+    job.attempts = 0
+    job.run_after = datetime.utcnow()
+    job.locked_by = None
+    job.lease_expires_at = None
+    job.updated_at = datetime.utcnow()
+    await db.commit()
+    return True
+
+
+def _in_flight(job: IngestionJob) -> bool:
+    return bool(job.is_active) and job.status in (JobStatus.queued, JobStatus.processing)
+
+
+async def job_in_flight(db: AsyncSession, document_id: int) -> bool:
+    """
+    Whether the document has a queued or running job. Document status alone
+    does not say: a ready document keeps its status while it is refreshed.
+    """
+    job = (
+        await db.execute(select(IngestionJob).where(IngestionJob.document_id == document_id))
+    ).scalar_one_or_none()
+    return job is not None and _in_flight(job)
+
+
+async def claim_job(db: AsyncSession, worker_id: str) -> ClaimedJob | None:
+    await db.execute(
+        _FAIL_EXHAUSTED_SQL,
+        {
+            "max_attempts": settings.ingestion_max_attempts,
+            "error": f"Worker lease expired on attempt {settings.ingestion_max_attempts}; giving up",
+        },
+    )
+    row = (
+        await db.execute(
+            _CLAIM_SQL,
+            {"worker_id": worker_id, "lease_seconds": settings.ingestion_lease_seconds},
+        )
+    ).first()
+    await db.commit()
+    if row is None:
+        return None
+    return ClaimedJob(id=row.id, document_id=row.document_id, attempts=row.attempts, payload=row.payload)
+
+
+async def renew_lease(db: AsyncSession, job_id: int, worker_id: str) -> None:
+    await db.execute(
+        update(IngestionJob)
+        .where(IngestionJob.id == job_id, IngestionJob.locked_by == worker_id)
+        .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=settings.ingestion_lease_seconds))
+    )
+    await db.commit()
+
+
+async def release_job(db: AsyncSession, job_id: int) -> None:
+    """
+    Mark a finished (done or permanently failed) job inactive.
+    """
+    await db.execute(
+        update(IngestionJob)
+        .where(IngestionJob.id == job_id)
+        .values(is_active=False, locked_by=None, lease_expires_at=None)
+    )
+    await db.commit()
+
+
+async def schedule_retry(db: AsyncSession, job_id: int, attempts: int, error: str) -> None:
+    await db.execute(
+        update(IngestionJob)
+        .where(IngestionJob.id == job_id)
+        .values(
+            status=JobStatus.queued,
+            stage=JobStage.extract,
+            error=error,
+            run_after=datetime.utcnow() + timedelta(seconds=retry_delay(attempts)),
+            locked_by=None,
+            lease_expires_at=None,
+            updated_at=datetime.utcnow(),
+        )
+    )
+    await db.commit()
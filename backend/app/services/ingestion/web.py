@@ -4,6 +4,8 @@ import ssl
 import httpx
 from bs4 import BeautifulSoup, Tag
 
+from app.services.ingestion.executor import run_cpu
+
 BOILERPLATE_SELECTORS = [
     "script",
     "style",
@@ -115,6 +117,19 @@ _ssl_context.check_hostname = False
 _ssl_context.verify_mode = ssl.CERT_NONE
 
 
+def extract_html(html: str) -> tuple[str | None, str]:
+    """
+    Parse HTML into (title, text). CPU-bound; run via the ingestion pool.
+    """
+    soup = BeautifulSoup(html, "lxml")
+    _remove_boilerplate(soup)
+
+    title = soup.title.string.strip() if soup.title and soup.title.string else None
+    root = _best_content_root(soup)
+    text = root.get_text("\n")
+    return title, _clean_text(text)
+
+
 async def fetch_and_extract_url(url: str) -> tuple[str | None, str]:
     """
     Returns (title, text)
@@ -131,10 +146,4 @@ async def fetch_and_extract_url(url: str) -> tuple[str | None, str]:
         r.raise_for_status()
         html = r.text
 
-    soup = BeautifulSoup(html, "lxml")
-    _remove_boilerplate(soup)
-
-    title = soup.title.string.strip() if soup.title and soup.title.string else None
-    root = _best_content_root(soup)
-    text = root.get_text("\n")
-    return title, _clean_text(text)
\ No newline at end of file
+    return await run_cpu(extract_html, html)
@@ -1,25 +1,22 @@
 from openai import AsyncOpenAI
 from app.config import settings
+from app.services.context_packing import pack_context, token_counter
 
 _client = AsyncOpenAI(api_key=settings.openai_api_key)
 
 
-def build_context_snippets(chunks: list[dict], max_chars: int = 8000) -> str:
-    parts = []
-    total = 0
-    for c in chunks:
-        header = f"[doc:{c['document_id']} chunk:{c['chunk_index']} score:{c['score']:.3f} title:{c.get('doc_title') or ''}]"
-        body = c["text"].strip()
-        block = header + "\n" + body
-        if total + len(block) > max_chars:
-            break
-        parts.append(block)
-        total += len(block)
-    return "\n\n---\n\n".join(parts)
+def build_context_snippets(chunks: list[dict], max_tokens: int | None = None) -> str:
+    return pack_context(
+        chunks,
+        max_tokens if max_tokens is not None else settings.context_max_tokens,
+        token_counter(settings.chat_model),
+    )
 
 
-async def answer_query(query: str, chunks: list[dict]) -> tuple[str, list[dict]]:
-    context = build_context_snippets(chunks)
+async def answer_query(
+    query: str, chunks: list[dict], context_chunks: list[dict] | None = None
+) -> tuple[str, list[dict]]:
+    context = build_context_snippets(context_chunks or chunks)
     sys = (
         "You are a precise Second Brain RAG assistant. "
         "Use the provided context as the source of truth. "
@@ -54,8 +51,8 @@ async def answer_query(query: str, chunks: list[dict]) -> tuple[str, list[dict]]
     return answer, citations
 
 
-async def stream_answer(query: str, chunks: list[dict]):
-    context = build_context_snippets(chunks)
+async def stream_answer(query: str, chunks: list[dict], context_chunks: list[dict] | None = None):
+    context = build_context_snippets(context_chunks or chunks)
     sys = (
         "You are a precise Second Brain RAG assistant. "
         "Use the provided context as the source of truth. "
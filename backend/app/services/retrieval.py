@@ -1,12 +1,38 @@
+import asyncio
 import re
+from datetime import timedelta, timezone
 
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.db.database import AsyncSessionLocal
+from app.db.vector_index import apply_search_settings
+from app.models.models import EMBEDDING_DIMENSIONS, WorkspaceSettings
+from app.services import retrieval_cache
+from app.services.fusion import FusionWeights, fuse
+from app.services.timeparse import TimeRange, parse_time_range
+
 MIN_SCORE = 0.35
 MIN_VECTOR_SCORE = 0.35
 MIN_KEYWORD_SCORE = 0.04
 SHORT_CHUNK_MAX_CHARS = 160
+MIN_USABLE_CHARS = 12
+MIN_PLAIN_CHAR_RATIO = 0.72
+_CONTROL_CHARS = re.compile(r"[\x00-\x08\x0B\x0C\x0E-\x1F]")
+_PLAIN_CHARS = re.compile(r"""[A-Za-z0-9 .,;:!?()'"/-]""")
+
+# Server-side twin of is_usable_chunk_text, used to backfill existing rows.
+# Queries test `is_usable IS NOT FALSE` so chunks the backfill has not
+# reached yet (NULL) stay retrievable.
+USABLE_CHUNK_SQL = """
+  length(text) >= 12
+  AND text !~ '[\\x00-\\x08\\x0B\\x0C\\x0E-\\x1F]'
+  AND (
+    length(text) - length(regexp_replace(text, '[A-Za-z0-9 .,;:!?()''"/-]', '', 'g'))
+  )::float / GREATEST(length(text), 1) > 0.72
+"""
+
 STOP_WORDS = {
     "a",
     "about",
@@ -41,6 +67,19 @@ STOP_WORDS = {
 }
 
 
+def is_usable_chunk_text(text_value: str) -> bool:
+    """
+    Quality gate applied once at ingestion time (stored as chunks.is_usable):
+    long enough, no control characters, and mostly plain prose characters.
+    """
+    if len(text_value) < MIN_USABLE_CHARS:
+        return False
+    if _CONTROL_CHARS.search(text_value):
+        return False
+    plain = len(_PLAIN_CHARS.findall(text_value))
+    return plain / max(len(text_value), 1) > MIN_PLAIN_CHAR_RATIO
+
+
 def _terms(text_value: str) -> set[str]:
     return {
         term
@@ -53,6 +92,109 @@ def _query_terms(query_text: str) -> list[str]:
     return sorted(_terms(query_text))
 
 
+def term_match_clause(terms: list[str], trigram_index: bool) -> tuple[str, dict]:
+    """
+    Predicate for the term_matches stage. With pg_trgm the substring match
+    is a single ILIKE ANY(...) that ix_chunks_text_trgm can answer as one
+    bitmap scan; without it, fall back to word-prefix matches on the GIN
+    indexed tsv column rather than scanning every chunk's text.
+    """
+    if not terms:
+        return "false", {}
+    if trigram_index:
+        return "c.text ILIKE ANY(CAST(:term_patterns AS text[]))", {
+            "term_patterns": [f"%{term}%" for term in terms]
+        }
+    return "c.tsv @@ to_tsquery('english', :term_prefix_query)", {
+        "term_prefix_query": " | ".join(f"{term}:*" for term in terms)
+    }
+
+
+def ann_candidates_sql(storage_mode: str, dimensions: int, extra_filter: str = "") -> str:
+    """
+    Body of the ann CTE: the workspace's nearest embeddings by exact cosine
+    distance. Quantized modes order :ann_prefetch rows by the expression the
+    ANN index is built on (see app.db.vector_index.indexed_expression), then
+    re-rank them with the stored float vectors. `extra_filter` is ANDed into
+    the scan itself, so iterative index scans keep going until it is met.
+    """
+    exact = "e.embedding <=> CAST(:qvec AS vector)"
+    where = "e.workspace_id = :workspace_id" + (f" AND {extra_filter}" if extra_filter else "")
+    if storage_mode == "float":
+        return f"""
+      SELECT e.chunk_id, {exact} AS distance
+      FROM chunk_embeddings e
+      WHERE {where}
+      ORDER BY {exact}
+      LIMIT :ann_limit"""
+    if storage_mode == "halfvec":
+        approx = f"e.embedding::halfvec({dimensions}) <=> CAST(:qvec AS halfvec({dimensions}))"
+    elif storage_mode == "binary":
+        approx = f"binary_quantize(e.embedding)::bit({dimensions}) <~> binary_quantize(CAST(:qvec AS vector))"
+    else:
+        raise ValueError(f"Unknown vector storage mode: {storage_mode!r}")
+    return f"""
+      SELECT chunk_id, distance
+      FROM (
+        SELECT e.chunk_id, {exact} AS distance
+        FROM chunk_embeddings e
+        WHERE {where}
+        ORDER BY {approx}
+        LIMIT :ann_prefetch
+      ) prefetched
+      ORDER BY distance
+      LIMIT :ann_limit"""
+
+
+def time_range_clause(time_range: TimeRange | None) -> tuple[str, dict]:
+    """
+    Document predicate for a time-scoped question: saved or published
+    inside the range. Each side is a plain range on one column so
+    ix_documents_workspace_created_id / ix_documents_workspace_published_at
+    can answer it with a BitmapOr.
+    """
+    if time_range is None:
+        return "true", {}
+    return (
+        "((d.created_at >= :range_start AND d.created_at < :range_end)"
+        " OR (d.source_published_at >= :range_start AND d.source_published_at < :range_end))",
+        {
+            # parse_time_range returns naive UTC; the columns are timestamptz.
+            "range_start": time_range.start.replace(tzinfo=timezone.utc),
+            "range_end": time_range.end.replace(tzinfo=timezone.utc),
+        },
+    )
+
+
+def time_scoped_chunks_filter(time_clause: str) -> str:
+    """
+    ANN scan filter for a wide time range. ARRAY(...) is evaluated once as
+    an InitPlan and checked per index row; a plain IN would be pulled up
+    into a semi-join and lose the ordered index scan.
+    """
+    return (
+        "e.chunk_id = ANY(ARRAY("
+        "SELECT c.id FROM documents d JOIN chunks c ON c.document_id = d.id"
+        f" WHERE d.workspace_id = :workspace_id AND {time_clause}))"
+    )
+
+
+_trigram_index_available: bool | None = None
+
+
+async def has_trigram_index(db: AsyncSession) -> bool:
+    global _trigram_index_available
+    if _trigram_index_available is None:
+        _trigram_index_available = bool(
+            (
+                await db.execute(
+                    text("SELECT EXISTS (SELECT 1 FROM pg_indexes WHERE indexname = 'ix_chunks_text_trgm')")
+                )
+            ).scalar()
+        )
+    return _trigram_index_available
+
+
 def _has_short_note_overlap(row, query_text: str) -> bool:
     chunk_text = str(row["text"] or "")
     if len(chunk_text) > SHORT_CHUNK_MAX_CHARS:
@@ -78,43 +220,182 @@ async def retrieve_top_chunks(
     query_text: str,
     workspace_id: str,
     limit: int = 8,
-):
-    vector_str = "[" + ",".join(str(x) for x in query_embedding) + "]"
-    candidate_limit = max(limit * 6, 36)
+) -> list[dict]:
+    """
+    Hybrid retrieval, served from the result cache while the workspace's
+    corpus version is unchanged.
+    """
+    params = {
+        "limit": limit,
+        "embedding_model": settings.embedding_model,
+        "embedding_dimensions": settings.embedding_dimensions,
+        "storage_mode": settings.vector_storage_mode,
+        "rerank_factor": settings.vector_rerank_factor,
+        "ef_search": settings.hnsw_ef_search,
+        "probes": settings.ivfflat_probes,
+        # Workspace overrides bump the corpus version instead.
+        "fusion": [
+            settings.fusion_mode,
+            settings.fusion_vector_weight,
+            settings.fusion_keyword_weight,
+            settings.fusion_rank_weight,
+            settings.fusion_rrf_k,
+        ],
+    }
+    time_range = parse_time_range(query_text)
+    if time_range is not None:
+        # "yesterday" means a different range tomorrow.
+        params["time_range"] = [time_range.start.isoformat(), time_range.end.isoformat()]
+    version = await retrieval_cache.get_corpus_version(db, workspace_id)
+    key = retrieval_cache.cache_key(workspace_id, query_text, params, version)
+    cached = await retrieval_cache.lookup(key)
+    if cached is not None:
+        return cached
+
+    rows = await _search_chunks(db, query_embedding, query_text, workspace_id, limit, time_range)
+    await retrieval_cache.store(key, rows)
+    return rows
+
+
+async def fusion_weights_for(db: AsyncSession, workspace_id: str) -> FusionWeights:
+    """
+    Global fusion defaults with the workspace's overrides applied.
+    """
+    weights = FusionWeights(
+        mode=settings.fusion_mode,
+        vector=settings.fusion_vector_weight,
+        keyword=settings.fusion_keyword_weight,
+        rank=settings.fusion_rank_weight,
+        rrf_k=settings.fusion_rrf_k,
+    )
+    row = await db.get(WorkspaceSettings, workspace_id)
+    if row is None:
+        return weights
+    return weights.override(
+        mode=row.fusion_mode,
+        vector=row.vector_weight,
+        keyword=row.keyword_weight,
+        rank=row.rank_weight,
+        rrf_k=row.rrf_k,
+    )
+
+
+_SCOPED_VECTOR_SQL = """
+    WITH scoped_chunks AS MATERIALIZED (
+      SELECT c.id, c.document_id, c.chunk_index, c.text, d.title AS doc_title, d.created_at AS doc_created_at
+      FROM documents d
+      JOIN chunks c ON c.document_id = d.id
+      WHERE d.workspace_id = :workspace_id
+        AND d.status = 'ready'
+        AND c.is_usable IS NOT FALSE
+        AND {time_clause}
+    )
+    SELECT
+      c.id AS chunk_id,
+      c.document_id,
+      c.chunk_index,
+      c.text,
+      c.doc_title,
+      c.doc_created_at,
+      1 - (e.embedding <=> CAST(:qvec AS vector)) AS vector_score,
+      row_number() OVER (ORDER BY e.embedding <=> CAST(:qvec AS vector)) AS vector_rank
+    FROM scoped_chunks c
+    JOIN chunk_embeddings e ON e.chunk_id = c.id
+    ORDER BY e.embedding <=> CAST(:qvec AS vector)
+    LIMIT :candidate_limit
+"""
 
-    sql = text("""
-    WITH usable_chunks AS (
-      SELECT c.*
+
+async def _vector_candidates(
+    db: AsyncSession,
+    vector_str: str,
+    workspace_id: str,
+    candidate_limit: int,
+    time_range: TimeRange | None = None,
+) -> list[dict]:
+    time_clause, time_params = time_range_clause(time_range)
+    if time_range is not None and time_range.end - time_range.start <= timedelta(
+        days=settings.time_filter_exact_max_days
+    ):
+        # A narrow range leaves few enough chunks that ranking them exactly
+        # beats an ANN scan whose hits are mostly filtered out.
+        result = await db.execute(
+            text(_SCOPED_VECTOR_SQL.format(time_clause=time_clause)),
+            {
+                "qvec": vector_str,
+                "workspace_id": workspace_id,
+                "candidate_limit": candidate_limit,
+                **time_params,
+            },
+        )
+        return [dict(row) for row in result.mappings().all()]
+
+    # Headroom for unusable chunks and documents that are not ready yet.
+    ann_limit = candidate_limit * 2
+    ann_sql = ann_candidates_sql(
+        settings.vector_storage_mode,
+        EMBEDDING_DIMENSIONS,
+        time_scoped_chunks_filter(time_clause) if time_range is not None else "",
+    )
+
+    await apply_search_settings(db)
+
+    sql = text(f"""
+    WITH ann AS MATERIALIZED (
+      -- Filter on the denormalized workspace_id inside the vector scan:
+      -- small workspaces get an exact scan via ix_chunk_embeddings_workspace,
+      -- large ones an ANN scan that iterates until the LIMIT is filled.
+      {ann_sql}
+    )
+    SELECT
+      c.id AS chunk_id,
+      c.document_id,
+      c.chunk_index,
+      c.text,
+      d.title AS doc_title,
+      d.created_at AS doc_created_at,
+      1 - a.distance AS vector_score,
+      row_number() OVER (ORDER BY a.distance) AS vector_rank
+    FROM ann a
+    JOIN chunks c ON c.id = a.chunk_id
+    JOIN documents d ON d.id = c.document_id
+    WHERE d.workspace_id = :workspace_id
+      AND d.status = 'ready'
+      AND c.is_usable IS NOT FALSE
+    ORDER BY a.distance
+    LIMIT :candidate_limit
+    """)
+    result = await db.execute(
+        sql,
+        {
+            "qvec": vector_str,
+            "workspace_id": workspace_id,
+            "candidate_limit": candidate_limit,
+            "ann_limit": ann_limit,
+            "ann_prefetch": ann_limit * settings.vector_rerank_factor,
+            **time_params,
+        },
+    )
+    return [dict(row) for row in result.mappings().all()]
+
+
+def keyword_candidates_sql(term_match: str, time_clause: str = "true") -> str:
+    """
+    Keyword candidates: full-text matches ranked by ts_rank_cd plus plain
+    term matches for short notes, over the workspace's usable chunks.
+    """
+    return f"""
+    WITH usable_chunks AS NOT MATERIALIZED (
+      SELECT c.id, c.document_id, c.chunk_index, c.text, c.tsv, d.title AS doc_title, d.created_at AS doc_created_at
       FROM chunks c
       JOIN documents d ON d.id = c.document_id
       WHERE d.workspace_id = :workspace_id
         AND d.status = 'ready'
-        AND length(c.text) >= 12
-        AND c.text !~ '[\\x00-\\x08\\x0B\\x0C\\x0E-\\x1F]'
-        AND (
-          length(c.text) - length(regexp_replace(c.text, '[A-Za-z0-9 .,;:!?()''"/-]', '', 'g'))
-        )::float / GREATEST(length(c.text), 1) > 0.72
+        AND c.is_usable IS NOT FALSE
+        AND {time_clause}
     ),
     q AS (
-      SELECT
-        CAST(:qvec AS vector) AS qvec,
-        websearch_to_tsquery('english', :query) AS query_terms
-    ),
-    vec AS (
-      SELECT
-        c.id AS chunk_id,
-        c.document_id,
-        c.chunk_index,
-        c.text,
-        d.title AS doc_title,
-        d.created_at AS doc_created_at,
-        1 - (e.embedding <=> (SELECT qvec FROM q)) AS vector_score,
-        row_number() OVER (ORDER BY e.embedding <=> (SELECT qvec FROM q)) AS vector_rank
-      FROM chunk_embeddings e
-      JOIN usable_chunks c ON c.id = e.chunk_id
-      JOIN documents d ON d.id = c.document_id
-      ORDER BY e.embedding <=> (SELECT qvec FROM q)
-      LIMIT :candidate_limit
+      SELECT websearch_to_tsquery('english', :query) AS query_terms
     ),
     kw AS (
       SELECT
@@ -122,21 +403,14 @@ async def retrieve_top_chunks(
         c.document_id,
         c.chunk_index,
         c.text,
-        d.title AS doc_title,
-        d.created_at AS doc_created_at,
-        ts_rank_cd(
-          to_tsvector('english', COALESCE(c.tsv, c.text)),
-          (SELECT query_terms FROM q)
-        ) AS keyword_score,
+        c.doc_title,
+        c.doc_created_at,
+        ts_rank_cd(c.tsv, (SELECT query_terms FROM q)) AS keyword_score,
         row_number() OVER (
-          ORDER BY ts_rank_cd(
-            to_tsvector('english', COALESCE(c.tsv, c.text)),
-            (SELECT query_terms FROM q)
-          ) DESC
+          ORDER BY ts_rank_cd(c.tsv, (SELECT query_terms FROM q)) DESC
         ) AS keyword_rank
       FROM usable_chunks c
-      JOIN documents d ON d.id = c.document_id
-      WHERE (SELECT query_terms FROM q) @@ to_tsvector('english', COALESCE(c.tsv, c.text))
+      WHERE c.tsv @@ (SELECT query_terms FROM q)
       ORDER BY keyword_score DESC
       LIMIT :candidate_limit
     ),
@@ -146,80 +420,161 @@ async def retrieve_top_chunks(
         c.document_id,
         c.chunk_index,
         c.text,
-        d.title AS doc_title,
-        d.created_at AS doc_created_at,
+        c.doc_title,
+        c.doc_created_at,
         0.05 AS keyword_score,
         row_number() OVER (ORDER BY length(c.text) ASC) AS keyword_rank
       FROM usable_chunks c
-      JOIN documents d ON d.id = c.document_id
-      WHERE EXISTS (
-        SELECT 1
-        FROM unnest(CAST(:query_terms AS text[])) AS term
-        WHERE c.text ILIKE '%' || term || '%'
-      )
+      WHERE {term_match}
       LIMIT :candidate_limit
     ),
     keyword_candidates AS (
       SELECT * FROM kw
       UNION ALL
       SELECT * FROM term_matches
-    ),
-    deduped_kw AS (
-      SELECT DISTINCT ON (chunk_id)
-        chunk_id, document_id, chunk_index, text, doc_title, doc_created_at, keyword_score, keyword_rank
-      FROM keyword_candidates
-      ORDER BY chunk_id, keyword_score DESC, keyword_rank ASC
-    ),
-    candidates AS (
-      SELECT
-        COALESCE(v.chunk_id, k.chunk_id) AS chunk_id,
-        COALESCE(v.document_id, k.document_id) AS document_id,
-        COALESCE(v.chunk_index, k.chunk_index) AS chunk_index,
-        COALESCE(v.text, k.text) AS text,
-        COALESCE(v.doc_title, k.doc_title) AS doc_title,
-        COALESCE(v.doc_created_at, k.doc_created_at) AS doc_created_at,
-        COALESCE(v.vector_score, 0) AS vector_score,
-        COALESCE(k.keyword_score, 0) AS keyword_score,
-        v.vector_rank,
-        k.keyword_rank
-      FROM vec v
-      FULL OUTER JOIN deduped_kw k ON k.chunk_id = v.chunk_id
     )
-    SELECT
-      chunk_id,
-      document_id,
-      chunk_index,
-      text,
-      doc_title,
-      doc_created_at,
-      vector_score,
-      keyword_score,
-      vector_rank,
-      keyword_rank,
-      (
-        0.72 * vector_score +
-        0.18 * LEAST(keyword_score, 1) +
-        0.10 * (
-          COALESCE(1.0 / NULLIF(vector_rank, 0), 0) +
-          COALESCE(1.0 / NULLIF(keyword_rank, 0), 0)
-        )
-      ) AS score
-    FROM candidates
-    ORDER BY score DESC, vector_score DESC, keyword_score DESC
-    LIMIT :candidate_limit
-    """)
+    SELECT DISTINCT ON (chunk_id)
+      chunk_id, document_id, chunk_index, text, doc_title, doc_created_at, keyword_score, keyword_rank
+    FROM keyword_candidates
+    ORDER BY chunk_id, keyword_score DESC, keyword_rank ASC
+    """
+
 
+async def _keyword_candidates(
+    db: AsyncSession,
+    query_text: str,
+    workspace_id: str,
+    candidate_limit: int,
+    time_range: TimeRange | None = None,
+) -> list[dict]:
+    term_match, term_params = term_match_clause(_query_terms(query_text), await has_trigram_index(db))
+    time_clause, time_params = time_range_clause(time_range)
+
+    sql = text(keyword_candidates_sql(term_match, time_clause))
     result = await db.execute(
         sql,
         {
-            "qvec": vector_str,
             "query": query_text,
             "workspace_id": workspace_id,
             "candidate_limit": candidate_limit,
-            "query_terms": _query_terms(query_text),
+            **term_params,
+            **time_params,
         },
     )
+    return [dict(row) for row in result.mappings().all()]
+
+
+async def _search_chunks(
+    db: AsyncSession,
+    query_embedding: list[float],
+    query_text: str,
+    workspace_id: str,
+    limit: int,
+    time_range: TimeRange | None = None,
+) -> list[dict]:
+    """
+    Vector and keyword candidates come from separate queries, run
+    concurrently (the keyword one on a second pooled connection) unless
+    retrieval_parallel is off, and are fused in Python. A time range
+    restricts both to documents saved or published inside it; when nothing
+    in the range is relevant the search is repeated unscoped.
+    """
+    vector_str = "[" + ",".join(str(x) for x in query_embedding) + "]"
+    candidate_limit = max(limit * 6, 36)
+    weights = await fusion_weights_for(db, workspace_id)
+
+    if settings.retrieval_parallel:
 
-    rows = [row for row in result.mappings().all() if _passes_relevance(row, query_text)]
+        async def keyword_on_own_connection() -> list[dict]:
+            async with AsyncSessionLocal() as kw_db:
+                return await _keyword_candidates(kw_db, query_text, workspace_id, candidate_limit, time_range)
+
+        vector_rows, keyword_rows = await asyncio.gather(
+            _vector_candidates(db, vector_str, workspace_id, candidate_limit, time_range),
+            keyword_on_own_connection(),
+        )
+    else:
+        vector_rows = await _vector_candidates(db, vector_str, workspace_id, candidate_limit, time_range)
+        keyword_rows = await _keyword_candidates(db, query_text, workspace_id, candidate_limit, time_range)
+
+    fused = fuse(vector_rows, keyword_rows, weights, candidate_limit)
+    rows = [row for row in fused if _passes_relevance(row, query_text)]
+    if time_range is not None and not rows:
+        # The date may be about the content ("what happened in 2019"), not
+        # about when it was saved.
+        return await _search_chunks(db, query_embedding, query_text, workspace_id, limit)
     return rows[:limit]
 
+
+def merge_windows(chunks: list[dict], window: int) -> list[dict]:
+    """
+    The chunk_index ranges covering ±window neighbours of every hit, with
+    overlapping or touching ranges in the same document merged. Each range
+    keeps the best score and the title of the hits inside it.
+    """
+    ranges: list[dict] = []
+    for c in sorted(chunks, key=lambda c: (c["document_id"], c["chunk_index"])):
+        lo, hi = max(0, c["chunk_index"] - window), c["chunk_index"] + window
+        score = float(c["score"] or 0.0)
+        last = ranges[-1] if ranges else None
+        if last is not None and last["document_id"] == c["document_id"] and lo <= last["hi"] + 1:
+            last["hi"] = max(last["hi"], hi)
+            last["score"] = max(last["score"], score)
+            continue
+        ranges.append(
+            {"document_id": c["document_id"], "lo": lo, "hi": hi, "score": score, "doc_title": c.get("doc_title")}
+        )
+    return ranges
+
+
+async def expand_windows(db: AsyncSession, chunks: list[dict], window: int | None = None) -> list[dict]:
+    """
+    Hits plus their ±window neighbours (context_window_chunks by default),
+    fetched for all hits in one range query on (document_id, chunk_index)
+    and returned in document order, ready for build_context_snippets to
+    merge into contiguous passages. Neighbours carry the score of the
+    window they fill.
+    """
+    if window is None:
+        window = settings.context_window_chunks
+    if window <= 0 or not chunks:
+        return chunks
+
+    ranges = merge_windows(chunks, window)
+    result = await db.execute(
+        text("""
+        SELECT w.ord, c.id AS chunk_id, c.document_id, c.chunk_index, c.text
+        FROM unnest(
+          CAST(:document_ids AS int[]), CAST(:los AS int[]), CAST(:his AS int[])
+        ) WITH ORDINALITY AS w(document_id, lo, hi, ord)
+        JOIN chunks c
+          ON c.document_id = w.document_id
+         AND c.chunk_index BETWEEN w.lo AND w.hi
+        WHERE c.is_usable IS NOT FALSE
+        ORDER BY c.document_id, c.chunk_index
+        """),
+        {
+            "document_ids": [r["document_id"] for r in ranges],
+            "los": [r["lo"] for r in ranges],
+            "his": [r["hi"] for r in ranges],
+        },
+    )
+
+    hits = {c["chunk_id"]: c for c in chunks}
+    expanded = []
+    for row in result.mappings().all():
+        if row["chunk_id"] in hits:
+            expanded.append(hits[row["chunk_id"]])
+            continue
+        window_range = ranges[row["ord"] - 1]
+        expanded.append(
+            {
+                "chunk_id": row["chunk_id"],
+                "document_id": row["document_id"],
+                "chunk_index": row["chunk_index"],
+                "text": row["text"],
+                "doc_title": window_range["doc_title"],
+                "score": window_range["score"],
+            }
+        )
+    return expanded
@@ -0,0 +1,139 @@
+"""
+Retrieval result cache.
+
+Entries are keyed by workspace, normalized query, retrieval parameters and
+the workspace's corpus version (workspace_versions). The version is bumped
+in the same transaction that makes a document ready, fails it or deletes
+it, so a cached result never outlives the corpus it was computed from.
+"""
+from datetime import datetime
+from typing import Any, Callable
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.metrics import Metric, register_collector
+from app.models.models import WorkspaceVersion
+from app.services.cache import (
+    CacheBackend,
+    LRUCache,
+    MemoryCacheBackend,
+    NullCacheBackend,
+    normalize_for_cache,
+    stable_key,
+)
+
+
+def _rows_size(rows: list[dict]) -> int:
+    # Chunk text dominates; the other columns are a few small scalars.
+    return sum(len(str(row.get("text") or "")) + 256 for row in rows)
+
+
+_BACKENDS: dict[str, Callable[[], CacheBackend]] = {
+    "memory": lambda: MemoryCacheBackend(
+        LRUCache(
+            max_entries=settings.retrieval_cache_size,
+            weigher=_rows_size,
+            max_weight=settings.retrieval_cache_max_bytes,
+        )
+    ),
+    "none": NullCacheBackend,
+}
+
+_backend: CacheBackend | None = None
+_hits = 0
+_misses = 0
+
+
+def register_backend(name: str, factory: Callable[[], CacheBackend]) -> None:
+    """
+    Make a backend selectable with RETRIEVAL_CACHE_BACKEND=<name>.
+    """
+    _BACKENDS[name] = factory
+
+
+def set_backend(backend: CacheBackend | None) -> None:
+    global _backend
+    _backend = backend
+
+
+def get_backend() -> CacheBackend:
+    global _backend
+    if _backend is None:
+        _backend = _BACKENDS[settings.retrieval_cache_backend]()
+    return _backend
+
+
+async def get_corpus_version(db: AsyncSession, workspace_id: str) -> int:
+    version = (
+        await db.execute(select(WorkspaceVersion.version).where(WorkspaceVersion.workspace_id == workspace_id))
+    ).scalar_one_or_none()
+    return version or 0
+
+
+async def bump_corpus_version(db: AsyncSession, workspace_id: str | None) -> None:
+    """
+    Invalidate the workspace's cached results. Runs in the caller's
+    transaction so the bump commits together with the corpus change.
+    """
+    if not workspace_id:
+        return
+    stmt = pg_insert(WorkspaceVersion).values(workspace_id=workspace_id, version=1, updated_at=datetime.utcnow())
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[WorkspaceVersion.workspace_id],
+            set_={"version": WorkspaceVersion.version + 1, "updated_at": stmt.excluded.updated_at},
+        )
+    )
+
+
+_BUMP_ALL_SQL = text("""
+INSERT INTO workspace_versions (workspace_id, version, updated_at)
+SELECT DISTINCT workspace_id, 1, now() FROM documents WHERE workspace_id IS NOT NULL
+ON CONFLICT (workspace_id) DO UPDATE
+SET version = workspace_versions.version + 1, updated_at = excluded.updated_at
+""")
+
+
+async def bump_all_corpus_versions(conn) -> None:
+    """
+    Invalidate every workspace's cached results, for migrations and
+    backfills that change what retrieval returns across the board.
+    """
+    await conn.execute(_BUMP_ALL_SQL)
+
+
+def cache_key(workspace_id: str, query_text: str, params: dict[str, Any], version: int) -> str:
+    return stable_key(workspace_id, normalize_for_cache(query_text), params, version)
+
+
+async def lookup(key: str) -> list[dict] | None:
+    global _hits, _misses
+    rows = await get_backend().get(key)
+    if rows is None:
+        _misses += 1
+        return None
+    _hits += 1
+    return [dict(row) for row in rows]
+
+
+async def store(key: str, rows: list[dict]) -> None:
+    await get_backend().set(key, [dict(row) for row in rows])
+
+
+@register_collector
+def retrieval_cache_metrics() -> list[Metric]:
+    backend = get_backend()
+    metrics = [
+        Metric("retrieval_cache_hits_total", "counter", "Retrievals served from the result cache", _hits),
+        Metric("retrieval_cache_misses_total", "counter", "Retrievals that ran the hybrid query", _misses),
+    ]
+    if isinstance(backend, MemoryCacheBackend):
+        metrics += [
+            Metric("retrieval_cache_entries", "gauge", "Retrieval results held in memory", len(backend)),
+            Metric("retrieval_cache_bytes", "gauge", "Approximate size of cached retrieval results", backend.lru.weight),
+            Metric("retrieval_cache_evictions_total", "counter", "Retrieval results evicted", backend.lru.evictions),
+        ]
+    return metrics
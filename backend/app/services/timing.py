@@ -0,0 +1,64 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator, TypeVar
+
+from app.metrics import Metric, register_collector
+
+T = TypeVar("T")
+
+_stage_seconds: dict[str, float] = defaultdict(float)
+_stage_counts: dict[str, int] = defaultdict(int)
+
+
+class StageTimer:
+    """
+    Per-request stage timings. Stages may overlap (e.g. embedding runs
+    while the conversation is written), so durations need not add up to
+    the total; `mark` records an offset from the start such as time to
+    first token.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        self.started = clock()
+        self.stages: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + self._clock() - started
+
+    async def run(self, name: str, awaitable: Awaitable[T]) -> T:
+        with self.stage(name):
+            return await awaitable
+
+    def mark(self, name: str) -> None:
+        self.stages[name] = self._clock() - self.started
+
+    def as_millis(self) -> dict[str, float]:
+        return {name: round(seconds * 1000, 1) for name, seconds in self.stages.items()}
+
+    def server_timing(self) -> str:
+        """
+        Value for a Server-Timing response header.
+        """
+        return ", ".join(f"{name};dur={ms}" for name, ms in self.as_millis().items())
+
+
+def record_timings(prefix: str, timer: StageTimer) -> None:
+    for name, seconds in timer.stages.items():
+        _stage_seconds[f"{prefix}_{name}"] += seconds
+        _stage_counts[f"{prefix}_{name}"] += 1
+
+
+@register_collector
+def stage_timing_metrics() -> list[Metric]:
+    metrics = []
+    for key in sorted(_stage_seconds):
+        metrics.append(Metric(f"{key}_seconds_total", "counter", f"Total seconds spent in {key}", _stage_seconds[key]))
+        metrics.append(Metric(f"{key}_count", "counter", f"Requests that recorded {key}", _stage_counts[key]))
+    return metrics
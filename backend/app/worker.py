@@ -0,0 +1,134 @@
+"""
+Standalone ingestion worker.
+
+    python -m app.worker
+
+Drains the Postgres-backed ingestion queue with a bounded number of
+concurrent jobs. Run as many processes as needed; jobs are claimed with
+SELECT ... FOR UPDATE SKIP LOCKED and leased, so a crashed worker's jobs
+are picked up again once their lease expires.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import signal
+import socket
+from uuid import uuid4
+
+from app.config import settings
+from app.db.database import AsyncSessionLocal, engine
+from app.models.models import SourceType
+from app.services.ingestion.executor import shutdown_process_pool
+from app.services.ingestion.pipeline import run_ingestion_pipeline
+from app.services.ingestion.queue import (
+    ClaimedJob,
+    claim_job,
+    release_job,
+    renew_lease,
+    schedule_retry,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionWorker:
+    def __init__(self, concurrency: int | None = None):
+        self.concurrency = concurrency or settings.ingestion_worker_concurrency
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def run(self) -> None:
+        logger.info("Ingestion worker %s started (concurrency=%s)", self.worker_id, self.concurrency)
+        slots = [asyncio.create_task(self._slot()) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*slots)
+        finally:
+            for task in slots:
+                task.cancel()
+
+    async def _slot(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                async with AsyncSessionLocal() as db:
+                    job = await claim_job(db, self.worker_id)
+            except Exception as exc:
+                logger.warning("Claiming ingestion job failed: %s", exc)
+                job = None
+
+            if job is None:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        self._stopping.wait(),
+                        timeout=settings.ingestion_poll_interval_seconds,
+                    )
+                continue
+
+            await self._process(job)
+
+    async def _heartbeat(self, job_id: int) -> None:
+        interval = max(settings.ingestion_lease_seconds / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await renew_lease(db, job_id, self.worker_id)
+            except Exception as exc:
+                logger.warning("Renewing lease for job %s failed: %s", job_id, exc)
+
+    async def _bookkeep(self, action, job_id: int, *args) -> None:
+        # A failed release must not kill the slot (and with it every other
+        # slot in gather); the job's lease expires and it is reclaimed.
+        try:
+            async with AsyncSessionLocal() as db:
+                await action(db, job_id, *args)
+        except Exception:
+            logger.exception("Updating ingestion job %s failed; it will be reclaimed after its lease", job_id)
+
+    async def _process(self, job: ClaimedJob) -> None:
+        final_attempt = job.attempts >= settings.ingestion_max_attempts
+        payload = job.payload
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        try:
+            await run_ingestion_pipeline(
+                job.document_id,
+                source_type=SourceType(payload["source_type"]),
+                text_input=payload.get("text_input"),
+                file_path=payload.get("file_path"),
+                url=payload.get("url"),
+                final_attempt=final_attempt,
+            )
+        except Exception as exc:
+            if final_attempt:
+                logger.error("Ingestion job %s failed permanently: %s", job.id, exc)
+                await self._bookkeep(release_job, job.id)
+            else:
+                logger.warning("Ingestion job %s attempt %s failed: %s", job.id, job.attempts, exc)
+                await self._bookkeep(schedule_retry, job.id, job.attempts, str(exc))
+        else:
+            await self._bookkeep(release_job, job.id)
+        finally:
+            heartbeat.cancel()
+
+
+async def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    worker = IngestionWorker()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        shutdown_process_pool()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
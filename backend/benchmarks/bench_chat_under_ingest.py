@@ -0,0 +1,102 @@
+"""
+Chat latency while large documents are being ingested.
+
+Start the API (with INGESTION_INLINE_WORKER=true so ingestion shares the
+web process), then:
+
+    python -m benchmarks.bench_chat_under_ingest --pdf big.pdf --uploads 4
+
+Runs a steady stream of /v1/chat/stream requests for a baseline window,
+then again while the PDF is uploaded `--uploads` times, and prints p50/p99
+time-to-first-byte for both phases. Compare INGESTION_PROCESS_WORKERS=0
+(threads) against a process pool to see the event-loop effect.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from pathlib import Path
+
+import httpx
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _chat_loop(client: httpx.AsyncClient, headers: dict, stop: asyncio.Event, out: list[float]) -> None:
+    # Small talk skips embedding/LLM calls, so only server-side scheduling is measured.
+    while not stop.is_set():
+        started = time.perf_counter()
+        async with client.stream("POST", "/v1/chat/stream", json={"query": "hello"}, headers=headers) as resp:
+            async for _ in resp.aiter_bytes():
+                out.append(time.perf_counter() - started)
+                break
+            async for _ in resp.aiter_bytes():
+                pass
+
+
+async def _measure(client, headers, seconds: float, concurrency: int, load=None) -> list[float]:
+    stop = asyncio.Event()
+    samples: list[float] = []
+    loops = [asyncio.create_task(_chat_loop(client, headers, stop, samples)) for _ in range(concurrency)]
+    load_task = asyncio.create_task(load()) if load else None
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*loops)
+    if load_task:
+        await load_task
+    return samples
+
+
+def _report(name: str, samples: list[float]) -> None:
+    if not samples:
+        print(f"{name:16s} no samples")
+        return
+    print(
+        f"{name:16s} n={len(samples)} "
+        f"p50={statistics.median(samples) * 1000:.1f}ms "
+        f"p99={_percentile(samples, 99) * 1000:.1f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--workspace", default="bench-ingest-workspace")
+    parser.add_argument("--pdf", required=True)
+    parser.add_argument("--uploads", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    headers = {"X-Workspace-Id": args.workspace}
+    pdf = Path(args.pdf)
+    data = pdf.read_bytes()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120) as client:
+
+        async def upload_all():
+            # Vary the bytes so content-hash deduplication does not skip uploads.
+            await asyncio.gather(
+                *(
+                    client.post(
+                        "/v1/ingest/file",
+                        headers=headers,
+                        files={"file": (pdf.name, data + f"\n%{time.time()}-{i}".encode(), "application/pdf")},
+                    )
+                    for i in range(args.uploads)
+                )
+            )
+
+        baseline = await _measure(client, headers, args.seconds, args.concurrency)
+        loaded = await _measure(client, headers, args.seconds, args.concurrency, upload_all)
+
+    _report("idle", baseline)
+    _report("during ingest", loaded)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
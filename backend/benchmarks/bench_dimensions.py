@@ -0,0 +1,123 @@
+"""
+Retrieval quality vs latency for shortened (Matryoshka) embeddings.
+
+    python -m benchmarks.bench_dimensions --workspace my-workspace --dims 256 512 1024
+
+Needs DATABASE_URL / OPENAI_API_KEY in the environment (the key is not used).
+Uses a workspace already ingested with full-size text-embedding-3 vectors.
+For each dimension, the workspace's vectors are shortened in SQL (prefix +
+re-normalize, equivalent to requesting `dimensions` from the API) into an
+unlogged scratch table with its own HNSW index. Sampled chunk vectors are
+used as queries; recall@k is measured against exact search on the full
+vectors, alongside exact and HNSW latency at each size.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.db.database import AsyncSessionLocal, engine
+
+_SAMPLE_SQL = text("""
+SELECT e.chunk_id FROM chunk_embeddings e
+WHERE e.workspace_id = :workspace_id
+ORDER BY random()
+LIMIT :n
+""")
+
+_FULL_SQL = text("""
+SELECT e.chunk_id FROM chunk_embeddings e
+WHERE e.workspace_id = :workspace_id
+ORDER BY e.embedding <=> (SELECT embedding FROM chunk_embeddings WHERE chunk_id = :query_id)
+LIMIT :k
+""")
+
+
+def _table(dims: int) -> str:
+    return f"bench_dims_{int(dims)}"
+
+
+async def _build(workspace_id: str, dims: int) -> float:
+    table = _table(dims)
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(f"DROP TABLE IF EXISTS {table};")
+        await conn.execute(
+            text(f"""
+            CREATE UNLOGGED TABLE {table} AS
+            SELECT chunk_id, l2_normalize(subvector(embedding, 1, {dims}))::vector({dims}) AS embedding
+            FROM chunk_embeddings
+            WHERE workspace_id = :workspace_id
+            """),
+            {"workspace_id": workspace_id},
+        )
+        await conn.exec_driver_sql(f"ALTER TABLE {table} ADD PRIMARY KEY (chunk_id);")
+        await conn.exec_driver_sql(f"CREATE INDEX ON {table} USING hnsw (embedding vector_cosine_ops);")
+        await conn.exec_driver_sql(f"ANALYZE {table};")
+    return time.perf_counter() - started
+
+
+async def _search(sql, query_ids: list[int], params: dict, setup: list[str]) -> tuple[list[list[int]], list[float]]:
+    results, timings = [], []
+    async with AsyncSessionLocal() as db:
+        for query_id in query_ids:
+            for statement in setup:
+                await db.execute(text(statement))
+            started = time.perf_counter()
+            rows = (await db.execute(sql, {**params, "query_id": query_id})).scalars().all()
+            timings.append(time.perf_counter() - started)
+            results.append(list(rows))
+            await db.rollback()
+    return results, timings
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workspace", required=True)
+    parser.add_argument("--dims", type=int, nargs="+", default=[256, 512, 1024])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as db:
+        query_ids = list(
+            (await db.execute(_SAMPLE_SQL, {"workspace_id": args.workspace, "n": args.queries})).scalars()
+        )
+    if not query_ids:
+        raise SystemExit(f"No embeddings in workspace {args.workspace!r}")
+
+    params = {"workspace_id": args.workspace, "k": args.k}
+    exact_setup = ["SET LOCAL enable_indexscan = off", "SET LOCAL enable_bitmapscan = off"]
+    truth, full_timings = await _search(_FULL_SQL, query_ids, params, exact_setup)
+    print(f"{'full exact':18s} recall@{args.k}=1.000 p50={statistics.median(full_timings) * 1000:.1f}ms")
+
+    try:
+        for dims in args.dims:
+            build_seconds = await _build(args.workspace, dims)
+            table = _table(dims)
+            sql = text(f"""
+            SELECT chunk_id FROM {table}
+            ORDER BY embedding <=> (SELECT embedding FROM {table} WHERE chunk_id = :query_id)
+            LIMIT :k
+            """)
+            async with AsyncSessionLocal() as db:
+                size = (await db.execute(text(f"SELECT pg_size_pretty(pg_total_relation_size('{table}'))"))).scalar()
+            print(f"[{dims}] built in {build_seconds:.1f}s, table+index={size}")
+            for name, setup in (("exact", exact_setup), ("hnsw", ["SET LOCAL hnsw.ef_search = 100"])):
+                found, timings = await _search(sql, query_ids, params, setup)
+                recall = statistics.mean(len(set(a) & set(t)) / args.k for a, t in zip(found, truth))
+                print(
+                    f"[{dims}] {name:12s} recall@{args.k}={recall:.3f} "
+                    f"p50={statistics.median(timings) * 1000:.1f}ms max={max(timings) * 1000:.1f}ms"
+                )
+    finally:
+        async with engine.begin() as conn:
+            for dims in args.dims:
+                await conn.exec_driver_sql(f"DROP TABLE IF EXISTS {_table(dims)};")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+"""
+Embedding throughput against the local fake provider.
+
+    python -m benchmarks.bench_embeddings --docs 8 --chunks 400
+
+Simulates several ingestion jobs embedding at once through one shared
+EmbeddingEngine, for a few concurrency settings, under a tokens-per-minute
+limit. Reports wall time, chunks/s, requests and 429s. No network or
+database needed.
+"""
+import argparse
+import asyncio
+import time
+
+from app.services.embedding_engine import EmbeddingEngine, FakeEmbeddingProvider
+
+
+async def _run(concurrency: int, args) -> None:
+    provider = FakeEmbeddingProvider(
+        dim=args.dim,
+        latency_seconds=args.latency,
+        per_token_seconds=args.per_token,
+        tokens_per_minute=args.tpm,
+    )
+    engine = EmbeddingEngine(
+        provider,
+        max_batch_items=args.batch_items,
+        max_concurrency=concurrency,
+        base_backoff_seconds=0.05,
+    )
+    docs = [
+        [f"doc {d} chunk {i} " + "lorem ipsum dolor sit amet " * 40 for i in range(args.chunks)]
+        for d in range(args.docs)
+    ]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(engine.embed(texts) for texts in docs))
+    elapsed = time.perf_counter() - started
+
+    total = args.docs * args.chunks
+    print(
+        f"concurrency={concurrency:<3d} wall={elapsed:7.2f}s chunks/s={total / elapsed:8.1f} "
+        f"requests={engine.requests} rate_limited={engine.rate_limited} "
+        f"final_limit={engine.concurrency_limit}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=8)
+    parser.add_argument("--chunks", type=int, default=400)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--batch-items", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.15)
+    parser.add_argument("--per-token", type=float, default=0.000005)
+    parser.add_argument("--tpm", type=int, default=5_000_000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    for concurrency in args.concurrency:
+        await _run(concurrency, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
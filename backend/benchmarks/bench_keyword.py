@@ -0,0 +1,115 @@
+"""
+Keyword stage: per-query to_tsvector() over chunk text vs the stored,
+GIN-indexed chunks.tsv column.
+
+    python -m benchmarks.bench_keyword --chunks 100000 --chunks 1000000
+
+Needs DATABASE_URL / OPENAI_API_KEY in the environment (the key is not used).
+Synthetic chunks are generated server-side under a throwaway workspace and
+deleted afterwards. The "expression" variant is what the kw CTE ran before
+tsv became a generated column; it has no usable index, so every query
+re-parses every chunk in the workspace.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, text
+
+from app.db.database import AsyncSessionLocal
+from app.models.models import Document, DocumentStatus, SourceType
+
+WORKSPACE_ID = "bench-keyword-workspace"
+QUERIES = ["postgres index", "vector search latency", "gamma delta", "quarterly revenue"]
+
+_INSERT_SQL = text("""
+INSERT INTO chunks (document_id, chunk_index, text, token_count, is_usable, created_at)
+SELECT
+  :document_id,
+  g,
+  (
+    SELECT string_agg(
+      (ARRAY['alpha','beta','gamma','delta','vector','index','postgres','chunk',
+             'search','latency','revenue','quarterly','meeting','notes'])[1 + ((g * 31 + w * 17) % 14)],
+      ' '
+    )
+    FROM generate_series(1, 120) AS w
+  ) || ' doc' || g,
+  120,
+  true,
+  now()
+FROM generate_series(0, :n - 1) AS g
+""")
+
+_VARIANTS = {
+    "expression": """
+        SELECT c.id, ts_rank_cd(to_tsvector('english', c.text), q) AS rank
+        FROM chunks c JOIN documents d ON d.id = c.document_id,
+             websearch_to_tsquery('english', :query) q
+        WHERE d.workspace_id = :workspace_id AND to_tsvector('english', c.text) @@ q
+        ORDER BY rank DESC LIMIT 48
+    """,
+    "stored tsv": """
+        SELECT c.id, ts_rank_cd(c.tsv, q) AS rank
+        FROM chunks c JOIN documents d ON d.id = c.document_id,
+             websearch_to_tsquery('english', :query) q
+        WHERE d.workspace_id = :workspace_id AND c.tsv @@ q
+        ORDER BY rank DESC LIMIT 48
+    """,
+}
+
+
+async def _seed(n: int) -> int:
+    async with AsyncSessionLocal() as db:
+        doc = Document(
+            title="bench-keyword",
+            source_type=SourceType.text,
+            status=DocumentStatus.ready,
+            created_at=datetime.utcnow(),
+            workspace_id=WORKSPACE_ID,
+        )
+        db.add(doc)
+        await db.commit()
+        await db.execute(_INSERT_SQL, {"document_id": doc.id, "n": n})
+        await db.commit()
+        await db.execute(text("ANALYZE chunks"))
+        await db.commit()
+        return doc.id
+
+
+async def _time_variant(sql: str, runs: int) -> list[float]:
+    timings = []
+    async with AsyncSessionLocal() as db:
+        for _ in range(runs):
+            for query in QUERIES:
+                started = time.perf_counter()
+                await db.execute(text(sql), {"query": query, "workspace_id": WORKSPACE_ID})
+                timings.append(time.perf_counter() - started)
+    return timings
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, action="append", help="corpus sizes (repeatable)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    for n in args.chunks or [100_000]:
+        document_id = await _seed(n)
+        try:
+            for name, sql in _VARIANTS.items():
+                timings = await _time_variant(sql, args.runs)
+                print(
+                    f"{name:12s} chunks={n} median={statistics.median(timings) * 1000:.1f}ms "
+                    f"max={max(timings) * 1000:.1f}ms"
+                )
+        finally:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(Document).where(Document.id == document_id))
+                await db.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
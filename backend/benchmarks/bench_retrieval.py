@@ -0,0 +1,190 @@
+"""
+Hybrid retrieval latency: the old single CTE query (vector, full-text and
+ILIKE stages plus SQL scoring in one backend) against the split candidate
+queries fused in Python, run one after the other or concurrently.
+
+    python -m benchmarks.bench_retrieval --chunks 100000 --concurrency 1 --concurrency 8
+
+Needs DATABASE_URL / OPENAI_API_KEY in the environment (the key is not used).
+Seeds synthetic chunks with clustered vectors under a throwaway workspace
+and deletes them afterwards. "parallel" takes two pooled connections per
+query, so compare at the concurrency you expect against DB_POOL_SIZE.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import delete, text
+
+from app.config import settings
+from app.db.database import AsyncSessionLocal
+from app.db.vector_index import apply_search_settings
+from app.models.models import Document, DocumentStatus, SourceType
+from app.services.chunking import Chunk as TextChunk
+from app.services.ingestion.pipeline import store_chunks
+from app.services.retrieval import _query_terms, _search_chunks, has_trigram_index, term_match_clause
+
+WORKSPACE_ID = "bench-retrieval-workspace"
+SEED_BATCH = 2000
+WORDS = [
+    "alpha", "beta", "gamma", "delta", "vector", "index", "postgres", "chunk",
+    "search", "latency", "revenue", "quarterly", "meeting", "notes", "design", "review",
+]
+QUERIES = ["postgres index latency", "quarterly revenue meeting", "vector search design", "gamma notes"]
+
+# The retrieval query as it was before the candidate stages were split.
+_MONOLITHIC_SQL = """
+WITH usable_chunks AS NOT MATERIALIZED (
+  SELECT c.* FROM chunks c JOIN documents d ON d.id = c.document_id
+  WHERE d.workspace_id = :workspace_id AND d.status = 'ready' AND c.is_usable IS NOT FALSE
+),
+q AS (SELECT websearch_to_tsquery('english', :query) AS query_terms),
+ann AS MATERIALIZED (
+  SELECT e.chunk_id, e.embedding <=> CAST(:qvec AS vector) AS distance
+  FROM chunk_embeddings e WHERE e.workspace_id = :workspace_id
+  ORDER BY e.embedding <=> CAST(:qvec AS vector) LIMIT :ann_limit
+),
+vec AS (
+  SELECT c.id AS chunk_id, c.document_id, c.chunk_index, c.text, d.title AS doc_title,
+         d.created_at AS doc_created_at, 1 - a.distance AS vector_score,
+         row_number() OVER (ORDER BY a.distance) AS vector_rank
+  FROM ann a JOIN usable_chunks c ON c.id = a.chunk_id JOIN documents d ON d.id = c.document_id
+  ORDER BY a.distance LIMIT :candidate_limit
+),
+kw AS (
+  SELECT c.id AS chunk_id, c.document_id, c.chunk_index, c.text, d.title AS doc_title,
+         d.created_at AS doc_created_at,
+         ts_rank_cd(c.tsv, (SELECT query_terms FROM q)) AS keyword_score,
+         row_number() OVER (ORDER BY ts_rank_cd(c.tsv, (SELECT query_terms FROM q)) DESC) AS keyword_rank
+  FROM usable_chunks c JOIN documents d ON d.id = c.document_id
+  WHERE c.tsv @@ (SELECT query_terms FROM q)
+  ORDER BY keyword_score DESC LIMIT :candidate_limit
+),
+term_matches AS (
+  SELECT c.id AS chunk_id, c.document_id, c.chunk_index, c.text, d.title AS doc_title,
+         d.created_at AS doc_created_at, 0.05 AS keyword_score,
+         row_number() OVER (ORDER BY length(c.text) ASC) AS keyword_rank
+  FROM usable_chunks c JOIN documents d ON d.id = c.document_id
+  WHERE {term_match} LIMIT :candidate_limit
+),
+deduped_kw AS (
+  SELECT DISTINCT ON (chunk_id) * FROM (SELECT * FROM kw UNION ALL SELECT * FROM term_matches) k
+  ORDER BY chunk_id, keyword_score DESC, keyword_rank ASC
+)
+SELECT COALESCE(v.chunk_id, k.chunk_id) AS chunk_id,
+  0.72 * COALESCE(v.vector_score, 0) + 0.18 * LEAST(COALESCE(k.keyword_score, 0), 1)
+  + 0.10 * (COALESCE(1.0 / NULLIF(v.vector_rank, 0), 0) + COALESCE(1.0 / NULLIF(k.keyword_rank, 0), 0)) AS score
+FROM vec v FULL OUTER JOIN deduped_kw k ON k.chunk_id = v.chunk_id
+ORDER BY score DESC LIMIT :candidate_limit
+"""
+
+
+def _clustered(rng: np.random.Generator, n: int, dim: int, centers: np.ndarray) -> np.ndarray:
+    labels = rng.integers(0, len(centers), size=n)
+    vectors = centers[labels] + rng.normal(scale=0.35, size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+async def _seed(n: int, dim: int, rng: np.random.Generator, centers: np.ndarray) -> int:
+    async with AsyncSessionLocal() as db:
+        doc = Document(
+            title="bench-retrieval",
+            source_type=SourceType.text,
+            status=DocumentStatus.ready,
+            created_at=datetime.utcnow(),
+            workspace_id=WORKSPACE_ID,
+        )
+        db.add(doc)
+        await db.commit()
+
+        for start in range(0, n, SEED_BATCH):
+            size = min(SEED_BATCH, n - start)
+            chunks = [
+                TextChunk(index=start + i, text=" ".join(rng.choice(WORDS, size=60)) + f". Chunk {start + i}.")
+                for i in range(size)
+            ]
+            await store_chunks(db, doc.id, chunks, _clustered(rng, size, dim, centers).tolist(), WORKSPACE_ID)
+            await db.commit()
+        await db.execute(text("ANALYZE chunks"))
+        await db.execute(text("ANALYZE chunk_embeddings"))
+        await db.commit()
+        return doc.id
+
+
+async def _monolithic(query: str, qvec: list[float]) -> None:
+    candidate_limit = 48
+    async with AsyncSessionLocal() as db:
+        term_match, term_params = term_match_clause(_query_terms(query), await has_trigram_index(db))
+        await apply_search_settings(db)
+        await db.execute(
+            text(_MONOLITHIC_SQL.format(term_match=term_match)),
+            {
+                "qvec": "[" + ",".join(str(x) for x in qvec) + "]",
+                "query": query,
+                "workspace_id": WORKSPACE_ID,
+                "candidate_limit": candidate_limit,
+                "ann_limit": candidate_limit * 2,
+                **term_params,
+            },
+        )
+
+
+async def _split(query: str, qvec: list[float]) -> None:
+    async with AsyncSessionLocal() as db:
+        await _search_chunks(db, qvec, query, WORKSPACE_ID, 8)
+
+
+async def _run(variant, queries: list[tuple[str, list[float]]], runs: int, concurrency: int) -> list[float]:
+    timings: list[float] = []
+    work = [q for _ in range(runs) for q in queries]
+
+    async def worker() -> None:
+        while work:
+            query, qvec = work.pop()
+            started = time.perf_counter()
+            await variant(query, qvec)
+            timings.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return timings
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, action="append", help="concurrent queries (repeatable)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    dim = settings.embedding_dimensions
+    rng = np.random.default_rng(args.seed)
+    centers = rng.normal(size=(32, dim)).astype(np.float32)
+    queries = [(q, v.tolist()) for q, v in zip(QUERIES, _clustered(rng, len(QUERIES), dim, centers))]
+
+    document_id = await _seed(args.chunks, dim, rng, centers)
+    try:
+        for concurrency in args.concurrency or [1]:
+            for name, variant, parallel in (
+                ("monolithic", _monolithic, False),
+                ("sequential", _split, False),
+                ("parallel", _split, True),
+            ):
+                settings.retrieval_parallel = parallel
+                timings = await _run(variant, queries, args.runs, concurrency)
+                print(
+                    f"{name:10s} chunks={args.chunks} concurrency={concurrency} "
+                    f"p50={statistics.median(timings) * 1000:.1f}ms "
+                    f"p99={np.percentile(timings, 99) * 1000:.1f}ms"
+                )
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Document).where(Document.id == document_id))
+            await db.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
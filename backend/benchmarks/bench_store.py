@@ -0,0 +1,98 @@
+"""
+Compare the ingestion store stage: legacy per-chunk loop vs bulk store_chunks.
+
+    python -m benchmarks.bench_store --chunks 2000 --runs 3
+
+Needs DATABASE_URL / OPENAI_API_KEY in the environment (the key is not used).
+Rows are written under a throwaway document that is deleted afterwards.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, text
+
+from app.db.database import AsyncSessionLocal
+from app.models.models import Chunk, ChunkEmbedding, Document, DocumentStatus, SourceType
+from app.services.chunking import Chunk as TextChunk
+from app.services.ingestion.pipeline import store_chunks
+
+WORKSPACE_ID = "bench-store-workspace"
+
+
+def _fake_chunks(n: int, dim: int) -> tuple[list[TextChunk], list[list[float]]]:
+    rng = random.Random(7)
+    words = ["alpha", "beta", "gamma", "delta", "vector", "index", "postgres", "chunk"]
+    chunks = [
+        TextChunk(index=i, text=" ".join(rng.choice(words) for _ in range(200)))
+        for i in range(n)
+    ]
+    embeddings = [[rng.random() for _ in range(dim)] for _ in range(n)]
+    return chunks, embeddings
+
+
+async def _legacy_store(db, document_id, chunks, embeddings):
+    for c, emb in zip(chunks, embeddings):
+        chunk_row = Chunk(
+            document_id=document_id,
+            chunk_index=c.index,
+            text=c.text,
+            token_count=c.token_count,
+        )
+        db.add(chunk_row)
+        await db.flush()
+        db.add(ChunkEmbedding(chunk_id=chunk_row.id, embedding=emb))
+        # The original loop then copied the text into the (then plain TEXT)
+        # tsv column. tsv is generated now, so rewrite `text` instead: same
+        # per-chunk round trip and row update, keeping the baseline honest.
+        await db.execute(
+            text("UPDATE chunks SET text = :t WHERE id = :id"),
+            {"t": c.text, "id": chunk_row.id},
+        )
+
+
+async def _time_store(store, chunks, embeddings) -> float:
+    async with AsyncSessionLocal() as db:
+        doc = Document(
+            title="bench-store",
+            source_type=SourceType.text,
+            status=DocumentStatus.processing,
+            created_at=datetime.utcnow(),
+            workspace_id=WORKSPACE_ID,
+        )
+        db.add(doc)
+        await db.commit()
+
+        try:
+            started = time.perf_counter()
+            await store(db, doc.id, chunks, embeddings)
+            await db.commit()
+            return time.perf_counter() - started
+        finally:
+            await db.execute(delete(Document).where(Document.id == doc.id))
+            await db.commit()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--dim", type=int, default=1536)
+    args = parser.parse_args()
+
+    chunks, embeddings = _fake_chunks(args.chunks, args.dim)
+
+    for name, store in (("legacy loop", _legacy_store), ("bulk", store_chunks)):
+        timings = [await _time_store(store, chunks, embeddings) for _ in range(args.runs)]
+        median = statistics.median(timings)
+        print(
+            f"{name:12s} chunks={args.chunks} median={median * 1000:.1f}ms "
+            f"per_chunk={median / args.chunks * 1000:.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+"""
+Time-scoped retrieval: candidate set size and latency with and without the
+parsed time range pushed into the candidate queries.
+
+    python -m benchmarks.bench_time_filter --documents 20000 --chunks-per-doc 5
+
+Needs DATABASE_URL / OPENAI_API_KEY in the environment (the key is not used).
+Seeds documents spread evenly over the last --days days under a throwaway
+workspace (deleted afterwards). For each question, "unscoped" is the
+previous behaviour (whole workspace, semantic similarity only) and
+"scoped" passes parse_time_range's result down; "chunks" is how many
+usable chunks each variant has to consider.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import numpy as np
+from sqlalchemy import delete, text
+
+from app.config import settings
+from app.db.database import AsyncSessionLocal
+from app.models.models import Document
+from app.services.retrieval import _search_chunks, time_range_clause
+from app.services.timeparse import parse_time_range
+
+WORKSPACE_ID = "bench-time-workspace"
+EMBED_BATCH = 2000
+QUESTIONS = [
+    "what did I save yesterday",
+    "what did I save last week",
+    "notes from last month about the roadmap",
+    "everything about revenue",
+]
+
+_DOCUMENTS_SQL = text("""
+INSERT INTO documents (title, source_type, status, created_at, ingested_at, workspace_id)
+SELECT 'bench-time ' || g, 'text', 'ready', now() - make_interval(days => g % :days), now(), :workspace_id
+FROM generate_series(0, :n - 1) AS g
+""")
+
+_CHUNKS_SQL = text("""
+INSERT INTO chunks (document_id, chunk_index, text, token_count, is_usable, created_at)
+SELECT d.id, i, 'roadmap revenue meeting notes for ' || d.title || ' part ' || i, 12, true, now()
+FROM documents d, generate_series(0, :per_doc - 1) AS i
+WHERE d.workspace_id = :workspace_id
+RETURNING id
+""")
+
+_EMBEDDINGS_SQL = text("""
+INSERT INTO chunk_embeddings (chunk_id, embedding, workspace_id)
+VALUES (:chunk_id, CAST(:embedding AS vector), :workspace_id)
+""")
+
+_COUNT_SQL = """
+SELECT count(*)
+FROM documents d JOIN chunks c ON c.document_id = d.id
+WHERE d.workspace_id = :workspace_id AND d.status = 'ready' AND c.is_usable IS NOT FALSE AND {time_clause}
+"""
+
+
+def _literal(vector: np.ndarray) -> str:
+    return "[" + ",".join(f"{x:.6f}" for x in vector) + "]"
+
+
+async def _seed(documents: int, per_doc: int, days: int, dim: int, rng: np.random.Generator) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(_DOCUMENTS_SQL, {"n": documents, "days": days, "workspace_id": WORKSPACE_ID})
+        chunk_ids = (
+            await db.execute(_CHUNKS_SQL, {"per_doc": per_doc, "workspace_id": WORKSPACE_ID})
+        ).scalars().all()
+        for start in range(0, len(chunk_ids), EMBED_BATCH):
+            batch = chunk_ids[start : start + EMBED_BATCH]
+            vectors = rng.normal(size=(len(batch), dim))
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            await db.execute(
+                _EMBEDDINGS_SQL,
+                [
+                    {"chunk_id": chunk_id, "embedding": _literal(v), "workspace_id": WORKSPACE_ID}
+                    for chunk_id, v in zip(batch, vectors)
+                ],
+            )
+        await db.commit()
+        for table in ("documents", "chunks", "chunk_embeddings"):
+            await db.execute(text(f"ANALYZE {table}"))
+        await db.commit()
+
+
+async def _measure(question: str, qvec: list[float], time_range, runs: int) -> tuple[int, list[float]]:
+    time_clause, time_params = time_range_clause(time_range)
+    timings = []
+    async with AsyncSessionLocal() as db:
+        scoped = (
+            await db.execute(
+                text(_COUNT_SQL.format(time_clause=time_clause)), {"workspace_id": WORKSPACE_ID, **time_params}
+            )
+        ).scalar()
+        for _ in range(runs):
+            started = time.perf_counter()
+            await _search_chunks(db, qvec, question, WORKSPACE_ID, 8, time_range)
+            timings.append(time.perf_counter() - started)
+            await db.rollback()
+    return scoped, timings
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=20_000)
+    parser.add_argument("--chunks-per-doc", type=int, default=5)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    dim = settings.embedding_dimensions
+    rng = np.random.default_rng(args.seed)
+    await _seed(args.documents, args.chunks_per_doc, args.days, dim, rng)
+    try:
+        for question in QUESTIONS:
+            qvec = rng.normal(size=dim)
+            qvec = (qvec / np.linalg.norm(qvec)).tolist()
+            time_range = parse_time_range(question)
+            variants = [("unscoped", None)] + ([("scoped", time_range)] if time_range else [])
+            for name, scope in variants:
+                scoped, timings = await _measure(question, qvec, scope, args.runs)
+                print(
+                    f"{question[:40]:40s} {name:9s} chunks={scoped:<8d} "
+                    f"p50={statistics.median(timings) * 1000:.1f}ms max={max(timings) * 1000:.1f}ms"
+                )
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Document).where(Document.workspace_id == WORKSPACE_ID))
+            await db.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""
+Time to first byte / meta / token on /v1/chat/stream under concurrent load.
+
+Start the API against a workspace with ingested documents, then:
+
+    python -m benchmarks.bench_ttft --workspace my-workspace --concurrency 16 --requests 200
+
+Each request asks a non-small-talk question, so embedding, retrieval and
+the LLM are all on the path. Prints p50/p99 for the stream opening (first
+byte), the `meta` event (citations ready) and the first token, plus the
+server's own stage timings from the `done` event. Set
+ANSWER_CACHE_ENABLED=false on the server to measure the uncached path.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import defaultdict
+
+import httpx
+
+QUESTIONS = [
+    "What are the main points of my notes on vector databases?",
+    "Summarize what I saved about Postgres indexing.",
+    "Which documents mention latency budgets?",
+    "What did I learn about embeddings last week?",
+]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _events(resp: httpx.Response):
+    event, data = "message", []
+    async for line in resp.aiter_lines():
+        if line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+        elif not line and data:
+            yield event, json.loads("\n".join(data))
+            event, data = "message", []
+
+
+async def _one(client: httpx.AsyncClient, headers: dict, question: str, out: dict[str, list[float]]) -> None:
+    started = time.perf_counter()
+    async with client.stream("POST", "/v1/chat/stream", json={"query": question}, headers=headers) as resp:
+        out["first_byte"].append(time.perf_counter() - started)
+        got_token = False
+        async for event, data in _events(resp):
+            elapsed = time.perf_counter() - started
+            if event == "meta":
+                out["meta"].append(elapsed)
+            elif event == "message" and "token" in data and not got_token:
+                out["first_token"].append(elapsed)
+                got_token = True
+            elif event == "done":
+                for stage, ms in data.get("timings", {}).items():
+                    out[f"server:{stage}"].append(ms / 1000)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--workspace", required=True)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+
+    headers = {"X-Workspace-Id": args.workspace}
+    samples: dict[str, list[float]] = defaultdict(list)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120) as client:
+
+        async def run(i: int) -> None:
+            async with semaphore:
+                await _one(client, headers, f"{QUESTIONS[i % len(QUESTIONS)]} ({i})", samples)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run(i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    print(f"{args.requests} requests, concurrency={args.concurrency}, {args.requests / elapsed:.1f} req/s")
+    for name, values in sorted(samples.items()):
+        if values:
+            print(
+                f"{name:24s} n={len(values):<5d} p50={statistics.median(values) * 1000:.1f}ms "
+                f"p99={_percentile(values, 99) * 1000:.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
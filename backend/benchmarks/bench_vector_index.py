@@ -0,0 +1,150 @@
+"""
+ANN recall@k vs latency against exact search.
+
+    python -m benchmarks.bench_vector_index --chunks 100000 --type hnsw --sweep 20 40 100 200
+    python -m benchmarks.bench_vector_index --chunks 100000 --type ivfflat --sweep 1 5 10 30
+    python -m benchmarks.bench_vector_index --chunks 100000 --storage float halfvec binary
+
+Needs DATABASE_URL / OPENAI_API_KEY in the environment (the key is not used).
+Seeds clustered synthetic vectors under a throwaway document, then for each
+storage mode rebuilds the ANN index, reports its size, and for each sweep
+value (ef_search for hnsw, probes for ivfflat) compares the retrieval ann
+query's top-k against an exact sequential scan. Quantized modes re-rank
+k * --rerank-factor candidates. Use a scratch database: the index rebuild
+covers the whole table.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import delete, text
+
+from app.db.database import AsyncSessionLocal
+from app.db.vector_index import VECTOR_INDEX_NAME, rebuild_vector_index
+from app.models.models import Document, DocumentStatus, SourceType
+from app.services.chunking import Chunk as TextChunk
+from app.services.ingestion.pipeline import store_chunks
+from app.services.retrieval import ann_candidates_sql
+
+WORKSPACE_ID = "bench-vector-workspace"
+SEED_BATCH = 2000
+
+_EXACT_SQL = ann_candidates_sql("float", 0)
+
+
+def _clustered(rng: np.random.Generator, n: int, dim: int, centers: np.ndarray) -> np.ndarray:
+    labels = rng.integers(0, len(centers), size=n)
+    vectors = centers[labels] + rng.normal(scale=0.35, size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _literal(vector: np.ndarray) -> str:
+    return "[" + ",".join(f"{x:.6f}" for x in vector) + "]"
+
+
+async def _seed(n: int, dim: int, rng: np.random.Generator, centers: np.ndarray) -> int:
+    async with AsyncSessionLocal() as db:
+        doc = Document(
+            title="bench-vector",
+            source_type=SourceType.text,
+            status=DocumentStatus.ready,
+            created_at=datetime.utcnow(),
+            workspace_id=WORKSPACE_ID,
+        )
+        db.add(doc)
+        await db.commit()
+
+        for start in range(0, n, SEED_BATCH):
+            size = min(SEED_BATCH, n - start)
+            chunks = [TextChunk(index=start + i, text=f"synthetic chunk {start + i}") for i in range(size)]
+            await store_chunks(db, doc.id, chunks, _clustered(rng, size, dim, centers).tolist(), WORKSPACE_ID)
+            await db.commit()
+        await db.execute(text("ANALYZE chunk_embeddings"))
+        await db.commit()
+        return doc.id
+
+
+async def _search(
+    sql: str, queries: list[str], k: int, rerank_factor: int, setup: list[str]
+) -> tuple[list[list[int]], list[float]]:
+    results, timings = [], []
+    params = {"workspace_id": WORKSPACE_ID, "ann_limit": k, "ann_prefetch": k * rerank_factor}
+    async with AsyncSessionLocal() as db:
+        for qvec in queries:
+            for statement in setup:
+                await db.execute(text(statement))
+            started = time.perf_counter()
+            rows = (await db.execute(text(sql), {**params, "qvec": qvec})).scalars().all()
+            timings.append(time.perf_counter() - started)
+            results.append(list(rows))
+            await db.rollback()
+    return results, timings
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--type", choices=("hnsw", "ivfflat"), default="hnsw")
+    parser.add_argument("--storage", nargs="+", choices=("float", "halfvec", "binary"), default=["float"])
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--m", type=int, default=None)
+    parser.add_argument("--ef-construction", type=int, default=None)
+    parser.add_argument("--lists", type=int, default=None)
+    parser.add_argument("--sweep", type=int, nargs="+", default=None, help="ef_search (hnsw) or probes (ivfflat)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    centers = rng.normal(size=(64, args.dim)).astype(np.float32)
+    document_id = await _seed(args.chunks, args.dim, rng, centers)
+    try:
+        queries = [_literal(v) for v in _clustered(rng, args.queries, args.dim, centers)]
+        exact, exact_timings = await _search(
+            _EXACT_SQL,
+            queries,
+            args.k,
+            1,
+            ["SET LOCAL enable_indexscan = off", "SET LOCAL enable_bitmapscan = off"],
+        )
+        print(f"{'exact':24s} recall@{args.k}=1.000 p50={statistics.median(exact_timings) * 1000:.1f}ms")
+
+        guc = "hnsw.ef_search" if args.type == "hnsw" else "ivfflat.probes"
+        sweep = args.sweep or ([20, 40, 100, 200] if args.type == "hnsw" else [1, 5, 10, 30])
+        for storage in args.storage:
+            started = time.perf_counter()
+            definition = await rebuild_vector_index(
+                args.type,
+                storage_mode=storage,
+                lists=args.lists,
+                m=args.m,
+                ef_construction=args.ef_construction,
+            )
+            async with AsyncSessionLocal() as db:
+                size = (
+                    await db.execute(text(f"SELECT pg_size_pretty(pg_relation_size('{VECTOR_INDEX_NAME}'))"))
+                ).scalar()
+            print(f"[{storage}] built in {time.perf_counter() - started:.1f}s, size={size}: {definition}")
+
+            sql = ann_candidates_sql(storage, args.dim)
+            for value in sweep:
+                approx, timings = await _search(
+                    sql, queries, args.k, args.rerank_factor, [f"SET LOCAL {guc} = {int(value)}"]
+                )
+                recall = statistics.mean(len(set(a) & set(e)) / args.k for a, e in zip(approx, exact))
+                print(
+                    f"[{storage}] {guc}={value:<6d} recall@{args.k}={recall:.3f} "
+                    f"p50={statistics.median(timings) * 1000:.1f}ms max={max(timings) * 1000:.1f}ms"
+                )
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Document).where(Document.id == document_id))
+            await db.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+import asyncio
+import unittest
+
+from app.services.cache import (
+    LRUCache,
+    MemoryCacheBackend,
+    normalize_for_cache,
+    normalize_whitespace,
+    stable_key,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_expires_entries_after_ttl(self):
+        clock = FakeClock()
+        cache = LRUCache(max_entries=10, ttl_seconds=5, clock=clock)
+        cache.set("q", [0.1, 0.2])
+
+        clock.now = 4
+        self.assertEqual(cache.get("q"), [0.1, 0.2])
+        clock.now = 10
+        self.assertIsNone(cache.get("q"))
+        self.assertEqual(len(cache), 0)
+
+    def test_counts_hits_and_misses(self):
+        cache = LRUCache(max_entries=10)
+        cache.get("missing")
+        cache.set("k", "v")
+        cache.get("k")
+
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evicts_by_weight(self):
+        cache = LRUCache(max_entries=10, weigher=len, max_weight=10)
+        cache.set("a", "xxxx")
+        cache.set("b", "xxxx")
+        cache.set("c", "xxxx")
+        cache.set("huge", "x" * 11)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNone(cache.get("huge"))
+        self.assertEqual(cache.weight, 8)
+        cache.delete("b")
+        self.assertEqual(cache.weight, 4)
+
+    def test_stable_key_changes_with_any_part(self):
+        base = stable_key("ws", "what is pgvector", {"limit": 8}, 3)
+        self.assertEqual(base, stable_key("ws", "what is pgvector", {"limit": 8}, 3))
+        self.assertNotEqual(base, stable_key("ws", "what is pgvector", {"limit": 8}, 4))
+        self.assertNotEqual(base, stable_key("ws", "what is pgvector", {"limit": 5}, 3))
+
+    def test_whitespace_normalization_keeps_case(self):
+        self.assertEqual(normalize_whitespace("  The  API\n key "), "The API key")
+        self.assertEqual(normalize_for_cache("  The  API\n key "), "the api key")
+
+    def test_memory_backend_round_trip(self):
+        backend = MemoryCacheBackend(LRUCache(max_entries=2))
+        asyncio.run(backend.set("k", [{"chunk_id": 1}]))
+        self.assertEqual(asyncio.run(backend.get("k")), [{"chunk_id": 1}])
+        self.assertIsNone(asyncio.run(backend.get("missing")))
+
+
+if __name__ == "__main__":
+    unittest.main()
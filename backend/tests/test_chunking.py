@@ -1,6 +1,6 @@
 import unittest
 
-from app.services.chunking import chunk_text
+from app.services.chunking import StreamingChunker, chunk_text
 
 
 class ChunkTextTest(unittest.TestCase):
@@ -24,6 +24,26 @@ class ChunkTextTest(unittest.TestCase):
 
         self.assertEqual(chunks[0].text, "Alpha beta.\n\nGamma delta.")
 
+    def test_streaming_pages_match_full_text_and_keep_page_numbers(self):
+        pages = [
+            "Page one intro. " * 30,
+            "Page two has more detail. " * 30,
+            "Closing page. " * 10,
+        ]
+
+        chunker = StreamingChunker(max_chars=400, overlap=60)
+        streamed = []
+        for page_number, page in enumerate(pages, start=1):
+            streamed.extend(chunker.feed(page, page_number))
+        streamed.extend(chunker.flush())
+
+        full = chunk_text("\n\n".join(pages), max_chars=400, overlap=60)
+        self.assertEqual([c.text for c in streamed], [c.text for c in full])
+        self.assertEqual([c.index for c in streamed], list(range(len(full))))
+        self.assertEqual(streamed[0].page_number, 1)
+        self.assertTrue(all(c.page_number == 2 for c in streamed if c.text.startswith("Page two")))
+        self.assertEqual(sorted(c.page_number for c in streamed), [c.page_number for c in streamed])
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
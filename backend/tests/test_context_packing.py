@@ -0,0 +1,87 @@
+import unittest
+
+from app.services.chunking import chunk_text
+from app.services.context_packing import merge_adjacent, pack_context, select_passages
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def row(chunk_id, document_id, chunk_index, text, score):
+    return {
+        "chunk_id": chunk_id,
+        "document_id": document_id,
+        "chunk_index": chunk_index,
+        "text": text,
+        "score": score,
+        "doc_title": f"doc {document_id}",
+    }
+
+
+class MergeAdjacentTest(unittest.TestCase):
+    def test_merges_chunker_overlap_without_repeating_text(self):
+        text = " ".join(f"Sentence number {i} is about topic {i % 7}." for i in range(60))
+        chunks = chunk_text(text, max_chars=400, overlap=120)
+        rows = [row(i, 1, c.index, c.text, 0.5) for i, c in enumerate(chunks[:3])]
+
+        passages = merge_adjacent(rows)
+
+        self.assertEqual(len(passages), 1)
+        self.assertEqual((passages[0].first_index, passages[0].last_index), (0, 2))
+        self.assertEqual(passages[0].text.count("Sentence number 5 "), 1)
+        self.assertEqual(passages[0].chunk_ids, [0, 1, 2])
+
+    def test_merges_overlap_longer_than_a_sentence(self):
+        shared = "".join(f"Shared sentence {i} repeats across both windows. " for i in range(30))
+        rows = [
+            row(1, 1, 0, "Opening line. " + shared, 0.5),
+            row(2, 1, 1, shared + "Closing line.", 0.4),
+        ]
+
+        passages = merge_adjacent(rows)
+
+        self.assertEqual(passages[0].text.count("Shared sentence 0 "), 1)
+        self.assertTrue(passages[0].text.endswith("Closing line."))
+
+    def test_keeps_gaps_and_documents_apart_best_first(self):
+        rows = [
+            row(1, 1, 0, "alpha", 0.2),
+            row(2, 1, 2, "gamma", 0.9),
+            row(3, 2, 1, "delta", 0.5),
+        ]
+
+        passages = merge_adjacent(rows)
+
+        self.assertEqual([p.chunk_ids for p in passages], [[2], [3], [1]])
+
+
+class PackContextTest(unittest.TestCase):
+    def test_skips_oversized_passage_instead_of_stopping(self):
+        rows = [
+            row(1, 1, 0, "word " * 500, 0.9),
+            row(2, 2, 0, "small relevant note", 0.8),
+        ]
+
+        context = pack_context(rows, max_tokens=50, count_tokens=count_words)
+
+        self.assertIn("small relevant note", context)
+        self.assertNotIn("word word", context)
+
+    def test_selection_maximises_score_within_budget(self):
+        # Greedy by score would take item 0 and nothing else fits.
+        self.assertEqual(select_passages([6, 5, 5], [0.9, 0.6, 0.6], 10), [1, 2])
+
+    def test_large_budget_is_solved_in_coarser_units(self):
+        weights = [3000, 2500, 2500, 900]
+        chosen = select_passages(weights, [0.9, 0.6, 0.6, 0.5], 6000)
+
+        self.assertEqual(chosen, [1, 2, 3])
+        self.assertLessEqual(sum(weights[i] for i in chosen), 6000)
+
+    def test_empty_budget(self):
+        self.assertEqual(pack_context([row(1, 1, 0, "x", 0.5)], 0, count_words), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
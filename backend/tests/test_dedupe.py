@@ -0,0 +1,42 @@
+import unittest
+
+from app.services.ingestion.dedupe import ChunkMatcher, content_hash
+
+
+def _match_all(existing, texts):
+    matcher = ChunkMatcher(existing)
+    matches = [matcher.match(content_hash(t)) for t in texts]
+    return matches, matcher.stale_ids()
+
+
+class ChunkMatcherTest(unittest.TestCase):
+    def test_reuses_unchanged_chunks_and_embeds_only_edits(self):
+        existing = [(10, content_hash("a")), (11, content_hash("b")), (12, content_hash("c"))]
+
+        matches, stale = _match_all(existing, ["a", "b2", "c"])
+
+        self.assertEqual(matches, [10, None, 12])
+        self.assertEqual(stale, [11])
+
+    def test_tracks_shifted_positions(self):
+        existing = [(1, content_hash("a")), (2, content_hash("b"))]
+
+        matches, stale = _match_all(existing, ["intro", "a", "b"])
+
+        self.assertEqual(matches, [None, 1, 2])
+        self.assertEqual(stale, [])
+
+    def test_duplicate_text_reuses_each_row_once(self):
+        matches, _ = _match_all([(1, content_hash("same"))], ["same", "same"])
+
+        self.assertEqual(matches, [1, None])
+
+    def test_rows_without_hash_are_replaced(self):
+        matches, stale = _match_all([(5, None)], ["x"])
+
+        self.assertEqual(matches, [None])
+        self.assertEqual(stale, [5])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import os
+import tempfile
+import unittest
+
+from app.services.ingestion.documents import iter_text_file_segments
+
+
+class TextFileSegmentsTest(unittest.TestCase):
+    def _segments(self, data: bytes, block_chars: int) -> list[str]:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "notes.txt")
+            with open(path, "wb") as f:
+                f.write(data)
+            return list(iter_text_file_segments(path, block_chars))
+
+    def test_crlf_paragraphs_split_on_paragraph_breaks(self):
+        data = "".join(f"Paragraph {i} text.\r\n\r\n" for i in range(40)).encode()
+
+        segments = self._segments(data, block_chars=64)
+
+        self.assertGreater(len(segments), 1)
+        self.assertNotIn("\r", "".join(segments))
+        self.assertEqual("".join(segments), data.decode().replace("\r\n", "\n"))
+        for segment in segments[1:]:
+            self.assertTrue(segment.startswith("\n\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import asyncio
+import types
+import unittest
+
+from app.services.embedding_engine import (
+    EmbeddingEngine,
+    FakeEmbeddingProvider,
+    OpenAIEmbeddingProvider,
+    ProviderResult,
+    RateLimitedError,
+    parse_reset_duration,
+    plan_batches,
+)
+
+
+class FlakyProvider:
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    async def embed(self, texts):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise RateLimitedError("429", retry_after=0)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        return ProviderResult(vectors=[[float(len(t))] for t in texts])
+
+
+class RecordingClient:
+    """Minimal stand-in for AsyncOpenAI's embeddings.with_raw_response."""
+
+    def __init__(self):
+        self.calls = []
+        self.embeddings = self
+        self.with_raw_response = self
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return self
+
+    @property
+    def headers(self):
+        return {}
+
+    def parse(self):
+        return types.SimpleNamespace(data=[types.SimpleNamespace(embedding=[0.0]) for _ in self.calls[-1]["input"]])
+
+
+class EmbeddingEngineTest(unittest.TestCase):
+    def test_plan_batches_respects_item_and_token_caps(self):
+        texts = ["x" * 400] * 5 + ["y" * 4000]
+
+        batches = plan_batches(texts, max_items=2, max_tokens=250)
+
+        self.assertEqual(batches, [[0, 1], [2, 3], [4], [5]])
+
+    def test_parse_reset_duration(self):
+        self.assertEqual(parse_reset_duration("20ms"), 0.02)
+        self.assertEqual(parse_reset_duration("6m0s"), 360.0)
+        self.assertEqual(parse_reset_duration("1.5"), 1.5)
+        self.assertIsNone(parse_reset_duration(None))
+
+    def test_preserves_order_and_bounds_concurrency(self):
+        provider = FlakyProvider(failures=0)
+        engine = EmbeddingEngine(provider, max_batch_items=1, max_concurrency=3)
+        texts = ["a" * n for n in range(1, 21)]
+
+        vectors = asyncio.run(engine.embed(texts))
+
+        self.assertEqual(vectors, [[float(n)] for n in range(1, 21)])
+        self.assertLessEqual(provider.max_in_flight, 3)
+        self.assertEqual(provider.calls, 20)
+
+    def test_retries_rate_limits_and_backs_off_concurrency(self):
+        provider = FlakyProvider(failures=2)
+        engine = EmbeddingEngine(provider, max_batch_items=10, max_concurrency=4)
+
+        vectors = asyncio.run(engine.embed(["abc", "de"]))
+
+        self.assertEqual(vectors, [[3.0], [2.0]])
+        self.assertEqual(engine.rate_limited, 2)
+        self.assertEqual(engine.concurrency_limit, 1)
+
+    def test_gives_up_after_max_retries(self):
+        engine = EmbeddingEngine(FlakyProvider(failures=10), max_retries=2)
+
+        with self.assertRaises(RateLimitedError):
+            asyncio.run(engine.embed(["abc"]))
+
+    def test_fake_provider_is_deterministic(self):
+        provider = FakeEmbeddingProvider(dim=4, latency_seconds=0)
+        first = asyncio.run(provider.embed(["same"])).vectors
+        second = asyncio.run(provider.embed(["same"])).vectors
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(first[0]), 4)
+
+    def test_openai_provider_requests_shortened_dimensions(self):
+        client = RecordingClient()
+        asyncio.run(OpenAIEmbeddingProvider(client, "text-embedding-3-small", 256).embed(["a"]))
+        asyncio.run(OpenAIEmbeddingProvider(client, "text-embedding-ada-002", 256).embed(["a"]))
+        self.assertEqual(client.calls[0]["dimensions"], 256)
+        self.assertNotIn("dimensions", client.calls[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
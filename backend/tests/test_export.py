@@ -0,0 +1,59 @@
+import enum
+import json
+import os
+import unittest
+from datetime import datetime, timezone
+
+import numpy as np
+
+# app.config needs these at import time; nothing here connects.
+os.environ.setdefault("DATABASE_URL", os.getenv("TEST_DATABASE_URL", "postgresql+asyncpg://localhost/test"))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from app.services.export import ExportError, check_export, content_disposition, encode_ndjson  # noqa: E402
+
+
+class Status(str, enum.Enum):
+    ready = "ready"
+
+
+class ExportEncodingTest(unittest.TestCase):
+    def test_ndjson_lines_are_typed_and_json_safe(self):
+        rows = [
+            {
+                "id": 1,
+                "status": Status.ready,
+                "created_at": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+                "embedding": np.array([0.5, -0.25], dtype=np.float32),
+                "text": "naïve café",
+            },
+            {"id": 2, "status": Status.ready, "created_at": None, "embedding": None, "text": "x"},
+        ]
+
+        lines = encode_ndjson("chunk", rows).decode().splitlines()
+
+        self.assertEqual(len(lines), 2)
+        first = json.loads(lines[0])
+        self.assertEqual(first["type"], "chunk")
+        self.assertEqual(first["status"], "ready")
+        self.assertEqual(first["created_at"], "2024-01-02T03:04:05+00:00")
+        self.assertEqual(first["embedding"], [0.5, -0.25])
+        self.assertEqual(first["text"], "naïve café")
+        self.assertIsNone(json.loads(lines[1])["embedding"])
+
+    def test_check_export_validates_options(self):
+        check_export("ndjson")
+        with self.assertRaises(ExportError):
+            check_export("csv")
+        with self.assertRaises(ExportError):
+            check_export("arrow", None)
+
+    def test_content_disposition_sanitizes_filename(self):
+        self.assertEqual(content_disposition("ws_1-abc.ndjson"), 'attachment; filename="ws_1-abc.ndjson"')
+        self.assertEqual(
+            content_disposition('a"; x=\r\ny.ndjson'), 'attachment; filename="a___x___y.ndjson"'
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from app.services.fusion import FusionWeights, fuse
+
+
+def vec(chunk_id, score, rank):
+    return {
+        "chunk_id": chunk_id,
+        "document_id": 1,
+        "chunk_index": chunk_id,
+        "text": f"chunk {chunk_id}",
+        "doc_title": None,
+        "doc_created_at": None,
+        "vector_score": score,
+        "vector_rank": rank,
+    }
+
+
+def kw(chunk_id, score, rank):
+    row = vec(chunk_id, None, None)
+    del row["vector_score"], row["vector_rank"]
+    return {**row, "keyword_score": score, "keyword_rank": rank}
+
+
+class FuseTest(unittest.TestCase):
+    def test_weighted_matches_sql_formula(self):
+        rows = fuse([vec(1, 0.8, 1), vec(2, 0.6, 2)], [kw(2, 0.5, 1), kw(3, 2.0, 2)], FusionWeights(), 10)
+
+        by_id = {r["chunk_id"]: r for r in rows}
+        self.assertAlmostEqual(by_id[1]["score"], 0.72 * 0.8 + 0.10 * 1.0)
+        self.assertAlmostEqual(by_id[2]["score"], 0.72 * 0.6 + 0.18 * 0.5 + 0.10 * (1 / 2 + 1))
+        # keyword_score is capped at 1 in the weighted blend.
+        self.assertAlmostEqual(by_id[3]["score"], 0.18 * 1.0 + 0.10 * 0.5)
+        self.assertIsNone(by_id[3]["vector_rank"])
+        self.assertEqual([r["chunk_id"] for r in rows], [1, 2, 3])
+
+    def test_rrf_rewards_agreement(self):
+        weights = FusionWeights(mode="rrf", vector=1.0, keyword=1.0, rrf_k=60)
+        rows = fuse([vec(1, 0.9, 1), vec(2, 0.5, 2)], [kw(2, 0.1, 1)], weights, 10)
+
+        self.assertEqual(rows[0]["chunk_id"], 2)
+        self.assertAlmostEqual(rows[0]["score"], 1 / 62 + 1 / 61)
+
+    def test_limit_and_empty(self):
+        self.assertEqual(fuse([], [], FusionWeights(), 5), [])
+        rows = fuse([vec(i, 1 - i / 10, i) for i in range(1, 6)], [], FusionWeights(), 2)
+        self.assertEqual([r["chunk_id"] for r in rows], [1, 2])
+
+    def test_override_ignores_missing_values(self):
+        weights = FusionWeights().override(mode="rrf", vector=None, keyword=0.5)
+
+        self.assertEqual((weights.mode, weights.vector, weights.keyword), ("rrf", 0.72, 0.5))
+        with self.assertRaises(ValueError):
+            FusionWeights(mode="max")
+
+
+if __name__ == "__main__":
+    unittest.main()
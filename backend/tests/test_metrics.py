@@ -0,0 +1,39 @@
+import unittest
+
+from app.metrics import Metric, render_prometheus
+
+
+class RenderPrometheusTest(unittest.TestCase):
+    def test_merges_same_name_into_one_family(self):
+        def collector():
+            return [
+                Metric("db_pool_checked_out", "gauge", "Connections currently checked out", 3),
+                Metric("db_pool_wait_seconds_total", "counter", "Time spent waiting", 0.25),
+            ]
+
+        output = render_prometheus([collector, collector])
+
+        self.assertEqual(output.count("# TYPE db_pool_checked_out gauge"), 1)
+        self.assertEqual(output.count("\ndb_pool_checked_out "), 1)
+        self.assertIn("db_pool_checked_out 6\n", output)
+        self.assertIn("db_pool_wait_seconds_total 0.5\n", output)
+
+    def test_large_values_keep_full_precision(self):
+        output = render_prometheus(
+            [
+                lambda: [
+                    Metric("embedding_tokens_total", "counter", "Tokens embedded", 123456789),
+                    Metric("chat_seconds_total", "counter", "Time spent", 1234567.25),
+                ]
+            ]
+        )
+
+        self.assertIn("embedding_tokens_total 123456789\n", output)
+        self.assertIn("chat_seconds_total 1234567.25\n", output)
+
+    def test_empty_collectors(self):
+        self.assertEqual(render_prometheus([lambda: []]), "\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+
+from app.pagination import decode_cursor, encode_cursor
+
+
+class CursorTest(unittest.TestCase):
+    def test_round_trips_created_at_and_id(self):
+        created_at = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+        cursor = encode_cursor(created_at, 42)
+
+        self.assertNotIn("=", cursor)
+        self.assertEqual(decode_cursor(cursor, datetime, int), (created_at, 42))
+
+    def test_rejects_malformed_cursor(self):
+        for cursor in ("not-a-cursor", encode_cursor(1, 2), encode_cursor("x")):
+            with self.assertRaises(HTTPException) as ctx:
+                decode_cursor(cursor, int)
+            self.assertEqual(ctx.exception.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,22 @@
+import os
 import unittest
+from datetime import datetime, timezone
 
-from app.services.retrieval import _passes_relevance, _query_terms
+# app.config needs these at import time; only the Postgres-backed tests connect.
+os.environ.setdefault("DATABASE_URL", os.getenv("TEST_DATABASE_URL", "postgresql+asyncpg://localhost/test"))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from app.services.retrieval import (
+    _passes_relevance,
+    _query_terms,
+    ann_candidates_sql,
+    is_usable_chunk_text,
+    merge_windows,
+    term_match_clause,
+    time_range_clause,
+    time_scoped_chunks_filter,
+)
+from app.services.timeparse import TimeRange
 
 
 class RetrievalRelevanceTest(unittest.TestCase):
@@ -49,6 +65,62 @@ class RetrievalRelevanceTest(unittest.TestCase):
         self.assertIn("phd", terms)
         self.assertNotIn("recently", terms)
 
+    def test_usable_chunk_text_quality_gate(self):
+        self.assertTrue(is_usable_chunk_text("Python, TypeScript and Postgres (pgvector)."))
+        self.assertFalse(is_usable_chunk_text("too short"))
+        self.assertFalse(is_usable_chunk_text("binary\x01garbage in the middle of text"))
+        self.assertFalse(is_usable_chunk_text("\u2588\u2588\u2588\u2588 \u2592\u2592\u2592 %%%% #### @@@@ ok"))
+
+    def test_term_match_clause_uses_trigram_patterns(self):
+        clause, params = term_match_clause(["phd", "thesis"], trigram_index=True)
+        self.assertIn("ILIKE ANY", clause)
+        self.assertEqual(params, {"term_patterns": ["%phd%", "%thesis%"]})
+
+    def test_term_match_clause_falls_back_to_prefix_tsquery(self):
+        clause, params = term_match_clause(["phd", "thesis"], trigram_index=False)
+        self.assertIn("c.tsv @@", clause)
+        self.assertEqual(params, {"term_prefix_query": "phd:* | thesis:*"})
+        self.assertEqual(term_match_clause([], trigram_index=True), ("false", {}))
+
+    def test_ann_sql_reranks_quantized_candidates_exactly(self):
+        self.assertNotIn(":ann_prefetch", ann_candidates_sql("float", 1536))
+        for mode, operator in (("halfvec", "::halfvec(1536) <=>"), ("binary", "::bit(1536) <~>")):
+            sql = ann_candidates_sql(mode, 1536)
+            self.assertIn(operator, sql)
+            self.assertIn("LIMIT :ann_prefetch", sql)
+            self.assertTrue(sql.rstrip().endswith("ORDER BY distance\n      LIMIT :ann_limit"))
+
+    def test_ann_sql_filters_inside_the_scan(self):
+        time_filter = time_scoped_chunks_filter("d.created_at >= :range_start")
+        for mode in ("float", "halfvec"):
+            sql = ann_candidates_sql(mode, 1536, time_filter)
+            self.assertIn("WHERE e.workspace_id = :workspace_id AND e.chunk_id = ANY(ARRAY(", sql)
+            self.assertLess(sql.index("ANY(ARRAY("), sql.index("LIMIT"))
+
+    def test_time_range_clause_bounds_both_dates(self):
+        clause, params = time_range_clause(TimeRange(datetime(2023, 1, 1), datetime(2024, 1, 1)))
+
+        self.assertIn("d.created_at >= :range_start AND d.created_at < :range_end", clause)
+        self.assertIn("d.source_published_at >= :range_start", clause)
+        self.assertEqual(params["range_start"], datetime(2023, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual(time_range_clause(None), ("true", {}))
+
+    def test_merge_windows_joins_overlapping_ranges_per_document(self):
+        hits = [
+            {"document_id": 1, "chunk_index": 5, "score": 0.4},
+            {"document_id": 2, "chunk_index": 0, "score": 0.9, "doc_title": "B"},
+            {"document_id": 1, "chunk_index": 2, "score": 0.7},
+            {"document_id": 1, "chunk_index": 10, "score": 0.5},
+        ]
+
+        ranges = merge_windows(hits, 1)
+
+        self.assertEqual(
+            [(r["document_id"], r["lo"], r["hi"], r["score"]) for r in ranges],
+            [(1, 1, 6, 0.7), (1, 9, 11, 0.5), (2, 0, 1, 0.9)],
+        )
+        self.assertEqual(ranges[2]["doc_title"], "B")
+
 
 if __name__ == "__main__":
     unittest.main()
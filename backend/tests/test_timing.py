@@ -0,0 +1,43 @@
+import asyncio
+import unittest
+
+from app.services.timing import StageTimer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class StageTimerTest(unittest.TestCase):
+    def test_records_stages_marks_and_header(self):
+        clock = FakeClock()
+        timer = StageTimer(clock=clock)
+
+        with timer.stage("persist"):
+            clock.now = 0.004
+        clock.now = 0.25
+        timer.mark("first_token")
+
+        self.assertEqual(timer.as_millis(), {"persist": 4.0, "first_token": 250.0})
+        self.assertEqual(timer.server_timing(), "persist;dur=4.0, first_token;dur=250.0")
+
+    def test_run_times_overlapping_awaitables(self):
+        timer = StageTimer()
+
+        async def main():
+            await asyncio.gather(
+                timer.run("embed", asyncio.sleep(0.02)),
+                timer.run("persist", asyncio.sleep(0.01)),
+            )
+
+        asyncio.run(main())
+        self.assertGreaterEqual(timer.stages["embed"], 0.02)
+        self.assertLess(timer.stages["persist"], timer.stages["embed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
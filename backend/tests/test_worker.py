@@ -0,0 +1,30 @@
+import asyncio
+import os
+import unittest
+
+# app.config needs these at import time; nothing here connects.
+os.environ.setdefault("DATABASE_URL", os.getenv("TEST_DATABASE_URL", "postgresql+asyncpg://localhost/test"))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from app.worker import IngestionWorker  # noqa: E402
+
+
+class BookkeepingTest(unittest.TestCase):
+    def test_failed_release_does_not_escape(self):
+        calls = []
+
+        async def failing_release(db, job_id):
+            calls.append(job_id)
+            raise ConnectionError("server closed the connection")
+
+        async def run():
+            worker = IngestionWorker(concurrency=1)
+            with self.assertLogs("app.worker", level="ERROR"):
+                await worker._bookkeep(failing_release, 7)
+
+        asyncio.run(run())
+        self.assertEqual(calls, [7])
+
+
+if __name__ == "__main__":
+    unittest.main()
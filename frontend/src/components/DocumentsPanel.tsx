@@ -23,8 +23,12 @@ function cleanPreview(text: string, maxLength = 320) {
 
 export function DocumentsPanel() {
   const [docs, setDocs] = useState<DocumentRow[]>([]);
+  const [docsCursor, setDocsCursor] = useState<string | null>(null);
+  const [docsTotal, setDocsTotal] = useState<number | null>(null);
   const [selected, setSelected] = useState<DocumentRow | null>(null);
   const [chunks, setChunks] = useState<ChunkOut[]>([]);
+  const [chunksCursor, setChunksCursor] = useState<string | null>(null);
+  const [chunksTotal, setChunksTotal] = useState<number | null>(null);
   const [busy, setBusy] = useState(false);
   const [loadingChunks, setLoadingChunks] = useState(false);
   const [query, setQuery] = useState("");
@@ -44,8 +48,10 @@ export function DocumentsPanel() {
     setErr(null);
     setBusy(true);
     try {
-      const d = await listDocuments();
-      setDocs(d);
+      const page = await listDocuments();
+      setDocs(page.items);
+      setDocsCursor(page.nextCursor);
+      setDocsTotal(page.total);
     } catch (e: unknown) {
       setErr(errorMessage(e));
     } finally {
@@ -57,13 +63,33 @@ export function DocumentsPanel() {
     refresh();
   }, []);
 
+  async function loadMoreDocs() {
+    if (!docsCursor) return;
+    setErr(null);
+    setBusy(true);
+    try {
+      const page = await listDocuments(docsCursor);
+      setDocs((current) => [...current, ...page.items]);
+      setDocsCursor(page.nextCursor);
+    } catch (e: unknown) {
+      setErr(errorMessage(e));
+    } finally {
+      setBusy(false);
+    }
+  }
+
   async function openDoc(doc: DocumentRow) {
     setSelected(doc);
     setChunks([]);
+    setChunksCursor(null);
+    setChunksTotal(null);
     setErr(null);
     setLoadingChunks(true);
     try {
-      setChunks(await getDocumentChunks(doc.id));
+      const page = await getDocumentChunks(doc.id);
+      setChunks(page.items);
+      setChunksCursor(page.nextCursor);
+      setChunksTotal(page.total);
     } catch (e: unknown) {
       setErr(errorMessage(e));
     } finally {
@@ -71,6 +97,18 @@ export function DocumentsPanel() {
     }
   }
 
+  async function loadMoreChunks() {
+    if (!selected || !chunksCursor) return;
+    setErr(null);
+    try {
+      const page = await getDocumentChunks(selected.id, chunksCursor);
+      setChunks((current) => [...current, ...page.items]);
+      setChunksCursor(page.nextCursor);
+    } catch (e: unknown) {
+      setErr(errorMessage(e));
+    }
+  }
+
   async function onDelete(doc: DocumentRow) {
     if (!confirm(`Delete doc ${doc.id} (${doc.title})?`)) return;
     setErr(null);
@@ -92,7 +130,7 @@ export function DocumentsPanel() {
         <div className="flex items-center justify-between gap-3 border-b border-slate-200 px-4 py-3">
           <div>
             <div className="text-sm font-semibold text-slate-950">Documents</div>
-            <div className="text-xs text-slate-500">{docs.length} sources indexed</div>
+            <div className="text-xs text-slate-500">{docsTotal ?? docs.length} sources indexed</div>
           </div>
           <button
             onClick={refresh}
@@ -172,6 +210,15 @@ export function DocumentsPanel() {
                 );
               })
             )}
+            {docsCursor && (
+              <button
+                onClick={loadMoreDocs}
+                disabled={busy}
+                className="h-10 rounded-xl bg-white text-sm font-medium text-slate-700 ring-1 ring-slate-200 hover:bg-slate-50 disabled:opacity-50"
+              >
+                Load more
+              </button>
+            )}
           </div>
         </div>
       </section>
@@ -180,7 +227,7 @@ export function DocumentsPanel() {
         <div className="border-b border-slate-200 px-4 py-3">
           <div className="text-sm font-semibold text-slate-950">Chunk inspector</div>
           <div className="text-xs text-slate-500">
-            {selected ? `${selected.title || `Document ${selected.id}`} / ${chunks.length} chunks` : "Open a document to inspect chunk quality"}
+            {selected ? `${selected.title || `Document ${selected.id}`} / ${chunksTotal ?? chunks.length} chunks` : "Open a document to inspect chunk quality"}
           </div>
         </div>
 
@@ -213,6 +260,14 @@ export function DocumentsPanel() {
                   </p>
                 </article>
               ))}
+              {chunksCursor && (
+                <button
+                  onClick={loadMoreChunks}
+                  className="h-10 rounded-xl bg-white text-sm font-medium text-slate-700 ring-1 ring-slate-200 hover:bg-slate-50"
+                >
+                  Load more chunks
+                </button>
+              )}
             </div>
           )}
         </div>
@@ -4,6 +4,7 @@ import type {
   ChunkOut,
   ChunkRow,
   IngestJobOut,
+  Page,
 } from "@/lib/types";
 
 const API_BASE = process.env.NEXT_PUBLIC_API_BASE || "http://localhost:8000";
@@ -132,6 +133,7 @@ export async function chatStream(
   handlers: {
     onMeta?: (meta: StreamMeta | string) => void;
     onToken?: (token: string) => void;
+    onStatus?: (status: string) => void;
     onDone?: () => void;
   }
 ) {
@@ -180,6 +182,21 @@ export async function chatStream(
       return;
     }
 
+    if (eventName === "retrieving") {
+      handlers.onStatus?.(eventName);
+      return;
+    }
+
+    if (eventName === "error") {
+      let detail = "Answer generation failed";
+      try {
+        detail = JSON.parse(data)?.detail ?? detail;
+      } catch {
+        // keep the generic message
+      }
+      throw new Error(detail);
+    }
+
     if (data) {
       try {
         const parsed = JSON.parse(data);
@@ -217,20 +234,33 @@ export async function chatStream(
 
 /* ----------------------------- Documents ----------------------------- */
 
-export async function listDocuments() {
-  const r = await fetch(url("/v1/documents"), {
+async function fetchPage<T>(path: string, params: Record<string, string | number | boolean | undefined>) {
+  const query = new URLSearchParams();
+  for (const [key, value] of Object.entries(params)) {
+    if (value !== undefined) query.set(key, String(value));
+  }
+  const r = await fetch(url(`${path}?${query}`), {
     headers: workspaceHeaders(),
   });
   if (!r.ok) throw new Error(await r.text());
-  return (await r.json()) as DocumentRow[];
+  const total = r.headers.get("X-Total-Count");
+  return {
+    items: (await r.json()) as T[],
+    nextCursor: r.headers.get("X-Next-Cursor"),
+    total: total === null ? null : Number(total),
+  } satisfies Page<T>;
 }
 
-export async function getDocumentChunks(documentId: number) {
-  const r = await fetch(url(`/v1/documents/${documentId}/chunks`), {
-    headers: workspaceHeaders(),
+export async function listDocuments(cursor?: string) {
+  return fetchPage<DocumentRow>("/v1/documents", { cursor, include_total: !cursor });
+}
+
+export async function getDocumentChunks(documentId: number, cursor?: string) {
+  return fetchPage<ChunkOut>(`/v1/documents/${documentId}/chunks`, {
+    cursor,
+    include_total: !cursor,
+    preview_chars: 1_000,
   });
-  if (!r.ok) throw new Error(await r.text());
-  return (await r.json()) as ChunkOut[];
 }
 
 export async function deleteDocument(documentId: number) {
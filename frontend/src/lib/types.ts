@@ -21,6 +21,12 @@ export type ChunkOut = {
   created_at?: string | null;
 };
 
+export type Page<T> = {
+  items: T[];
+  nextCursor: string | null;
+  total: number | null;
+};
+
 export type ChunkRow = {
   chunk_id: number | string;
   document_id: number;